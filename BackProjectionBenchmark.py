@@ -0,0 +1,78 @@
+import time
+import numpy as np
+from Configuration import SPEED_OF_LIGHT
+import BPRangeBin
+import FastBackProjection
+import JitBackProjection
+import ParallelBackProjection
+from Configuration import WORKERS
+
+SCANS = 1000
+PIXELS = 200
+SAMPLES = 1500
+REPEATS = 3 #best of this many runs, a shared machine easily adds 30% to a single run
+
+#straight pass along x at 5 m altitude over a 200x200 grid
+def makeScene(scans = SCANS, pixels = PIXELS, samples = SAMPLES):
+    rng = np.random.default_rng(0)
+    r = 61 * SPEED_OF_LIGHT / 2e12
+    rangeBins = np.arange(samples) * r
+    platformPos = np.column_stack([np.linspace(-15, 15, scans), np.full(scans, -12.0), np.full(scans, 5.0)])
+    datalist = rng.standard_normal((scans, samples))
+    xPos = np.linspace(-10, 0, pixels, endpoint=False)
+    yPos = np.linspace(-10, 0, pixels, endpoint=False)
+    return datalist, rangeBins, platformPos, xPos, yPos
+
+#the per scan loop paintImage in BPRangeBin.py, Interp.py and BackProjection.py started from, fresh arrays every
+#scan and np.interp for the range lookup, kept here as the baseline the speedups are measured against
+def originalLoop(datalist, rangeBins, platformPos, xCor, yCor, zOffset = 0):
+    numX = len(xCor)
+    numY = len(yCor)
+    image = np.zeros((numX, numY), dtype='complex128')
+    for scan in range(len(datalist)):
+        xNP = np.asarray((xCor[:] - platformPos[scan][0])**2)
+        yNP = np.asarray((yCor[:] - platformPos[scan][1])**2)
+        distance = np.zeros((numX, numY))
+        distance = xNP[np.newaxis,:] + yNP[:, np.newaxis]
+        distance = np.sqrt(distance+(zOffset - platformPos[scan][2])**2)
+        image += np.interp(distance, rangeBins, datalist[scan])
+    return image
+
+#fastest of repeats runs and the image of the last
+def timeit(paint, *args, repeats = 1, **kwargs):
+    best = None
+    for run in range(repeats):
+        start = time.perf_counter()
+        image = paint(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, image
+
+def report(name, seconds, baseline, image, reference, detail = ""):
+    error = np.abs(image - reference).max() / np.abs(reference).max()
+    print("{:22s} {:8.2f} s  {:14s} speedup {:5.1f}x  max rel error {:.1e}".format(
+        name, seconds, detail, baseline / seconds, error))
+
+if __name__ == "__main__":
+    scene = makeScene()
+    baseline, reference = timeit(originalLoop, *scene, repeats=REPEATS)
+    print("{} scans onto {}x{} pixels, best of {} runs".format(SCANS, PIXELS, PIXELS, REPEATS))
+    print("{:22s} {:8.2f} s".format("original loop:", baseline))
+    serialTime, image = timeit(BPRangeBin.paintImage, *scene, repeats=REPEATS)
+    report("BPRangeBin loop:", serialTime, baseline, image, reference)
+    for budget in (1, 2, 4, 16, 256):
+        blockTime, image = timeit(FastBackProjection.paintImage, *scene, memoryBudget=budget * 2**20, repeats=REPEATS)
+        scans = FastBackProjection.scansPerBlock(PIXELS * PIXELS, SCANS, budget * 2**20)
+        report("blocked {:4d} MB:".format(budget), blockTime, baseline, image, reference, "K={:4d}".format(scans))
+    blockTime, image = timeit(FastBackProjection.paintImage, *scene, precision='single', repeats=REPEATS)
+    report("blocked single:", blockTime, baseline, image, reference,
+           "K={:4d}".format(FastBackProjection.scansPerBlock(PIXELS * PIXELS, SCANS)))
+    if JitBackProjection.numba is not None:
+        #the first call compiles or loads the cached kernel
+        JitBackProjection.paintImage(scene[0][:2], *scene[1:], backend='numba')
+        jitTime, image = timeit(JitBackProjection.paintImage, *scene, backend='numba', repeats=REPEATS)
+        report("compiled (numba):", jitTime, baseline, image, reference)
+    for split in ('scans', 'pixels'):
+        parallelTime, image = timeit(ParallelBackProjection.paintImage, *scene, workers=WORKERS, split=split)
+        report("parallel {:6s}:".format(split), parallelTime, baseline, image, reference,
+               "workers={:2d}".format(WORKERS))
@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+import numpy as np
+import Configuration
+import Imaging
+import SyntheticScene
+from Functions import scanRangeBins
+
+#times every imaging method on synthetic point target scenes and checks how well each one focuses
+#python BenchmarkSuite.py --pixels 100 200 --scans 250 1000 --out results.json
+#python BenchmarkSuite.py --compare results.json             same runs, printed against an earlier results file
+#scenes are built with Functions.tou between Points, sampled the way the radar would with SCAN_START,
+#SCAN_END and SCAN_RES, and given the noise left after integrating 2**BII pulses
+#the first call of each method is reported apart from the best of the repeats after it, numba compiles and
+#geometry cache misses land in the first call
+
+NOISE_PER_PULSE = 4.0 #noise of a single pulse relative to a unit reflector's echo
+BASELINES = ('interp', 'backprojection') #the original per-scan loops in Interp and BackProjection
+METHODS = list(Imaging.METHODS) + list(BASELINES)
+SLOW_METHODS = {'reference': 2e7, 'interp': 2e7, 'backprojection': 2e7} #pixel-scan products above which a method is skipped
+TARGETS = ((-5, -5, 0), (-7.5, -7.5, 0), (-2, -3.3, 0))
+
+def sceneScans(scans, trajectory, seed = 0):
+    binStep = Configuration.SCAN_RES * 1.907e-12 * Configuration.SPEED_OF_LIGHT / 2
+    samples = int(np.ceil((Configuration.SCAN_END - Configuration.SCAN_START) / binStep))
+    rangeBins = scanRangeBins(samples, Configuration.SCAN_START, Configuration.SCAN_RES)
+    platformPos = SyntheticScene.trajectory(trajectory, scans, seed=seed)
+    noise = NOISE_PER_PULSE / np.sqrt(2**Configuration.BII)
+    datalist = SyntheticScene.touEchoes(platformPos, rangeBins, TARGETS, noise=noise, seed=seed)
+    return datalist, rangeBins, platformPos
+
+def grid(pixels):
+    x0, x1, y0, y1 = Configuration.COORDINATES
+    return np.linspace(x0, x1, pixels, endpoint=False), np.linspace(y0, y1, pixels, endpoint=False)
+
+#peak position error (m), peak sidelobe and integrated sidelobe ratios (dB) and gain (peak over scans)
+#around one target, the mainlobe is everything within mainlobe meters of the peak and the sidelobes the
+#rest of a patch a few mainlobes across
+def focusMetrics(image, xCor, yCor, target, mainlobe, scans):
+    magnitude = np.abs(image)
+    radius = 5 * mainlobe
+    distance = np.hypot(xCor[np.newaxis, :] - target[0], yCor[:, np.newaxis] - target[1])
+    patch = distance <= radius
+    peakIndex = np.unravel_index(np.argmax(np.where(patch, magnitude, -1)), magnitude.shape)
+    peakX, peakY = xCor[peakIndex[1]], yCor[peakIndex[0]]
+    peak = magnitude[peakIndex]
+    fromPeak = np.hypot(xCor[np.newaxis, :] - peakX, yCor[:, np.newaxis] - peakY)
+    main = patch & (fromPeak <= mainlobe)
+    side = patch & (fromPeak > mainlobe)
+    sidePeak = magnitude[side].max() if side.any() else 0
+    sideEnergy = (magnitude[side]**2).sum()
+    return {'error': float(np.hypot(peakX - target[0], peakY - target[1])),
+            'pslr': float(20 * np.log10(max(sidePeak, 1e-30) / peak)),
+            'islr': float(10 * np.log10(max(sideEnergy, 1e-30) / (magnitude[main]**2).sum())),
+            'gain': float(peak / scans)}
+
+#paintImage of an Imaging method or one of the baselines, BackProjection works out its own range bins
+def imager(method):
+    if method == 'interp':
+        import Interp
+        return Interp.paintImage
+    if method == 'backprojection':
+        import BackProjection
+        return lambda datalist, rangeBins, platformPos, xCor, yCor: BackProjection.paintImage(datalist, platformPos, xCor, yCor)
+    return Imaging.imager(method)
+
+#seconds for the first call, which pays for numba compiles and filling the geometry cache, the best of repeat
+#calls after it, and the image
+def timeMethod(method, args, repeat):
+    paintImage = imager(method)
+    start = time.perf_counter()
+    image = paintImage(*args)
+    cold = time.perf_counter() - start
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        image = paintImage(*args)
+        times.append(time.perf_counter() - start)
+    return cold, min(times), image
+
+def version():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=sys.path[0] or '.').stdout.strip()
+    except OSError:
+        return ''
+
+#one result per method, trajectory, scan count and grid size, printed as it goes
+def runSuite(methods, trajectories, scanCounts, pixelCounts, repeat = 1):
+    results = []
+    #twice the range resolution of the pulse, or two pixels when those are coarser
+    rangeResolution = Configuration.SPEED_OF_LIGHT / (2 * SyntheticScene.PULSE_BANDWIDTH)
+    for trajectory in trajectories:
+        for scans in scanCounts:
+            datalist, rangeBins, platformPos = sceneScans(scans, trajectory)
+            for pixels in pixelCounts:
+                xCor, yCor = grid(pixels)
+                mainlobe = 2 * max(rangeResolution, xCor[1] - xCor[0])
+                args = (datalist, rangeBins, platformPos, xCor, yCor)
+                for method in methods:
+                    if pixels**2 * scans > SLOW_METHODS.get(method, np.inf):
+                        continue
+                    cold, seconds, image = timeMethod(method, args, repeat)
+                    targets = [focusMetrics(image, xCor, yCor, target, mainlobe, scans) for target in TARGETS]
+                    result = {'method': method, 'trajectory': trajectory, 'scans': scans, 'pixels': pixels,
+                              'seconds': seconds, 'cold_seconds': cold, 'ns_per_pixel_scan': 1e9 * seconds / (pixels**2 * scans),
+                              'worst_error': max(t['error'] for t in targets),
+                              'worst_pslr': max(t['pslr'] for t in targets), 'targets': targets}
+                    results.append(result)
+                    print("{:14s} {:6s} {:5d} scans {:4d}^2 px  {:8.3f} s  first {:8.3f} s  {:6.1f} ns/px/scan  "
+                          "error {:.3f} m  pslr {:6.1f} dB".format(method, trajectory, scans, pixels, seconds, cold,
+                                                                  result['ns_per_pixel_scan'], result['worst_error'],
+                                                                  result['worst_pslr']))
+    return results
+
+def key(result):
+    return result['method'], result['trajectory'], result['scans'], result['pixels']
+
+#speed and focus against an earlier results file, matched by method, trajectory, scans and pixels
+def compare(results, old):
+    previous = {key(result): result for result in old['results']}
+    print("against {} ({})".format(old['meta'].get('version') or 'unknown version', old['meta'].get('date', '')))
+    for result in results:
+        before = previous.get(key(result))
+        if before is None:
+            continue
+        print("{:14s} {:6s} {:5d} scans {:4d}^2 px  speed {:5.2f}x  error {:+.3f} m  pslr {:+5.1f} dB".format(
+            *key(result), before['seconds'] / result['seconds'], result['worst_error'] - before['worst_error'],
+            result['worst_pslr'] - before['worst_pslr']))
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="imaging benchmark on synthetic point targets")
+    parser.add_argument('--methods', nargs='+', default=METHODS, choices=METHODS)
+    parser.add_argument('--trajectories', nargs='+', default=['line', 'arc'], choices=SyntheticScene.TRAJECTORIES)
+    parser.add_argument('--scans', nargs='+', type=int, default=[250, 1000])
+    parser.add_argument('--pixels', nargs='+', type=int, default=[100, 200, 400])
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--out', help="write results here as JSON")
+    parser.add_argument('--compare', help="earlier results to compare against")
+    args = parser.parse_args(argv)
+    Configuration.override({'PROGRESS': False})
+    results = runSuite(args.methods, args.trajectories, args.scans, args.pixels, args.repeat)
+    meta = {'version': version(), 'date': time.strftime('%Y-%m-%d %H:%M:%S'), 'python': platform.python_version(),
+            'numpy': np.__version__, 'machine': platform.machine(), 'cpus': os.cpu_count(),
+            'workers': Configuration.WORKERS,
+            'settings': {name: Configuration.settings()[name] for name in
+                         ('SCAN_START', 'SCAN_END', 'SCAN_RES', 'BII', 'COORDINATES', 'PRECISION', 'BACKEND')}}
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+if __name__ == "__main__":
+    main()
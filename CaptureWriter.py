@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import zlib
+import queue
+import struct
+import logging
+import threading
+import numpy as np
+from Configuration import CAPTURE_CHUNK, CAPTURE_FLUSH
+import Instrumentation
+
+#a capture is a directory holding chunks.bin and index.json
+#chunks.bin is append only, every chunk is a header followed by zlib compressed scan numbers, timestamps and
+#samples, the samples delta coded along each row since neighbouring radar samples are close
+#index.json lists the chunks written so far and is replaced atomically every CAPTURE_FLUSH seconds, chunks
+#written after the last index are found again by walking their headers, so a crash loses at most the chunk
+#being written
+VERSION = 1
+EXTENSION = '.capture'
+MAGIC = b'SCNK'
+HEADER = struct.Struct('<4sIII') #magic, scans in chunk, compressed length, crc32 of the compressed bytes
+
+logger = logging.getLogger(__name__)
+
+def encodeChunk(scans, timestamps, rows):
+    delta = np.diff(rows, axis=1, prepend=0).astype(np.int32)
+    payload = zlib.compress(scans.astype(np.int32).tobytes() + timestamps.astype(np.float64).tobytes() + delta.tobytes(), 1)
+    return HEADER.pack(MAGIC, len(scans), len(payload), zlib.crc32(payload)) + payload
+
+#scan numbers, timestamps and rows of a chunk payload, the wrapping int32 cumsum undoes the wrapping diff
+def decodeChunk(payload, count, numSamples):
+    raw = zlib.decompress(payload)
+    scans = np.frombuffer(raw, np.int32, count)
+    timestamps = np.frombuffer(raw, np.float64, count, 4 * count)
+    delta = np.frombuffer(raw, np.int32, count * numSamples, 12 * count).reshape(count, numSamples)
+    return scans, timestamps, np.cumsum(delta, axis=1, dtype=np.int32)
+
+#appends scans to a capture from a background thread, so the receive loop only copies each row into the chunk
+#being filled, writer.append(scan, row, timestamp) from ScanAssembler's onScan and writer.close() at the end
+#timestamp is the radar's F201 timestamp of the scan (ms, ScanAssembler.timestamps), NaN when there is none
+class CaptureWriter:
+    def __init__(self, path, numSamples, chunkScans = CAPTURE_CHUNK, flushEvery = CAPTURE_FLUSH, **meta):
+        self.path = path
+        self.numSamples = numSamples
+        self.chunkScans = chunkScans
+        self.flushEvery = flushEvery
+        self.meta = meta
+        self.chunks = []
+        self.offset = 0
+        self.scansWritten = 0
+        self.error = None
+        os.makedirs(path, exist_ok=True)
+        self.file = open(os.path.join(path, 'chunks.bin'), 'wb')
+        self.newChunk()
+        self.queue = queue.Queue()
+        self.flushed = time.monotonic()
+        self.writeIndex()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def newChunk(self):
+        self.scans = np.zeros(self.chunkScans, np.int32)
+        self.timestamps = np.zeros(self.chunkScans)
+        self.rows = np.zeros((self.chunkScans, self.numSamples), np.int32)
+        self.filled = 0
+
+    def append(self, scan, row, timestamp = np.nan):
+        if self.error is not None:
+            raise self.error
+        self.scans[self.filled] = scan
+        self.timestamps[self.filled] = timestamp
+        self.rows[self.filled] = row
+        self.filled += 1
+        if self.filled == self.chunkScans:
+            self.queue.put((self.scans, self.timestamps, self.rows))
+            self.newChunk()
+
+    #hands over the partly filled chunk, waits for the writer and leaves a complete index
+    def close(self):
+        if self.filled:
+            self.queue.put((self.scans[:self.filled], self.timestamps[:self.filled], self.rows[:self.filled]))
+            self.newChunk()
+        self.queue.put(None)
+        self.thread.join()
+        self.file.close()
+        self.writeIndex(complete=True)
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    #a close failing while an error is already on its way out is logged, not raised over it
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+            return
+        try:
+            self.close()
+        except Exception as error:
+            logger.error("Closing capture {} failed: {}".format(self.path, error))
+
+    def run(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=self.flushEvery)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                return
+            try:
+                if item:
+                    self.writeChunk(*item)
+                if time.monotonic() - self.flushed >= self.flushEvery:
+                    self.file.flush()
+                    os.fsync(self.file.fileno())
+                    self.writeIndex()
+            except OSError as error:
+                #surfaces on the next append or close, the receive loop should not die inside the thread
+                self.error = error
+                return
+
+    def writeChunk(self, scans, timestamps, rows):
+        with Instrumentation.timer('compress'):
+            chunk = encodeChunk(scans, timestamps, rows)
+        with Instrumentation.timer('write'):
+            self.file.write(chunk)
+        Instrumentation.count('bytes_written', len(chunk))
+        self.chunks.append({'offset': self.offset, 'length': len(chunk), 'scans': len(scans),
+                            'first': int(scans.min()), 'last': int(scans.max())})
+        self.offset += len(chunk)
+        self.scansWritten += len(scans)
+
+    def writeIndex(self, complete = False):
+        index = dict(self.meta, version=VERSION, num_samples=self.numSamples, dtype='<i4', complete=complete,
+                     scans=self.scansWritten, chunks=list(self.chunks))
+        temp = os.path.join(self.path, 'index.json.tmp')
+        with open(temp, 'w') as f:
+            json.dump(index, f, indent=1)
+        os.replace(temp, os.path.join(self.path, 'index.json'))
+        self.flushed = time.monotonic()
+
+#scan numbers, timestamps and rows of the chunk at offset, None unless a whole chunk with a valid crc is there
+def readChunk(f, offset, numSamples):
+    f.seek(offset)
+    header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+    magic, count, length, crc = HEADER.unpack(header)
+    payload = f.read(length)
+    if magic != MAGIC or len(payload) < length or zlib.crc32(payload) != crc:
+        return None
+    return decodeChunk(payload, count, numSamples), HEADER.size + length
+
+#every scan in the capture at path
+#chunks the index lists are read at their offsets and checked against it, a damaged one is logged and skipped
+#without losing the chunks after it, chunks written after the last index flush are found by walking their headers
+#from the end of the last indexed chunk until a torn or missing one
+#returns a dict like the marathon pickles, scan_data row n is scan n and scans never received stay zero
+#with scan_count in the index (client.capture records it) scan_data has a row for every scan asked for
+def readCapture(path):
+    with open(os.path.join(path, 'index.json')) as f:
+        index = json.load(f)
+    if index['version'] > VERSION:
+        raise ValueError("{} is capture version {}, this reader knows up to {}".format(path, index['version'], VERSION))
+    numSamples = index['num_samples']
+    chunks = []
+    offset = 0
+    with open(os.path.join(path, 'chunks.bin'), 'rb') as f:
+        for entry in index['chunks']:
+            chunk = readChunk(f, entry['offset'], numSamples)
+            if chunk is None or chunk[1] != entry['length'] or len(chunk[0][0]) != entry['scans']:
+                logger.warning("Capture {} chunk at {} does not match its index entry, skipping scans {}-{}".format(
+                    path, entry['offset'], entry['first'], entry['last']))
+            else:
+                chunks.append(chunk[0])
+            offset = entry['offset'] + entry['length']
+        while True:
+            chunk = readChunk(f, offset, numSamples)
+            if chunk is None:
+                break
+            chunks.append(chunk[0])
+            offset += chunk[1]
+    scans = np.concatenate([chunk[0] for chunk in chunks]) if chunks else np.zeros(0, np.int32)
+    count = max(index.get('scan_count', 0), scans.max() + 1 if len(scans) else 0)
+    scanData = np.zeros((count, numSamples), np.int32)
+    timestamps = np.zeros(len(scanData))
+    for chunkScans, chunkTimes, rows in chunks:
+        scanData[chunkScans] = rows
+        timestamps[chunkScans] = chunkTimes
+    received = np.zeros(len(scanData), bool)
+    received[scans] = True
+    meta = {key: value for key, value in index.items() if key not in ('chunks', 'scans', 'version')}
+    return dict(meta, scan_data=scanData, timestamps=timestamps, received=received)
@@ -0,0 +1,144 @@
+import re
+import timeit
+import numpy as np
+from collections import OrderedDict
+from Configuration import SPEED_OF_LIGHT, SCAN_START, SCAN_END, SCAN_RES, BII, SCAN_COUNT
+import MessageCodec as codec
+
+#original hand-written codec from client.py, kept here only as the baseline
+def legacyDecodeScan(data):
+    m = OrderedDict()
+    m['message_type'] = int.from_bytes(data[0:2],'big')
+    m['message_id'] = int.from_bytes(data[2:4],'big')
+    m['source_id'] = int.from_bytes(data[4:8],'big')
+    m['timestamp'] = int.from_bytes(data[8:12],'big')
+    m['scan_start'] = int.from_bytes(data[28:32],'big', signed=True)
+    m['scan_stop'] = int.from_bytes(data[32:36],'big',signed=True)
+    m['scan_step'] = int.from_bytes(data[36:38],'big',signed=True)
+    m['scan_type'] = int.from_bytes(data[38:39],'big')
+    m['antenna_id'] = int.from_bytes(data[40:41],'big')
+    m['operational_mode'] = int.from_bytes(data[41:42],'big')
+    m['num_samples_message'] = int.from_bytes(data[42:44],'big')
+    m['num_samples_total'] = int.from_bytes(data[44:48],'big')
+    m['message_index'] = int.from_bytes(data[48:50],'big')
+    m['num_messages_total'] = int.from_bytes(data[50:52],'big')
+    m['scan_data'] = []
+    for i in range(m['num_samples_message']):
+        m['scan_data'].append(int.from_bytes(data[52+(i*4):56+(i*4)],'big', signed=True))
+    return m
+
+def legacyDecodeGetConfig(data):
+    m = OrderedDict()
+    m['message_type'] = int.from_bytes(data[0:2],'big')
+    m['message_id'] = int.from_bytes(data[2:4],'big')
+    m['node_id'] = int.from_bytes(data[4:8],'big')
+    m['scan_start'] = int.from_bytes(data[8:12],'big',signed=True)
+    m['scan_end'] = int.from_bytes(data[12:16],'big',signed=True)
+    m['scan_res'] = int.from_bytes(data[16:18],'big')
+    m['base_integration_index'] = int.from_bytes(data[18:20],'big')
+    m['antenna_mode'] = int.from_bytes(data[20:21],'big')
+    m['transmit_gain'] = int.from_bytes(data[21:22],'big')
+    m['code_channel'] = int.from_bytes(data[22:23],'big')
+    m['persist_flag'] = int.from_bytes(data[23:24],'big')
+    m['timestamp'] = int.from_bytes(data[24:28],'big')
+    m['status'] = int.from_bytes(data[28:32],'big')
+    return m
+
+def legacyEncodeSetConf(messageID, scanStart, scanEnd, scan_res, baseInter):
+    message = bytes.fromhex("1001") + int.to_bytes(messageID, 2, 'big')
+    scanEnd = int(scanEnd*2e12/SPEED_OF_LIGHT)
+    message = message + int.to_bytes(1, 4, 'big')
+    message = message + int.to_bytes(scanStart, 4, 'big', signed = True)
+    message = message + int.to_bytes(scanEnd, 4, 'big', signed = True)
+    message = message + int.to_bytes(scan_res, 2, 'big')
+    message = message + int.to_bytes(baseInter, 2, 'big')
+    for i in range(4):
+        message = message + int.to_bytes(0, 2, 'big')
+    for i in range(4):
+        message = message + int.to_bytes(0, 1, 'big')
+    for value in (2, 32, 7, 0):
+        message = message + int.to_bytes(value, 1, 'big')
+    return message
+
+def legacyEncodeCtrlReq(messageID, scanCount):
+    message = bytes.fromhex('1003') + int.to_bytes(messageID, 2, 'big')
+    message = message + int.to_bytes(scanCount, 2, 'big')
+    message = message + int.to_bytes(0, 2, 'big')
+    message = message + int.to_bytes(0, 4, 'big')
+    return message
+
+#builds a realistic F201 datagram with 350 samples
+def sampleScan(messageID = 4, index = 0, numMessages = 5):
+    samples = np.random.randint(-2**20, 2**20, 350).astype('>i4')
+    header = bytearray(codec.SCAN_HEADER.size)
+    codec.SCAN_HEADER.pack_into(header, 0, codec.SCAN_INFO, messageID, 1, 1234, 0, 7000, 32, 1, 0, 0,
+                                350, 350*numMessages, index, numMessages)
+    return bytes(header) + samples.tobytes()
+
+def sampleGetConfig():
+    buf = bytearray(codec.LAYOUTS[0x1102].size)
+    codec.encodeInto(buf, 0, 0x1102, 2, 1, 0, 467, 32, 8, 2, 32, 7, 0, 1234, 0)
+    return bytes(buf)
+
+#F101 the way the MRM API lays it out, big-endian with a 4 byte serial number and status at bytes 60:64
+def sampleStatusInfo():
+    data = bytearray(64)
+    data[0:4] = bytes.fromhex('f1010007')
+    data[4:16] = bytes([2, 1, 0, 9, 3, 4, 0, 5, 6, 21, 7, 14])
+    data[16:20] = (100123).to_bytes(4, 'big')
+    data[20:24] = bytes([3, 0, 1, 2])
+    data[24:28] = (-150).to_bytes(4, 'big', signed=True)
+    data[28:60] = b'3.1.2'.ljust(32, b'\0')
+    data[60:64] = (0).to_bytes(4, 'big')
+    return bytes(data)
+
+#one struct code per field of a layout format, '4H' is four fields, '32s' one and pad bytes none
+def fieldCodes(fmt):
+    codes = []
+    for count, code in re.findall(r'(\d*)([a-zA-Z?])', fmt):
+        if code == 's':
+            codes.append(count + code)
+        elif code != 'x':
+            codes.extend(code * int(count or 1))
+    return codes
+
+#every layout decodes what it encodes, each field set to a distinct value so a shifted field shows up
+def checkRoundTrips():
+    for messageType, (fmt, names) in codec.MESSAGES.items():
+        fields = [bytes([65 + i]) * int(code[:-1]) if code.endswith('s') else i + 1
+                  for i, code in enumerate(fieldCodes(fmt))]
+        buf = bytearray(codec.LAYOUTS[messageType].size)
+        codec.encodeInto(buf, 0, messageType, 9, *fields)
+        #header fields only, F201 samples are checked against the legacy decoder above
+        decoded = codec.makeDecoder(messageType)(bytes(buf))
+        assert decoded == dict(zip(codec.FIELDS[messageType], [messageType, 9] + fields)), hex(messageType)
+
+def check():
+    scan = sampleScan()
+    new, old = codec.decodeScan(scan), legacyDecodeScan(scan)
+    assert list(new['scan_data']) == old['scan_data']
+    assert all(new[k] == old[k] for k in old if k != 'scan_data')
+    assert codec.decodeMessage(sampleGetConfig()) == legacyDecodeGetConfig(sampleGetConfig())
+    assert bytes(codec.encodeSetConf(3, SCAN_START, SCAN_END, SCAN_RES, BII)) == legacyEncodeSetConf(3, SCAN_START, SCAN_END, SCAN_RES, BII)
+    assert bytes(codec.encodeCtrlReq(4, SCAN_COUNT)) == legacyEncodeCtrlReq(4, SCAN_COUNT)
+    checkRoundTrips()
+    status = codec.decodeMessage(sampleStatusInfo())
+    assert codec.LAYOUTS[0xF101].size == 64
+    assert (status['serial_number'], status['temperature'], status['status']) == (100123, -150, 0)
+    assert status['package_version'].rstrip(b'\0') == b'3.1.2'
+
+def bench(label, legacy, new, number):
+    oldTime = min(timeit.repeat(legacy, number=number, repeat=5)) / number
+    newTime = min(timeit.repeat(new, number=number, repeat=5)) / number
+    print("{:<22}{:>12.2f} us{:>12.2f} us{:>10.1f}x".format(label, oldTime*1e6, newTime*1e6, oldTime/newTime))
+
+if __name__ == "__main__":
+    check()
+    scan = sampleScan()
+    config = sampleGetConfig()
+    print("{:<22}{:>15}{:>15}{:>11}".format("message", "legacy", "codec", "speedup"))
+    bench("decode F201", lambda: legacyDecodeScan(scan), lambda: codec.decodeScan(scan), 500)
+    bench("decode 1102", lambda: legacyDecodeGetConfig(config), lambda: codec.decodeMessage(config), 20000)
+    bench("encode 1001", lambda: legacyEncodeSetConf(3, SCAN_START, SCAN_END, SCAN_RES, BII),
+          lambda: codec.encodeSetConf(3, SCAN_START, SCAN_END, SCAN_RES, BII), 20000)
+    bench("encode 1003", lambda: legacyEncodeCtrlReq(4, SCAN_COUNT), lambda: codec.encodeCtrlReq(4, SCAN_COUNT), 20000)
@@ -1,4 +1,5 @@
 import os
+import json
 
 #Constants
 SPEED_OF_LIGHT = 299792458 # (m/s)
@@ -9,7 +10,7 @@ CENTERED_FREQUENCY = 4.3 * 10e9
 CENTERED_WAVELENGTH = SPEED_OF_LIGHT/CENTERED_FREQUENCY
 VELOCITY = 66.730296
 
-USER_SYSTEM = input("Which system are you running on? (w/m): ")
+USER_SYSTEM = 'w' if os.name == 'nt' else 'm' #w for windows paths, m for mac/linux
 
 
 CPI = 0.74
@@ -23,4 +24,67 @@ SCAN_COUNT = 1000
 SCAN_START = 0 #in meters
 SCAN_END = 70 #in meters
 SCAN_RES = 32 #1-511
-BII = 8 #6-15
\ No newline at end of file
+BII = 8 #6-15
+
+MEMORY_BUDGET = 4 * 2**20 #bytes of scratch space per imaging block, near cache size is fastest
+WORKERS = os.cpu_count() #processes used by the parallel imaging mode
+GEOMETRY_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'geometry_cache') #cached per-scan range index maps
+GEOMETRY_CACHE_SIZE = 4 * 2**30 #bytes kept in the geometry cache before the least recently used maps are evicted
+FFBP_ACCURACY = 2 #angular oversampling of factorized backprojection subimages, higher is more accurate and slower
+BACKEND = 'auto' #imaging loop: 'numba' compiles it, 'numpy' uses FastBackProjection, 'auto' picks numba when it is installed
+PRECISION = 'double' #'single' keeps scans and geometry in float32 and sums images in float32/complex64, half the memory traffic
+CAPTURE_CHUNK = 64 #scans compressed and written together by the capture writer
+CAPTURE_FLUSH = 2.0 #seconds between capture index rewrites, at most this much of a crashed capture needs the slow recovery scan
+ROI_COARSE = 8 #fine pixels per coarse pixel side in the multiresolution mode
+ROI_TILE = 32 #fine pixels per refined tile side, a multiple of ROI_COARSE
+ROI_THRESHOLD = 0.2 #tiles brighter than this fraction of the way from the median to the peak of the coarse image are refined
+SLIDING_WINDOW = 0 #scans in NonStopScan's rolling aperture, 0 for SCAN_COUNT
+SLIDING_RESYNC = 50 #windows of scans between rebuilds of the sliding image, bounds rounding drift for about 1/50 more work
+DISPLAY_INTERVAL = 0.1 #least seconds between NonStopScan display refreshes, each refresh shows every scan painted so far
+PROGRESS = True #progress bars while imaging, needs alive_progress
+INSTRUMENT = False #stage timers, counters and memory peaks in Instrumentation, off costs one flag check per call
+INSTRUMENT_LOG = 0 #seconds between instrumentation log lines, 0 for none
+POSITION_PORT = 0 #UDP port platform positions stream to while scanning (PositionFeed), 0 reads the emulator's flight path after each pass
+IDLE_TIMEOUT = 2.0 #seconds without a scan datagram before a capture gives up waiting
+RECEIVER = 'thread' #'thread' receives into a preallocated arena on its own thread, 'asyncio' on the event loop
+RECEIVE_BUFFER = 8 * 2**20 #bytes of kernel receive queue asked for per radar socket
+RECEIVE_SLOTS = 8192 #scan datagrams the receive arena holds before it starts dropping
+
+#any setting above can be overridden without editing this file, later sources win:
+#a JSON file of {"NAME": value} named by SAR_CONFIG (default sar_config.json in the working directory),
+#SAR_<NAME> environment variables, and CLI flags through override()
+
+#value of setting name written as text, string settings take the text as it is, true and false are accepted in
+#any case for flags and anything else has to parse as JSON
+def parseValue(name, text):
+    current = globals()[name]
+    if isinstance(current, str):
+        return text
+    if isinstance(current, bool) and text.strip().lower() in ('true', 'false'):
+        return text.strip().lower() == 'true'
+    try:
+        return json.loads(text)
+    except ValueError:
+        raise ValueError("{}={!r} is not a valid {} value".format(name, text, type(current).__name__)) from None
+
+def settings():
+    return {name: value for name, value in globals().items() if name.isupper()}
+
+#sets names to values in this module, modules that import a setting by name see the new value only if they
+#are imported afterwards, so front ends call this before importing capture or imaging code
+def override(values):
+    known = settings()
+    for name, value in values.items():
+        if name not in known:
+            raise KeyError("unknown setting {}".format(name))
+        globals()[name] = parseValue(name, value) if isinstance(value, str) else value
+
+def loadFile(path):
+    with open(path) as f:
+        override(json.load(f))
+
+configFile = os.environ.get('SAR_CONFIG', 'sar_config.json')
+if os.path.isfile(configFile):
+    loadFile(configFile)
+override({name[4:]: value for name, value in os.environ.items() if name.startswith('SAR_') and name[4:] in settings()
+          and name != 'SAR_CONFIG'})
@@ -0,0 +1,192 @@
+import numpy as np
+from Configuration import FFBP_ACCURACY, SPEED_OF_LIGHT
+from RangeInterp import isUniform, interpRange
+
+#fast factorized backprojection: neighbouring scans are merged into subaperture images on local polar
+#grids (range from the subaperture center, azimuth around it), factor at a time, until imaging the
+#remaining subapertures straight onto the pixel grid is cheaper than merging again
+#subimages hold the analytic signal with the carrier taken out along range, so what gets interpolated is
+#the smooth envelope rather than a carrier sampled a few times per cycle
+
+#image of one subaperture sampled at ranges r0 + dr*i and azimuths ref + a0 + da*j, data is (na, nr)
+#the true image at range r is data * exp(1j*k*r)
+class Subimage:
+    def __init__(self, center, length, scans, r0, dr, ref, a0, da, data):
+        self.center = center
+        self.length = length
+        self.scans = scans
+        self.r0 = r0
+        self.dr = dr
+        self.ref = ref
+        self.a0 = a0
+        self.da = da
+        self.data = data
+
+def wrapAngle(angle):
+    return np.remainder(angle + np.pi, 2 * np.pi) - np.pi
+
+#exp(1j*angle) as complex64, float32 cos and sin are vectorized and many times faster than complex exp
+def cis(angle):
+    angle = angle.astype(np.float32)
+    out = np.empty(angle.shape, np.complex64)
+    np.cos(angle, out=out.real)
+    np.sin(angle, out=out.imag)
+    return out
+
+#image of sub at ground points (x, y, zOffset) as seen from a center at range base, that is with exp(1j*k*base)
+#taken out again, bilinear in azimuth and range and clamped at the edges
+def lookup(sub, x, y, zOffset, k, base = 0):
+    dx = x - sub.center[0]
+    dy = y - sub.center[1]
+    distance = np.sqrt(dx**2 + dy**2 + (zOffset - sub.center[2])**2)
+    phase = cis(k * (distance - base))
+    na, nr = sub.data.shape
+    t = ((distance - sub.r0) / sub.dr).astype(np.float32)
+    np.clip(t, 0, nr - 1, out=t)
+    j = np.minimum(t.astype(np.intp), nr - 2)
+    t -= j
+    flat = sub.data.ravel()
+    #a single beam holds the same range profile in every direction
+    if na == 1:
+        near = np.take(flat, j)
+        near += (np.take(flat, j + 1) - near) * t
+        phase *= near
+        return phase
+    #azimuth measured from sub.ref by rotating the offsets first, so it never wraps
+    cosRef, sinRef = np.cos(sub.ref), np.sin(sub.ref)
+    s = np.arctan2(dy * cosRef - dx * sinRef, dx * cosRef + dy * sinRef).astype(np.float32)
+    s -= sub.a0
+    s /= sub.da
+    np.clip(s, 0, na - 1, out=s)
+    i = np.minimum(s.astype(np.intp), na - 2)
+    s -= i
+    index = i * nr + j
+    near = np.take(flat, index)
+    near += (np.take(flat, index + 1) - near) * t
+    far = np.take(flat, index + nr)
+    far += (np.take(flat, index + nr + 1) - far) * t
+    near += (far - near) * s
+    phase *= near
+    return phase
+
+#polar grid covering the image rectangle as seen from center, with a margin of a few samples
+#returns r0, nr, ref, a0, da, na for range step dr and azimuth step da, da None meaning a single beam
+def polarGrid(center, xCor, yCor, zOffset, dr, da, margin = 2):
+    x0, x1, y0, y1 = xCor.min(), xCor.max(), yCor.min(), yCor.max()
+    height = (center[2] - zOffset)**2
+    nearest = np.hypot(np.clip(center[0], x0, x1) - center[0], np.clip(center[1], y0, y1) - center[1])
+    cornersX = np.array([x0, x1, x1, x0]) - center[0]
+    cornersY = np.array([y0, y0, y1, y1]) - center[1]
+    farthest = np.hypot(cornersX, cornersY).max()
+    r0 = max(np.sqrt(nearest**2 + height) - margin * dr, 0)
+    nr = int(np.ceil((np.sqrt(farthest**2 + height) - r0) / dr)) + margin + 1
+    if da is None:
+        return r0, nr, 0, 0, 1, 1
+    if nearest == 0:
+        #center is over the image, every direction is needed
+        ref, low, high = 0, -np.pi, np.pi
+    else:
+        ref = np.arctan2((y0 + y1) / 2 - center[1], (x0 + x1) / 2 - center[0])
+        angles = wrapAngle(np.arctan2(cornersY, cornersX) - ref)
+        low, high = angles.min(), angles.max()
+    na = int(np.ceil((high - low) / da)) + 2 * margin + 1
+    return r0, nr, ref, low - margin * da, da, na
+
+#scan count, phase center and length of the subaperture made of children
+def aperture(children):
+    scans = sum(child.scans for child in children)
+    center = sum(child.center * child.scans for child in children) / scans
+    length = 2 * max(np.linalg.norm(child.center - center) + child.length / 2 for child in children)
+    return scans, center, length
+
+#azimuth step that keeps the range error of a subaperture of this length well under a wavelength
+def azimuthStep(length, wavelength, accuracy):
+    return None if length == 0 else wavelength / (4 * length * accuracy)
+
+def mergedGrid(children, xCor, yCor, zOffset, dr, wavelength, accuracy):
+    scans, center, length = aperture(children)
+    return polarGrid(center, xCor, yCor, zOffset, dr, azimuthStep(length, wavelength, accuracy))
+
+#subimage of the children summed on their common polar grid
+def merge(children, xCor, yCor, zOffset, dr, k, wavelength, accuracy):
+    scans, center, length = aperture(children)
+    r0, nr, ref, a0, da, na = polarGrid(center, xCor, yCor, zOffset, dr, azimuthStep(length, wavelength, accuracy))
+    distance = r0 + dr * np.arange(nr)
+    ground = np.sqrt(np.maximum(distance**2 - (center[2] - zOffset)**2, 0))
+    azimuth = ref + a0 + da * np.arange(na)
+    x = center[0] + np.cos(azimuth)[:, np.newaxis] * ground
+    y = center[1] + np.sin(azimuth)[:, np.newaxis] * ground
+    data = np.zeros((na, nr), np.complex64)
+    for child in children:
+        data += lookup(child, x, y, zOffset, k, distance)
+    return Subimage(center, length, scans, r0, dr, ref, a0, da, data)
+
+#analytic signal of each real row, complex rows are taken to be analytic already
+def analytic(data):
+    if np.iscomplexobj(data):
+        return data
+    spectrum = np.fft.fft(data, axis=1)
+    n = data.shape[1]
+    spectrum[:, 1:(n + 1) // 2] *= 2
+    spectrum[:, n // 2 + 1:] = 0
+    return np.fft.ifft(spectrum, axis=1)
+
+#center and highest frequency (Hz) of analytic echoes, from the power weighted mean and spread of their spectrum
+def bandEdges(data, dr):
+    power = (np.abs(np.fft.fft(data, axis=1))**2).sum(axis=0)
+    frequency = np.fft.fftfreq(data.shape[1], 2 * dr / SPEED_OF_LIGHT)
+    center = (frequency * power).sum() / power.sum()
+    spread = np.sqrt(((frequency - center)**2 * power).sum() / power.sum())
+    return center, abs(center) + 2 * spread
+
+#drop-in for BPRangeBin.paintImage, image rows follow yCor and columns follow xCor
+#factor scans or subapertures are merged per stage, accuracy oversamples the subimage azimuth grids
+#frequency is the carrier removed before interpolating and wavelength the shortest one in the echoes,
+#both estimated from the spectrum of datalist when not given
+#stages caps the number of merges, stages = 0 is direct backprojection of the same baseband data
+def paintImage(datalist, rangeBins, platformPos, xCor, yCor, zOffset = 0, factor = 4, accuracy = FFBP_ACCURACY,
+               frequency = None, wavelength = None, stages = None):
+    data = np.asarray(datalist)
+    data = data.astype(np.result_type(data.dtype, float), copy=False)
+    platformPos = np.asarray(platformPos, dtype=float)
+    xCor = np.asarray(xCor, dtype=float)
+    yCor = np.asarray(yCor, dtype=float)
+    rangeBins = np.asarray(rangeBins, dtype=float)
+    if not isUniform(rangeBins):
+        uniform = np.linspace(rangeBins[0], rangeBins[-1], len(rangeBins))
+        data = np.array([interpRange(uniform, rangeBins, row) for row in data])
+        rangeBins = uniform
+    dr = rangeBins[1] - rangeBins[0]
+    signal = analytic(data)
+    #silent scans have no spectrum to weigh, center and highest come out NaN
+    with np.errstate(invalid='ignore'):
+        center, highest = bandEdges(signal, dr)
+    if highest > 0:
+        frequency = center if frequency is None else frequency
+        wavelength = wavelength or SPEED_OF_LIGHT / highest
+    else:
+        #silent or constant scans (zero filled gaps) leave no band to size subimages by, they are backprojected directly
+        frequency, stages = frequency or 0, 0
+    #round trip wavenumber, the echo of a reflector at range r goes as exp(1j*k*r)
+    k = 4 * np.pi * frequency / SPEED_OF_LIGHT
+    pixels = len(xCor) * len(yCor)
+
+    baseband = (signal * np.exp(-1j * k * rangeBins)).astype(np.complex64)
+    subimages = [Subimage(position, 0, 1, rangeBins[0], dr, 0, 0, 1, row[np.newaxis, :])
+                 for position, row in zip(platformPos, baseband)]
+    stage = 0
+    while len(subimages) > 1 and (stages is None or stage < stages):
+        stage += 1
+        groups = [subimages[i:i+factor] for i in range(0, len(subimages), factor)]
+        #merging costs about one lookup per polar sample, imaging a subaperture one per pixel
+        r0, nr, ref, a0, da, na = mergedGrid(groups[0], xCor, yCor, zOffset, dr, wavelength, accuracy)
+        if nr * na * len(groups[0]) >= pixels * (len(groups[0]) - 1):
+            break
+        subimages = [merge(group, xCor, yCor, zOffset, dr, k, wavelength, accuracy) for group in groups]
+
+    x = xCor[np.newaxis, :]
+    y = yCor[:, np.newaxis]
+    image = np.zeros((len(yCor), len(xCor)), complex)
+    for sub in subimages:
+        image += lookup(sub, x, y, zOffset, k)
+    return image if np.iscomplexobj(data) else image.real
@@ -0,0 +1,32 @@
+import numpy as np
+import FastBackProjection
+import FactorizedBackProjection
+import SyntheticScene
+from BackProjectionBenchmark import timeit
+
+SCANS = 1000
+PIXEL = 0.01 #meters, a 1000x1000 image over the default 10x10 m scene
+
+#errors relative to the brightest reference pixel, rms over the whole image
+def imageError(image, reference):
+    peak = np.abs(reference).max()
+    return np.abs(image - reference).max() / peak, np.sqrt(np.mean(np.abs(image - reference)**2)) / peak
+
+if __name__ == "__main__":
+    scene = SyntheticScene.makeScene(SCANS, pixel=PIXEL)
+    args = (scene['scan_data'], scene['range_bins'], scene['platform_pos'], scene['x'], scene['y'])
+    print("{} scans onto {}x{} pixels".format(SCANS, len(scene['y']), len(scene['x'])))
+
+    directTime, direct = timeit(FastBackProjection.paintImage, *args)
+    print("direct (FastBackProjection):  {:8.2f} s".format(directTime))
+    #FFBP interpolates the baseband signal, so its factorization error is measured against direct
+    #backprojection of that same signal, stages = 0
+    basebandTime, baseband = timeit(FactorizedBackProjection.paintImage, *args, stages=0)
+    print("direct baseband:              {:8.2f} s  differs from linear direct by {:.1e} max".format(
+        basebandTime, imageError(direct, baseband)[0]))
+    for factor in (2, 4):
+        for accuracy in (1, 2, 4):
+            ffbpTime, image = timeit(FactorizedBackProjection.paintImage, *args, factor=factor, accuracy=accuracy)
+            maxError, rmsError = imageError(image, baseband)
+            print("ffbp factor {} accuracy {}:    {:8.2f} s  speedup {:5.1f}x  max error {:.1e}  rms error {:.1e}".format(
+                factor, accuracy, ffbpTime, directTime / ffbpTime, maxError, rmsError))
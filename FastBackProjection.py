@@ -0,0 +1,166 @@
+import numpy as np
+from Configuration import MEMORY_BUDGET, PRECISION
+from RangeInterp import isUniform, interpIndex, interpRange, imageType
+import Instrumentation
+
+#how many scans fit in one (K, ny, nx) block under the memory budget
+#each scan needs a fractional range index and an integer bin index per pixel
+def scansPerBlock(numPixels, numScans, memoryBudget = MEMORY_BUDGET):
+    return int(max(1, min(numScans, memoryBudget // (numPixels * 16))))
+
+#reusable scratch arrays for one block of scans, geometry is kept in the precision of dtype
+#compensated adds a running error term per pixel for Kahan summation
+class Workspace:
+    def __init__(self, scans, numSamples, numX, numY, dtype, compensated = False):
+        real = np.finfo(dtype).dtype
+        self.dx = np.empty((scans, numX), real)
+        self.dy = np.empty((scans, numY), real)
+        self.index = np.empty((scans, numY, numX), real)
+        self.bins = np.empty((scans, numY, numX), np.intp)
+        #real data packs intercept + 1j*slope into one complex table, complex data needs two
+        self.packed = not np.issubdtype(dtype, np.complexfloating)
+        tableType = np.result_type(real, np.complex64) if self.packed else dtype
+        self.intercept = np.empty((scans, numSamples), tableType)
+        self.slope = None if self.packed else np.empty((scans, numSamples), dtype)
+        self.gathered = np.empty((numY, numX), tableType)
+        self.gatheredSlope = None if self.packed else np.empty((numY, numX), dtype)
+        self.carry = np.zeros((numY, numX), dtype) if compensated else None
+        self.total = np.empty((numY, numX), dtype) if compensated else None
+
+#fractional range index of every pixel for scans start..start+k, in ws.index[:k]
+#coordinates are divided by the bin spacing up front so no later pass rescales
+def blockIndex(ws, platformPos, start, k, xCor, yCor, zOffset, r0, dr):
+    pos = platformPos[start:start+k] / dr
+    dx, dy, index = ws.dx[:k], ws.dy[:k], ws.index[:k]
+    np.subtract((xCor / dr)[np.newaxis, :], pos[:, 0:1], out=dx)
+    np.square(dx, out=dx)
+    np.subtract((yCor / dr)[np.newaxis, :], pos[:, 1:2], out=dy)
+    np.square(dy, out=dy)
+    dy += ((zOffset / dr - pos[:, 2])**2)[:, np.newaxis]
+    np.add(dy[:, :, np.newaxis], dx[:, np.newaxis, :], out=index)
+    np.sqrt(index, out=index)
+    return shiftIndex(index, platformPos[start:start+k], xCor, yCor, zOffset, r0, dr)
+
+#bin and fractional position of every pixel for scans start..start+k from a cached range index map, see
+#GeometryCache, bins go to ws.bins and fractions to ws.index, whole index when whole is set
+def cachedIndex(ws, rangeIndex, start, k, whole = False):
+    np.copyto(ws.bins[:k], rangeIndex['bin'][start:start+k])
+    index = ws.index[:k]
+    np.copyto(index, rangeIndex['fraction'][start:start+k])
+    if whole:
+        index += ws.bins[:k]
+    return index
+
+def shiftIndex(index, pos, xCor, yCor, zOffset, r0, dr):
+    if r0 != 0:
+        index -= r0 / dr
+    #np.interp clamps below the first bin, only needed if a pixel can be that close
+    if nearestDistance(pos, xCor, yCor, zOffset) < r0:
+        np.maximum(index, 0, out=index)
+    return index
+
+#closest any antenna in pos gets to the imaged rectangle
+def nearestDistance(pos, xCor, yCor, zOffset):
+    dx = np.maximum(np.maximum(xCor.min() - pos[:, 0], pos[:, 0] - xCor.max()), 0)
+    dy = np.maximum(np.maximum(yCor.min() - pos[:, 1], pos[:, 1] - yCor.max()), 0)
+    return np.sqrt(dx**2 + dy**2 + (zOffset - pos[:, 2])**2).min()
+
+#linear interpolation as value = intercept[i] + slope[i]*t with i = floor(t)
+#slope is zero in the last bin so indices past the end clamp like np.interp
+#fractional tables take t - i instead, the intercept is then the sample itself
+def blockTable(ws, data, start, k, fractional = False):
+    rows = data[start:start+k]
+    n = rows.shape[1]
+    slope = ws.intercept.imag[:k] if ws.packed else ws.slope[:k]
+    np.subtract(rows[:, 1:], rows[:, :-1], out=slope[:, :-1])
+    slope[:, -1] = 0
+    if fractional:
+        if ws.packed:
+            ws.intercept.real[:k] = rows
+        else:
+            ws.intercept[:k] = rows
+        return
+    steps = np.arange(n, dtype=slope.dtype)
+    if ws.packed:
+        ws.intercept.real[:k] = rows - slope * steps
+    else:
+        ws.intercept[:k] = rows - slope * steps
+
+#image += value, with Kahan summation when the workspace carries the rounding error of earlier adds
+def accumulate(image, ws, value):
+    if ws.carry is None:
+        image += value
+        return
+    value -= ws.carry
+    np.add(image, value, out=ws.total)
+    np.subtract(ws.total, image, out=ws.carry)
+    ws.carry -= value
+    image[...] = ws.total
+
+def paintBlock(image, ws, k):
+    for i in range(k):
+        t = ws.index[i]
+        np.take(ws.intercept[i], ws.bins[i], out=ws.gathered, mode='clip')
+        if ws.packed:
+            np.multiply(ws.gathered.imag, t, out=t)
+            t += ws.gathered.real
+            accumulate(image, ws, t)
+        else:
+            np.take(ws.slope[i], ws.bins[i], out=ws.gatheredSlope, mode='clip')
+            ws.gatheredSlope *= t
+            ws.gatheredSlope += ws.gathered
+            accumulate(image, ws, ws.gatheredSlope)
+
+#backprojection over blocks of scans, same result as BPRangeBin.paintImage
+#image rows follow yCor and columns follow xCor
+#rangeIndex can hold the precomputed range index map of these scans, grid and range bins, see GeometryCache
+#indexSink, when given, is called with each block's (k, ny, nx) range index in bins, in scan order, before it is used
+#mode picks the range interpolation, see RangeInterp
+#precision 'single' keeps scans and geometry in float32 and sums in float32/complex64, compensated sums with Kahan
+#BackProjectionBenchmark, 1000 scans onto 200x200 pixels on one core: about 2.1x the original per-scan np.interp loop
+#at the default budget and 3.2x in single precision, short of several-fold since every scan still gathers every
+#pixel from its table and bigger blocks only add cache misses; the numba backend (JitBackProjection, 3.3x on one
+#core) and ParallelBackProjection across cores are the faster paths
+def paintImage(datalist, rangeBins, platformPos, xCor, yCor, zOffset = 0, memoryBudget = MEMORY_BUDGET, rangeIndex = None,
+               mode = 'linear', precision = PRECISION, compensated = False, indexSink = None):
+    data = np.asarray(datalist)
+    platformPos = np.asarray(platformPos, dtype=float)
+    xCor = np.asarray(xCor, dtype=float)
+    yCor = np.asarray(yCor, dtype=float)
+    rangeBins = np.asarray(rangeBins, dtype=float)
+    numScans, numSamples = data.shape
+    dtype = imageType(data.dtype, precision)
+    data = data.astype(dtype, copy=False)
+    image = np.zeros((len(yCor), len(xCor)), dtype)
+
+    if not isUniform(rangeBins):
+        #the per scan loop only needs the Kahan carry, not the block buffers
+        ws = Workspace(0, 0, len(xCor), len(yCor), dtype, compensated)
+        for scan in range(numScans):
+            distance = np.sqrt((xCor[np.newaxis, :] - platformPos[scan][0])**2 + (yCor[:, np.newaxis] - platformPos[scan][1])**2
+                               + (zOffset - platformPos[scan][2])**2)
+            accumulate(image, ws, interpRange(distance, rangeBins, data[scan], mode))
+        return image
+
+    K = scansPerBlock(len(xCor) * len(yCor), numScans, memoryBudget)
+    ws = Workspace(K, numSamples, len(xCor), len(yCor), dtype, compensated)
+    r0, dr = rangeBins[0], rangeBins[1] - rangeBins[0]
+    for start in range(0, numScans, K):
+        k = min(K, numScans - start)
+        with Instrumentation.timer('distance'):
+            if rangeIndex is None:
+                index = blockIndex(ws, platformPos, start, k, xCor, yCor, zOffset, r0, dr)
+            else:
+                index = cachedIndex(ws, rangeIndex, start, k, whole=mode != 'linear')
+            if indexSink is not None:
+                indexSink(index)
+        with Instrumentation.timer('interpolation'):
+            if mode != 'linear':
+                for i in range(k):
+                    accumulate(image, ws, interpIndex(index[i], data[start + i], mode))
+                continue
+            if rangeIndex is None:
+                np.copyto(ws.bins[:k], index, casting='unsafe')
+            blockTable(ws, data, start, k, fractional=rangeIndex is not None)
+            paintBlock(image, ws, k)
+    return image
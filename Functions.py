@@ -1,14 +1,53 @@
 import math
-from matplotlib import pyplot as plt
+import os
+import glob
 import numpy as np
-from Configuration import SPEED_OF_LIGHT
+import Configuration
+from Configuration import SPEED_OF_LIGHT, SCAN_START, SCAN_RES, USER_SYSTEM
 from Point import Point
+from ScanArchive import load
 
 
 ##R = tc/2
 
+#a and b can be Points or PointSets, see PointSet.distance for the shapes
 def tou(a, b):
     return 2*(a.distance(b))/SPEED_OF_LIGHT
+
+#range of every sample in a scan, samples are SCAN_RES*1.907ps apart in round-trip time
+def scanRangeBins(numSamples, scanStart = SCAN_START, scanRes = SCAN_RES):
+    return scanStart + np.arange(numSamples) * scanRes * 1.907e-12 * SPEED_OF_LIGHT / 2
+
+#does nothing in place of a progress bar
+class NoProgress:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def __call__(self, *args):
+        pass
+
+#alive_bar(total) when PROGRESS is on, imported on first use so headless runs never load it
+def progress(total):
+    if not Configuration.PROGRESS:
+        return NoProgress()
+    from alive_progress import alive_bar
+    return alive_bar(total)
+
+#platform positions of the latest emulator run
+def readPlatformPos():
+    dir = os.path.dirname(__file__)
+    platPath = ""
+    if USER_SYSTEM == 'w':
+        platPath = os.path.join(dir, '..\\emulator\\output\\*')
+    else:
+        platPath = os.path.join(dir, '../emulator/output/*')
+    list_of_files = glob.glob(platPath) # * means all if need specific format then *.csv
+    latest_file = max(list_of_files, key=os.path.getctime)
+    platformPos = load(latest_file)['platform_pos']
+    return platformPos
 #grid = np.zeros((int(LENGTH), int(WIDTH)))
 #plt.imshow(grid, cmap='gray')
 
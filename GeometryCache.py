@@ -0,0 +1,185 @@
+import os
+import hashlib
+import numpy as np
+from Configuration import GEOMETRY_CACHE_DIR, GEOMETRY_CACHE_SIZE, MEMORY_BUDGET, PRECISION
+from RangeInterp import isUniform
+import FastBackProjection
+
+#bump when the stored layout changes so old entries stop matching
+VERSION = b'range-index-v2'
+#largest bin a map stores, scans with more samples are imaged without the cache
+MAX_BIN = np.iinfo(np.uint16).max
+
+#per scan record of a range index map: the bin every pixel falls in and its fractional position in that bin
+#6 bytes a pixel, against 8 for a float64 distance, and painting from it skips the distance and sqrt passes
+def indexType(numX, numY):
+    return np.dtype([('bin', np.uint16, (numY, numX)), ('fraction', np.float32, (numY, numX))])
+
+#fills records with a (k, ny, nx) range index in bins, scratch is a float64 array of at least that shape
+#bins past MAX_BIN are stored as MAX_BIN, the kernel clamps them to the last sample either way
+def storeIndex(records, index, scratch):
+    if index.max() > MAX_BIN:
+        index = np.minimum(index, MAX_BIN, out=scratch[:len(index)])
+    np.copyto(records['bin'], index, casting='unsafe')
+    np.subtract(index, records['bin'], out=records['fraction'])
+
+#streams a map to path block by block in scan order, under a temporary name until close so readers never see
+#half a map, write fits FastBackProjection's indexSink so a miss stores the map while it is being painted
+class IndexWriter:
+    def __init__(self, path, scans, numX, numY):
+        self.path = path
+        self.temp = path + '.{}.tmp'.format(os.getpid())
+        self.dtype = indexType(numX, numY)
+        self.records = np.empty(0, self.dtype)
+        self.scratch = None
+        self.file = open(self.temp, 'wb')
+        np.lib.format.write_array_header_1_0(self.file, {'descr': np.lib.format.dtype_to_descr(self.dtype),
+                                                         'fortran_order': False, 'shape': (scans,)})
+
+    def write(self, index):
+        k = len(index)
+        if len(self.records) < k:
+            self.records = np.empty(k, self.dtype)
+            self.scratch = np.empty(index.shape)
+        storeIndex(self.records[:k], index, self.scratch)
+        self.file.write(self.records[:k])
+
+    def close(self):
+        self.file.close()
+        os.replace(self.temp, self.path)
+
+    def discard(self):
+        self.file.close()
+        os.remove(self.temp)
+
+#on-disk cache of range index maps, one .npy per (trajectory, grid, zOffset, range bins)
+#entries are memory mapped on read and evicted least recently used first once the cache outgrows maxBytes
+#bins are exact and fractions float32, so a cached image matches an uncached one to about 1e-7 of a bin
+#a miss in paintImage stores the map the imaging pass computes anyway, rangeIndex builds one on its own
+class GeometryCache:
+    def __init__(self, directory = GEOMETRY_CACHE_DIR, maxBytes = GEOMETRY_CACHE_SIZE):
+        self.directory = directory
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+
+    #only the first bin and the spacing of the evenly spaced range bins change the map
+    def key(self, platformPos, xCor, yCor, rangeBins, zOffset = 0):
+        digest = hashlib.sha256(VERSION)
+        for array in (platformPos, xCor, yCor, [zOffset, rangeBins[0], rangeBins[1] - rangeBins[0]]):
+            array = np.ascontiguousarray(array, dtype=np.float64)
+            digest.update(str(array.shape).encode())
+            digest.update(array.tobytes())
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.npy')
+
+    #cached map or None, a hit marks the entry as recently used
+    def get(self, platformPos, xCor, yCor, rangeBins, zOffset = 0):
+        path = self.path(self.key(platformPos, xCor, yCor, rangeBins, zOffset))
+        try:
+            rangeIndex = np.load(path, mmap_mode='r')
+        except (FileNotFoundError, ValueError):
+            return None
+        os.utime(path)
+        return rangeIndex
+
+    #(scans,) records of indexType for evenly spaced rangeBins, computed and stored on a miss
+    def rangeIndex(self, platformPos, xCor, yCor, rangeBins, zOffset = 0):
+        rangeIndex = self.get(platformPos, xCor, yCor, rangeBins, zOffset)
+        if rangeIndex is not None:
+            self.hits += 1
+            return rangeIndex
+        self.misses += 1
+        return self.build(platformPos, xCor, yCor, rangeBins, zOffset)
+
+    #writer for a new entry, None when the map would not fit in the cache at all
+    def writer(self, platformPos, xCor, yCor, rangeBins, zOffset = 0):
+        size = len(platformPos) * indexType(len(xCor), len(yCor)).itemsize
+        if size > self.maxBytes:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        self.evict(self.maxBytes - size)
+        return IndexWriter(self.path(self.key(platformPos, xCor, yCor, rangeBins, zOffset)), len(platformPos),
+                           len(xCor), len(yCor))
+
+    def build(self, platformPos, xCor, yCor, rangeBins, zOffset = 0):
+        platformPos = np.asarray(platformPos, dtype=float)
+        xCor = np.asarray(xCor, dtype=float)
+        yCor = np.asarray(yCor, dtype=float)
+        writer = self.writer(platformPos, xCor, yCor, rangeBins, zOffset)
+        rangeIndex = np.empty(len(platformPos), indexType(len(xCor), len(yCor))) if writer is None else None
+        r0, dr = rangeBins[0], rangeBins[1] - rangeBins[0]
+        K = FastBackProjection.scansPerBlock(len(xCor) * len(yCor), len(platformPos), MEMORY_BUDGET)
+        ws = FastBackProjection.Workspace(K, 2, len(xCor), len(yCor), np.float64)
+        scratch = np.empty(ws.index.shape)
+        try:
+            for start in range(0, len(platformPos), K):
+                k = min(K, len(platformPos) - start)
+                index = FastBackProjection.blockIndex(ws, platformPos, start, k, xCor, yCor, zOffset, r0, dr)
+                if writer is None:
+                    storeIndex(rangeIndex[start:start+k], index, scratch)
+                else:
+                    writer.write(index)
+        except BaseException:
+            if writer is not None:
+                writer.discard()
+            raise
+        if writer is None:
+            return rangeIndex
+        writer.close()
+        return np.load(writer.path, mmap_mode='r')
+
+    def entries(self):
+        if not os.path.isdir(self.directory):
+            return []
+        paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.npy')]
+        return sorted((os.stat(path).st_mtime, os.stat(path).st_size, path) for path in paths)
+
+    #drops least recently used maps until the cache holds at most maxBytes
+    def evict(self, maxBytes = None):
+        maxBytes = self.maxBytes if maxBytes is None else maxBytes
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= maxBytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        self.evict(0)
+
+#backprojection that reuses cached geometry for a repeated flight path and grid
+#unevenly spaced range bins have no index map and are imaged without the cache
+def paintImage(datalist, rangeBins, platformPos, xCor, yCor, zOffset = 0, cache = None, precision = PRECISION,
+               compensated = False):
+    rangeBins = np.asarray(rangeBins, dtype=float)
+    if not isUniform(rangeBins) or len(rangeBins) > MAX_BIN + 1:
+        return FastBackProjection.paintImage(datalist, rangeBins, platformPos, xCor, yCor, zOffset, precision=precision,
+                                             compensated=compensated)
+    cache = cache or GeometryCache()
+    rangeIndex = cache.get(platformPos, xCor, yCor, rangeBins, zOffset)
+    if rangeIndex is not None:
+        cache.hits += 1
+        return FastBackProjection.paintImage(datalist, rangeBins, platformPos, xCor, yCor, zOffset, rangeIndex=rangeIndex,
+                                             precision=precision, compensated=compensated)
+    #a miss paints as usual and stores each block's map on the way instead of building it in a pass of its own
+    #single precision geometry is cheap enough that storing it never pays back, so only double precision misses
+    #store, and their exact maps serve both precisions
+    cache.misses += 1
+    writer = cache.writer(platformPos, xCor, yCor, rangeBins, zOffset) if precision == 'double' else None
+    try:
+        image = FastBackProjection.paintImage(datalist, rangeBins, platformPos, xCor, yCor, zOffset, precision=precision,
+                                              compensated=compensated, indexSink=writer and writer.write)
+    except BaseException:
+        if writer is not None:
+            writer.discard()
+        raise
+    if writer is not None:
+        writer.close()
+    return image
@@ -0,0 +1,26 @@
+import tempfile
+import numpy as np
+import FastBackProjection
+import GeometryCache
+from BackProjectionBenchmark import makeScene, timeit, REPEATS
+
+RUNS = 5 #repeat runs over the same flight path and grid, the case the cache is for
+
+if __name__ == "__main__":
+    scene = makeScene()
+    datalist, rangeBins, platformPos, xPos, yPos = scene
+    print("{} scans onto {}x{} pixels, {} runs of the same flight".format(len(datalist), len(yPos), len(xPos), RUNS))
+    with tempfile.TemporaryDirectory() as directory:
+        #the single precision runs reuse the map the double precision ones stored
+        cache = GeometryCache.GeometryCache(directory)
+        for precision in ('double', 'single'):
+            uncachedTime, reference = timeit(FastBackProjection.paintImage, *scene, precision=precision, repeats=REPEATS)
+            firstTime, image = timeit(GeometryCache.paintImage, *scene, cache=cache, precision=precision)
+            hitTime, image = timeit(GeometryCache.paintImage, *scene, cache=cache, precision=precision, repeats=REPEATS)
+            error = np.abs(image - reference).max() / np.abs(reference).max()
+            size = cache.entries()[-1][1]
+            print("{:6s} uncached {:6.2f} s  first run {:6.2f} s  cached {:6.2f} s  map {:5.0f} MB  max rel error {:.1e}".format(
+                precision, uncachedTime, firstTime, hitTime, size / 2**20, error))
+            print("{:6s} {} runs: {:6.2f} s uncached, {:6.2f} s cached, {:4.2f}x".format(
+                precision, RUNS, RUNS * uncachedTime, firstTime + (RUNS - 1) * hitTime,
+                RUNS * uncachedTime / (firstTime + (RUNS - 1) * hitTime)))
@@ -0,0 +1,138 @@
+import os
+import json
+import zlib
+import queue
+import struct
+import logging
+import threading
+import numpy as np
+import Instrumentation
+try:
+    from PIL import Image
+except ImportError:
+    #JPEG needs Pillow, without it thumbnails are written as PNG
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+#writes images straight from arrays: grayscale PNG/JPEG thumbnails without building a matplotlib figure,
+#and the image data itself as compressed .npz or as a memory mappable .npy with a JSON sidecar
+
+#8-bit grayscale of |image|, row 0 at the top the way files are read, so the first yCor ends up at the
+#bottom like imshow(origin='lower')
+#scale 'db' maps the top dynamicRange dB to 0..255, 'linear' maps 0..max
+def scaleImage(image, scale = 'db', dynamicRange = 40):
+    magnitude = np.abs(image)
+    peak = magnitude.max()
+    if peak == 0:
+        return np.zeros(magnitude.shape, np.uint8)
+    if scale == 'db':
+        level = 20 * np.log10(np.maximum(magnitude / peak, 1e-12))
+        level = (level + dynamicRange) / dynamicRange
+    elif scale == 'linear':
+        level = magnitude / peak
+    else:
+        raise ValueError("unknown scale {}, pick db or linear".format(scale))
+    return np.round(np.clip(level, 0, 1) * 255).astype(np.uint8)[::-1]
+
+def pngChunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+#8-bit grayscale PNG, every row with filter type 0
+def writePNG(path, gray):
+    height, width = gray.shape
+    rows = np.zeros((height, width + 1), np.uint8)
+    rows[:, 1:] = gray
+    header = struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n' + pngChunk(b'IHDR', header) + pngChunk(b'IDAT', zlib.compress(rows.tobytes(), 6))
+                + pngChunk(b'IEND', b''))
+    return path
+
+#thumbnail of image at path, the extension picks PNG or JPEG, returns the path actually written
+def writeThumbnail(path, image, scale = 'db', dynamicRange = 40, quality = 90):
+    gray = scaleImage(image, scale, dynamicRange)
+    with Instrumentation.timer('render'):
+        if path.lower().endswith(('.jpg', '.jpeg')):
+            if Image is not None:
+                Image.fromarray(gray, 'L').save(path, quality=quality)
+                return path
+            path = os.path.splitext(path)[0] + '.png'
+            logger.warning("Pillow is not installed, writing {} instead of a JPEG".format(path))
+        return writePNG(path, gray)
+
+#img, x and y of an imaging result plus any other JSON-able entries as metadata
+#.npz is compressed, .npy is written so it can be opened with mmap_mode and gets x, y and metadata in path.json
+def saveImageData(path, result):
+    meta = {key: value for key, value in result.items() if key not in ('img', 'x', 'y')}
+    if not path.endswith(('.npy', '.npz')):
+        path += '.npz'
+    with Instrumentation.timer('save'):
+        if path.endswith('.npy'):
+            image = np.lib.format.open_memmap(path, 'w+', result['img'].dtype, result['img'].shape)
+            image[:] = result['img']
+            image.flush()
+            del image
+            with open(path + '.json', 'w') as f:
+                json.dump(dict(meta, x=np.asarray(result['x']).tolist(), y=np.asarray(result['y']).tolist()), f, default=str)
+        else:
+            np.savez_compressed(path, img=result['img'], x=result['x'], y=result['y'], meta=json.dumps(meta, default=str))
+    Instrumentation.count('bytes_written', os.path.getsize(path))
+    return path
+
+#result dict back from saveImageData, a .npy image comes back memory mapped
+def loadImageData(path):
+    if path.endswith('.npy'):
+        with open(path + '.json') as f:
+            result = json.load(f)
+        result['img'] = np.load(path, mmap_mode='r')
+        result['x'], result['y'] = np.asarray(result['x']), np.asarray(result['y'])
+        return result
+    with np.load(path) as data:
+        result = json.loads(str(data['meta']))
+        result.update(img=data['img'], x=data['x'], y=data['y'])
+    return result
+
+#runs exports on a background thread so the next image can start right away
+#submit(result, dataPath, thumbnailPath) copies nothing, the caller must not change result['img'] afterwards
+#at most backlog exports wait, submit blocks beyond that so a fast imager cannot pile up images in memory
+class Exporter:
+    def __init__(self, scale = 'db', dynamicRange = 40, backlog = 4):
+        self.scale = scale
+        self.dynamicRange = dynamicRange
+        self.queue = queue.Queue(backlog)
+        self.written = []
+        self.errors = []
+        self.worker = threading.Thread(target=self.run, daemon=True)
+        self.worker.start()
+
+    def submit(self, result, dataPath = None, thumbnailPath = None):
+        self.queue.put((result, dataPath, thumbnailPath))
+
+    def run(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            result, dataPath, thumbnailPath = job
+            try:
+                if dataPath:
+                    self.written.append(saveImageData(dataPath, result))
+                if thumbnailPath:
+                    self.written.append(writeThumbnail(thumbnailPath, result['img'], self.scale, self.dynamicRange))
+            except Exception as error:
+                #a bad result must not stop the worker, later submits would block on the full queue
+                logger.error("Export failed: {}".format(error))
+                self.errors.append(error)
+
+    #waits for everything submitted, returns the paths written
+    def close(self):
+        self.queue.put(None)
+        self.worker.join()
+        return self.written
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,81 @@
+import time
+import pickle as pkl
+import importlib
+import numpy as np
+import Configuration
+import Instrumentation
+from Functions import readPlatformPos, scanRangeBins
+from ScanArchive import load
+
+#imaging methods by name, each module has a paintImage with the BPRangeBin signature
+#modules are imported on first use, so numba or a process pool only load when asked for
+METHODS = {
+    'fast': 'FastBackProjection',
+    'jit': 'JitBackProjection',
+    'parallel': 'ParallelBackProjection',
+    'cached': 'GeometryCache',
+    'ffbp': 'FactorizedBackProjection',
+    'omegak': 'RangeMigration',
+    'pyramid': 'MultiResolution',
+    'reference': 'BPRangeBin',
+}
+
+def imager(method):
+    if method not in METHODS:
+        raise ValueError("unknown imaging method {}, pick one of {}".format(method, ", ".join(METHODS)))
+    return importlib.import_module(METHODS[method]).paintImage
+
+#pixel centers of the scene, COORDINATES and the resolutions are read when called so overrides apply
+def sceneGrid(coordinates = None, rangeResolution = None, crossRangeResolution = None):
+    coordinates = coordinates or Configuration.COORDINATES
+    xPos = np.arange(coordinates[0], coordinates[1], crossRangeResolution or Configuration.CROSS_RANGE_RESOLUTION)
+    yPos = np.arange(coordinates[2], coordinates[3], rangeResolution or Configuration.RANGE_RESOLUTION)
+    return xPos, yPos
+
+#image of the scans in source, a path ScanArchive.load understands or a dict like the marathon pickles
+#platform positions and range bins come from the source when it has them, otherwise from the latest
+#emulator run and the sample spacing
+#returns a dict like the saved image pickles, img, x and y, plus the method and seconds taken
+def imageScans(source, method = 'jit', xCor = None, yCor = None, zOffset = 0, **kwargs):
+    data = load(source) if isinstance(source, str) else source
+    datalist = data['scan_data']
+    platformPos = data['platform_pos'] if 'platform_pos' in data else readPlatformPos()
+    rangeBins = data['range_bins'] if 'range_bins' in data else scanRangeBins(len(datalist[0]), 0)
+    if xCor is None or yCor is None:
+        xCor, yCor = sceneGrid()
+    paintImage = imager(method)
+    start = time.perf_counter()
+    with Instrumentation.timer('imaging', memory=True):
+        image = paintImage(datalist, rangeBins, platformPos, xCor, yCor, zOffset, **kwargs)
+    Instrumentation.count('scans_imaged', len(datalist))
+    Instrumentation.count('pixel_scans', len(datalist) * image.size)
+    return {'img': image, 'x': xCor, 'y': yCor, 'method': method, 'seconds': time.perf_counter() - start}
+
+#.pkl keeps the old pickled dict, anything else goes through ImageExport.saveImageData (.npz or memmapped .npy)
+def saveImage(path, result):
+    if not path.endswith('.pkl'):
+        import ImageExport
+        return ImageExport.saveImageData(path, result)
+    with Instrumentation.timer('save'), open(path, 'wb') as f:
+        pkl.dump(result, f)
+        Instrumentation.count('bytes_written', f.tell())
+    return path
+
+#matplotlib view of an imageScans result, saved to savePath and/or shown, matplotlib is imported here only
+def plotImage(result, title = '', savePath = None, show = True):
+    with Instrumentation.timer('import_matplotlib'):
+        import matplotlib.pyplot as plt
+    x, y = result['x'], result['y']
+    extent = [x[0], x[-1], y[0], y[-1]]
+    plt.figure()
+    plt.imshow(np.abs(result['img']), cmap='gray', origin='lower', extent=extent)
+    plt.colorbar()
+    plt.xlabel("x-axis (meters/{} pixels)".format(len(x)))
+    plt.ylabel("y-axis (meters/{} pixels)".format(len(y)))
+    plt.title(title)
+    if savePath:
+        with Instrumentation.timer('render'):
+            plt.savefig(savePath)
+    if show:
+        plt.show()
+    plt.close()
@@ -0,0 +1,139 @@
+import sys
+import json
+import time
+import logging
+import threading
+import Configuration
+try:
+    import resource
+except ImportError:
+    #not on windows, memory peaks read as 0 there
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+#stage timers, counters and memory high-water marks shared by capture and imaging
+#with Instrumentation.timer('decode'):  ...     time a stage
+#Instrumentation.count('datagrams_received')   count events or bytes
+#snapshot() / dump(path) / startLogging(seconds) to read them out
+#while disabled timer() hands back one shared do-nothing context and count() returns at the flag check,
+#so instrumented hot paths cost a function call
+enabled = Configuration.INSTRUMENT
+timers = {} #name -> [calls, seconds, longest]
+counters = {}
+stagePeaks = {} #name -> process peak memory when the stage last ended, for timers asked to record it
+started = time.perf_counter()
+lock = threading.Lock()
+reporter = None
+
+#highest resident memory of the process so far, in bytes
+def peakMemory():
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+class Timer:
+    __slots__ = ('name', 'memory', 'start')
+
+    def __init__(self, name, memory):
+        self.name = name
+        self.memory = memory
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        with lock:
+            entry = timers.get(self.name)
+            if entry is None:
+                entry = timers[self.name] = [0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] = max(entry[2], elapsed)
+            if self.memory:
+                stagePeaks[self.name] = peakMemory()
+
+class NoTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+NO_TIMER = NoTimer()
+
+#context that adds its duration to the stage name, memory also records the memory peak when it ends
+#(a system call, meant for coarse stages such as imaging a whole pass rather than per datagram work)
+def timer(name, memory = False):
+    return Timer(name, memory) if enabled else NO_TIMER
+
+def count(name, amount = 1):
+    if enabled:
+        with lock:
+            counters[name] = counters.get(name, 0) + amount
+
+def enable(on = True):
+    global enabled
+    enabled = on
+
+def reset():
+    global started
+    with lock:
+        timers.clear()
+        counters.clear()
+        stagePeaks.clear()
+        started = time.perf_counter()
+
+#everything measured since the last reset as plain JSON-able values
+def snapshot():
+    with lock:
+        elapsed = time.perf_counter() - started
+        return {
+            'elapsed': elapsed,
+            'timers': {name: {'calls': calls, 'seconds': seconds, 'mean': seconds / calls, 'longest': longest}
+                       for name, (calls, seconds, longest) in timers.items()},
+            'counters': {name: {'total': total, 'per_second': total / elapsed if elapsed else 0}
+                         for name, total in counters.items()},
+            'memory': {'peak': peakMemory(), 'stages': dict(stagePeaks)},
+        }
+
+def dump(path):
+    with open(path, 'w') as f:
+        json.dump(snapshot(), f, indent=1)
+
+#one line per stage and counter, busiest stages first
+def summary():
+    state = snapshot()
+    lines = ["{:.1f} s elapsed, peak memory {:.1f} MB".format(state['elapsed'], state['memory']['peak'] / 2**20)]
+    for name, entry in sorted(state['timers'].items(), key=lambda item: -item[1]['seconds']):
+        lines.append("  {:24s} {:9.3f} s  {:8d} calls  {:10.1f} us mean".format(
+            name, entry['seconds'], entry['calls'], 1e6 * entry['mean']))
+    for name, entry in sorted(state['counters'].items()):
+        lines.append("  {:24s} {:12d}  {:10.1f}/s".format(name, entry['total'], entry['per_second']))
+    return "\n".join(lines)
+
+def report(interval, stop):
+    while not stop.wait(interval):
+        logger.info("\n" + summary())
+
+#logs summary() every interval seconds from a background thread until stopLogging
+def startLogging(interval = None):
+    global reporter
+    interval = interval or Configuration.INSTRUMENT_LOG
+    if reporter is not None or not interval:
+        return
+    stop = threading.Event()
+    reporter = (threading.Thread(target=report, args=(interval, stop), daemon=True), stop)
+    reporter[0].start()
+
+def stopLogging():
+    global reporter
+    if reporter is not None:
+        reporter[1].set()
+        reporter[0].join()
+        reporter = None
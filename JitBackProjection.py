@@ -0,0 +1,73 @@
+import numpy as np
+from Configuration import BACKEND, PRECISION
+from RangeInterp import isUniform, imageType
+import FastBackProjection
+
+#numba is optional, without it every backend falls back to FastBackProjection
+try:
+    import numba
+except ImportError:
+    numba = None
+
+BACKENDS = ('auto', 'numba', 'numpy')
+
+if numba is not None:
+    #one image row per thread, scans outer so each row walks a scan's samples in order
+    #compiled on first use and cached next to the module so later runs skip compilation
+    #with compensated, carry holds what rounding to the image's precision dropped from each pixel (Kahan), in
+    #carryType, the double precision type of the image
+    @numba.njit(parallel=True, cache=True)
+    def paintKernel(image, data, platformPos, xCor, yCor, zOffset, r0, dr, nearest, compensated, carryType):
+        numScans, numSamples = data.shape
+        for row in numba.prange(len(yCor)):
+            carry = np.zeros(len(xCor), carryType)
+            for scan in range(numScans):
+                x = platformPos[scan, 0]
+                offset = (yCor[row] - platformPos[scan, 1])**2 + (zOffset - platformPos[scan, 2])**2
+                for column in range(len(xCor)):
+                    t = (np.sqrt((xCor[column] - x)**2 + offset) - r0) / dr
+                    if t <= 0:
+                        value = data[scan, 0]
+                    elif t >= numSamples - 1:
+                        value = data[scan, numSamples - 1]
+                    elif nearest:
+                        value = data[scan, int(t + 0.5)]
+                    else:
+                        i = int(t)
+                        value = data[scan, i] + (data[scan, i + 1] - data[scan, i]) * (t - i)
+                    if compensated:
+                        value -= carry[column]
+                        old = image[row, column]
+                        image[row, column] = old + value
+                        carry[column] = (image[row, column] - old) - value
+                    else:
+                        image[row, column] += value
+
+#backend that would run for this setting
+def resolve(backend = BACKEND):
+    if backend not in BACKENDS:
+        raise ValueError("backend must be one of {}, not {}".format(BACKENDS, backend))
+    if backend == 'numba' and numba is None:
+        raise ImportError("the numba backend needs numba installed (pip install numba)")
+    if backend == 'auto':
+        return 'numba' if numba is not None else 'numpy'
+    return backend
+
+#drop-in for BPRangeBin.paintImage on the configured backend, image rows follow yCor and columns follow xCor
+#mode is 'linear' or 'nearest', other modes and unevenly spaced range bins go to FastBackProjection
+#precision and compensated work as in FastBackProjection, geometry stays in double precision here
+def paintImage(datalist, rangeBins, platformPos, xCor, yCor, zOffset = 0, mode = 'linear', backend = BACKEND,
+               precision = PRECISION, compensated = False):
+    rangeBins = np.asarray(rangeBins, dtype=float)
+    if resolve(backend) == 'numpy' or mode not in ('linear', 'nearest') or not isUniform(rangeBins):
+        return FastBackProjection.paintImage(datalist, rangeBins, platformPos, xCor, yCor, zOffset, mode=mode,
+                                             precision=precision, compensated=compensated)
+    data = np.asarray(datalist)
+    data = np.ascontiguousarray(data, dtype=imageType(data.dtype, precision))
+    platformPos = np.ascontiguousarray(platformPos, dtype=float)
+    xCor = np.ascontiguousarray(xCor, dtype=float)
+    yCor = np.ascontiguousarray(yCor, dtype=float)
+    image = np.zeros((len(yCor), len(xCor)), data.dtype)
+    paintKernel(image, data, platformPos, xCor, yCor, float(zOffset), rangeBins[0], rangeBins[1] - rangeBins[0],
+                mode == 'nearest', compensated, imageType(data.dtype).type)
+    return image
@@ -0,0 +1,39 @@
+import numpy as np
+from Configuration import SCAN_COUNT
+from Functions import scanRangeBins
+import Interp
+import BackProjection
+import FastBackProjection
+import JitBackProjection
+from BackProjectionBenchmark import makeScene, timeit
+
+if __name__ == "__main__":
+    #the script paintImage functions loop over SCAN_COUNT scans
+    datalist, rangeBins, platformPos, xPos, yPos = makeScene(scans=SCAN_COUNT)
+    print("{} scans onto {}x{} pixels, numba {}".format(SCAN_COUNT, len(yPos), len(xPos),
+                                                        "installed" if JitBackProjection.numba else "not installed"))
+
+    interpTime, image = timeit(Interp.paintImage, datalist, rangeBins, platformPos, xPos, yPos)
+    print("Interp.paintImage:           {:8.2f} s".format(interpTime))
+    #BackProjection.paintImage picks nearest bins on its own range axis
+    nearestBins = scanRangeBins(len(datalist[0]), 0)
+    nearestTime, nearest = timeit(BackProjection.paintImage, datalist, platformPos, xPos, yPos)
+    print("BackProjection.paintImage:   {:8.2f} s".format(nearestTime))
+    blockTime, linear = timeit(FastBackProjection.paintImage, datalist, rangeBins, platformPos, xPos, yPos)
+    print("FastBackProjection:          {:8.2f} s".format(blockTime))
+
+    for backend in ('numpy', 'numba'):
+        if backend == 'numba' and JitBackProjection.numba is None:
+            continue
+        #the first numba call compiles or loads the cached kernel
+        for run in ('first', 'second'):
+            jitTime, image = timeit(JitBackProjection.paintImage, datalist, rangeBins, platformPos, xPos, yPos,
+                                    backend=backend)
+            error = np.abs(image - linear).max() / np.abs(linear).max()
+            print("{:5s} linear  {:6s} call: {:8.2f} s  {:5.1f}x Interp  max rel error {:.1e}".format(
+                backend, run, jitTime, interpTime / jitTime, error))
+        jitTime, image = timeit(JitBackProjection.paintImage, datalist, nearestBins, platformPos, xPos, yPos,
+                                mode='nearest', backend=backend)
+        error = np.abs(image - nearest).max() / np.abs(nearest).max()
+        print("{:5s} nearest:            {:8.2f} s  {:5.1f}x BackProjection  max rel error {:.1e}".format(
+            backend, jitTime, nearestTime / jitTime, error))
@@ -0,0 +1,143 @@
+import struct
+import numpy as np
+from Configuration import SPEED_OF_LIGHT
+
+#every message starts with type and id
+HEADER = struct.Struct('>HH')
+HEADER_FIELDS = ('message_type', 'message_id')
+
+#message type -> (layout after the header, field names)
+#layouts follow the P440 MRM API, all big-endian
+MESSAGES = {
+    #requests
+    0x1001: ('IiiHH4H4BBBBB', ('node_id', 'scan_start', 'scan_end', 'scan_res', 'base_integration_index',
+                               'segment_1_samples', 'segment_2_samples', 'segment_3_samples', 'segment_4_samples',
+                               'segment_1_integration', 'segment_2_integration', 'segment_3_integration',
+                               'segment_4_integration', 'antenna_mode', 'transmit_gain', 'code_channel',
+                               'persist_flag')),
+    0x1002: ('', ()),
+    0x1003: ('HHI', ('scan_count', 'reserved', 'scan_interval_time')),
+    0x1004: ('4BHH', ('ip_1', 'ip_2', 'ip_3', 'ip_4', 'ip_port', 'reserved')),
+    0x1005: ('', ()),
+    0x1006: ('HBB', ('filter_mask', 'motion_filter_index', 'reserved')),
+    0x1007: ('', ()),
+    0xF001: ('', ()),
+    0xF002: ('', ()),
+    0xF003: ('I', ('operational_mode',)),
+    0xF005: ('I', ('sleep_mode',)),
+    0xF006: ('', ()),
+    0xFFFE: ('BHIbhi', ('uint8_val', 'uint16_val', 'uint32_val', 'int8_val', 'int16_val', 'int32_val')),
+    #confirms
+    0x1101: ('I', ('status',)),
+    0x1102: ('IiiHHBBBBII', ('node_id', 'scan_start', 'scan_end', 'scan_res', 'base_integration_index',
+                             'antenna_mode', 'transmit_gain', 'code_channel', 'persist_flag', 'timestamp',
+                             'status')),
+    0x1103: ('I', ('status',)),
+    0x1104: ('I', ('connection_status',)),
+    0x1105: ('I', ('status',)),
+    0x1106: ('I', ('status',)),
+    0x1107: ('HBBI', ('filter_mask', 'motion_filter_index', 'reserved', 'status')),
+    #big-endian and 64 bytes like every other message in the API (serial number 16:20, status 60:64), the old
+    #client decoded it little-endian with a 6 byte serial number, which put every later field 2 bytes off
+    0xF101: ('BBHBBHBBBBIBBBBi32sI', ('mrm_version_major', 'mrm_version_minor', 'mrm_version_build',
+                                     'uwb_kernel_major', 'uwb_kernel_minor', 'uwb_kernel_build',
+                                     'fpga_firmware_version', 'fpga_firmware_year', 'fpga_firmware_month',
+                                     'fpga_firmware_day', 'serial_number', 'board_revision',
+                                     'power_on_bit_test_result', 'board_type', 'transmitter_configuration',
+                                     'temperature', 'package_version', 'status')),
+    0xF102: ('', ()),
+    0xF103: ('II', ('operational_mode', 'status')),
+    0xF105: ('I', ('status',)),
+    0xF106: ('II', ('sleep_mode', 'status')),
+    0xF201: ('II16xiihBxBBHIHH', ('source_id', 'timestamp', 'scan_start', 'scan_stop', 'scan_step', 'scan_type',
+                                  'antenna_id', 'operational_mode', 'num_samples_message', 'num_samples_total',
+                                  'message_index', 'num_messages_total')),
+    0xFFFF: ('BHIbhi15sI', ('uint8_val', 'uint16_val', 'uint32_val', 'int8_val', 'int16_val', 'int32_val',
+                            'char[15]', 'status')),
+}
+
+SCAN_INFO = 0xF201
+SAMPLE_TYPE = np.dtype('>i4')
+
+#precompiled layouts and names including the header
+LAYOUTS = {t: struct.Struct('>HH' + fmt) for t, (fmt, _) in MESSAGES.items()}
+FIELDS = {t: HEADER_FIELDS + names for t, (_, names) in MESSAGES.items()}
+SCAN_HEADER = LAYOUTS[SCAN_INFO]
+SCAN_FIELDS = FIELDS[SCAN_INFO]
+
+STATUS_CODES = {0: "Success", 1: "Generic Failure", 2: "Wrong Op Mode", 3: "Unsupported Value",
+                4: "Invalid During Sleep", 5: "Wrong Message Size", 6: "Not Enabled", 7: "Wrong Buffer Size"}
+CONNECTION_CODES = {0: "Successful", 1: "General Error"}
+
+#Error Code Reader
+def errorCode(code):
+    print(STATUS_CODES.get(code, "Unrecognized Message Type"))
+
+#connection status reader
+def connectionstatus(code):
+    print(CONNECTION_CODES.get(code, "MRM already in use"))
+
+#packs a message into buf at offset, fields start with the message id
+def encodeInto(buf, offset, messageType, *fields):
+    LAYOUTS[messageType].pack_into(buf, offset, messageType, *fields)
+    return LAYOUTS[messageType].size
+
+#packs a message into new bytes, callers can keep or resend it while other messages are encoded
+def encode(messageType, *fields):
+    return LAYOUTS[messageType].pack(messageType, *fields)
+
+def makeDecoder(messageType):
+    layout = LAYOUTS[messageType]
+    names = FIELDS[messageType]
+    def decode(data):
+        return dict(zip(names, layout.unpack_from(data)))
+    return decode
+
+#F201
+def decodeScan(data):
+    m = dict(zip(SCAN_FIELDS, SCAN_HEADER.unpack_from(data)))
+    #view over the datagram, no per-sample conversion
+    m['scan_data'] = np.frombuffer(data, SAMPLE_TYPE, m['num_samples_message'], SCAN_HEADER.size)
+    return m
+
+DECODERS = {t: makeDecoder(t) for t in MESSAGES}
+DECODERS[SCAN_INFO] = decodeScan
+
+#mainDecoder
+#raises struct.error for a datagram shorter than its type's layout
+def decodeMessage(data):
+    decoder = DECODERS.get(HEADER.unpack_from(data)[0])
+    if decoder is None:
+        return dict(zip(HEADER_FIELDS, HEADER.unpack_from(data)))
+    return decoder(data)
+
+#FFFE
+def encodeCommConf(messageID):
+    return encode(0xFFFE, messageID, 1, 2, 3, -1, -2, -3)
+
+#1001
+def encodeSetConf(messageID, scanStart, scanEnd, scanRes, baseInter):
+    node_id = 1
+    scanEnd = int(scanEnd*2e12/SPEED_OF_LIGHT)
+    ant_mode = 2 #2: B->A 3: A->B
+    tx_gain_ind = 32 #0-63
+    codeChannel = 7 #0-10
+    persistFlag = 0 #0 - not persist 1 - will persist
+    return encode(0x1001, messageID, node_id, scanStart, scanEnd, scanRes, baseInter,
+                  0, 0, 0, 0, 0, 0, 0, 0, ant_mode, tx_gain_ind, codeChannel, persistFlag)
+
+#1002
+def encodeGetConf(messageID):
+    return encode(0x1002, messageID)
+
+#1003
+def encodeCtrlReq(messageID, scanCount, scanIntTime = 0):
+    return encode(0x1003, messageID, scanCount, 0, scanIntTime)
+
+#1004
+def encodeServerConnect(messageID, ipAddress = "127.0.0.1", port = 21210):
+    return encode(0x1004, messageID, *[int(part) for part in ipAddress.split(".")], port, 0)
+
+#1005
+def encodeServerDisconnect(messageID):
+    return encode(0x1005, messageID)
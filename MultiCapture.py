@@ -0,0 +1,111 @@
+import os
+import time
+import asyncio
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import Configuration
+import client
+
+#captures from several radars at once, each through its own RadarSession, so every radar has its own socket,
+#message id space and ScanAssembler, and its scans go to its own capture in folder
+#radars are dealt round robin to worker processes, each process runs its share concurrently on one event loop
+#python MultiCapture.py out 127.0.0.1:21210 127.0.0.1:21211 --workers 2
+#python MultiCapture.py out 127.0.0.1:21410 127.0.0.1:21411 127.0.0.1:21412 --emulate     local stand-ins
+
+#(host, port) from 'host:port' or a bare port on localhost
+def parseRadar(text):
+    host, _, port = text.rpartition(':')
+    return host or "127.0.0.1", int(port)
+
+def capturePath(folder, host, port):
+    return os.path.join(folder, "radar_{}_{}.capture".format(host, port))
+
+#per radar summary, the assembler counters or the error that ended its capture
+def summarize(radar, path, assembler):
+    host, port = radar
+    if isinstance(assembler, BaseException):
+        return {'host': host, 'port': port, 'path': path, 'error': repr(assembler)}
+    return {'host': host, 'port': port, 'path': path, 'completed': assembler.completed,
+            'incomplete': len(assembler.gaps), 'late': assembler.late, 'duplicates': assembler.duplicates}
+
+#one worker's radars, captured concurrently, a radar that fails does not stop the others
+async def captureGroup(radars, folder):
+    paths = [capturePath(folder, host, port) for host, port in radars]
+    assemblers = await asyncio.gather(*[client.capture(path, host, port) for path, (host, port) in zip(paths, radars)],
+                                      return_exceptions=True)
+    return [summarize(radar, path, assembler) for radar, path, assembler in zip(radars, paths, assemblers)]
+
+#worker process entry, settings carries the parent's overrides since spawned processes start from the defaults
+def runGroup(radars, folder, settings):
+    Configuration.override(settings)
+    return asyncio.run(captureGroup(radars, folder))
+
+#captures every radar in radars [(host, port)] into folder, returns their summaries in the same order
+#workers defaults to WORKERS, never more processes than radars
+def captureAll(radars, folder, workers = None):
+    os.makedirs(folder, exist_ok=True)
+    workers = max(1, min(workers or Configuration.WORKERS, len(radars)))
+    groups = [radars[i::workers] for i in range(workers)]
+    #progress bars from several processes would overwrite each other
+    settings = dict(Configuration.settings(), PROGRESS=False)
+    with ProcessPoolExecutor(workers) as pool:
+        results = list(pool.map(runGroup, groups, [folder] * workers, [settings] * workers))
+    summaries = {}
+    for group, result in zip(groups, results):
+        summaries.update(zip(group, result))
+    return [summaries[radar] for radar in radars]
+
+def emulate(scanData, host, port, kwargs):
+    import RadarEmulator
+    asyncio.run(RadarEmulator.run(scanData, host, port, **kwargs))
+
+#local RadarEmulator processes standing in for radars, one per radar address
+def startEmulators(radars, scanData, **kwargs):
+    emulators = []
+    for host, port in radars:
+        emulator = multiprocessing.Process(target=emulate, args=(scanData, host, port, kwargs), daemon=True)
+        emulator.start()
+        emulators.append(emulator)
+    return emulators
+
+def parseArgs(argv = None):
+    parser = argparse.ArgumentParser(description="capture from several radars at once")
+    parser.add_argument('folder', help="one capture per radar is written here")
+    parser.add_argument('radars', nargs='+', help="host:port of each radar, or just a port on localhost")
+    parser.add_argument('--workers', type=int, help="processes, default WORKERS")
+    parser.add_argument('--emulate', nargs='?', const='', help="start an emulator on each radar's port first, "
+                                                               "replaying this capture or a synthetic scene")
+    parser.add_argument('--rate', type=float, default=0, help="scans per second of the emulators")
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE', help="override one setting")
+    return parser.parse_args(argv)
+
+def main(argv = None):
+    args = parseArgs(argv)
+    Configuration.override(dict(setting.split('=', 1) for setting in args.set))
+    radars = [parseRadar(radar) for radar in args.radars]
+    emulators = []
+    if args.emulate is not None:
+        import RadarEmulator
+        emulators = startEmulators(radars, RadarEmulator.sourceScans(args.emulate or None), rate=args.rate)
+        #the emulators need a moment to bind
+        time.sleep(0.5)
+    try:
+        start = time.perf_counter()
+        summaries = captureAll(radars, args.folder, args.workers)
+        seconds = time.perf_counter() - start
+    finally:
+        for emulator in emulators:
+            emulator.terminate()
+            emulator.join()
+    for summary in summaries:
+        if 'error' in summary:
+            print("{host}:{port} failed: {error}".format(**summary))
+        else:
+            print("{host}:{port} -> {path}: {completed} scans, {incomplete} incomplete, {late} late, "
+                  "{duplicates} duplicates".format(**summary))
+    print("Captured {} radars in {:.2f} s".format(len(radars), seconds))
+    return summaries
+
+if __name__ == "__main__":
+    main()
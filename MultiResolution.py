@@ -0,0 +1,87 @@
+import numpy as np
+from Configuration import ROI_COARSE, ROI_TILE, ROI_THRESHOLD
+from RangeInterp import isUniform, interpRange
+from FactorizedBackProjection import analytic
+import FastBackProjection
+
+#coarse to fine imaging for sparse scenes: a cheap coarse image finds the tiles with something in them and
+#only those are imaged at full resolution
+#the coarse pass sums echo envelopes rather than echoes, a coherent image has peaks a fraction of a wavelength
+#wide that coarse pixels would step over, while the envelopes smoothed to a coarse pixel give blobs a coarse
+#pixel wide and need only a few scans since nothing has to cancel
+
+#|analytic signal| of each row, box filtered along range to about width meters
+def envelope(data, dr, width):
+    env = np.abs(analytic(data))
+    taps = max(int(round(width / dr)), 1)
+    summed = np.cumsum(np.pad(env, ((0, 0), (taps // 2 + 1, taps - taps // 2 - 1)), mode='edge'), axis=1)
+    return (summed[:, taps:] - summed[:, :-taps]) / taps
+
+#incoherent image on the coarse grid from scans spread evenly over the track
+def coarseImage(data, rangeBins, platformPos, xCoarse, yCoarse, zOffset, pixel, scans):
+    pick = np.unique(np.linspace(0, len(data) - 1, min(scans, len(data))).astype(int))
+    env = envelope(data[pick], rangeBins[1] - rangeBins[0], pixel)
+    return FastBackProjection.paintImage(env, rangeBins, platformPos[pick], xCoarse, yCoarse, zOffset)
+
+#(rows, columns) of the tiles worth refining, a tile is kept if any coarse pixel in it or touching it is
+#bright, so a target on a tile edge refines both sides
+def selectTiles(coarse, perTile, threshold):
+    floor = np.median(coarse)
+    bright = coarse > floor + threshold * (coarse.max() - floor)
+    grown = bright.copy()
+    grown[1:] |= bright[:-1]
+    grown[:-1] |= bright[1:]
+    grown[:, 1:] |= grown[:, :-1].copy()
+    grown[:, :-1] |= grown[:, 1:].copy()
+    rows, cols = -(-coarse.shape[0] // perTile), -(-coarse.shape[1] // perTile)
+    padded = np.zeros((rows * perTile, cols * perTile), bool)
+    padded[:coarse.shape[0], :coarse.shape[1]] = grown
+    return np.argwhere(padded.reshape(rows, perTile, cols, perTile).any(axis=(1, 3)))
+
+#coarse image plus full resolution tiles where it is bright
+#returns a dict with coarse, coarse_x, coarse_y, tile (fine pixels per side), tiles as a list of
+#(row, column, image) and work, the pixel-scan products computed as a fraction of imaging every pixel
+#imager is any paintImage with the BPRangeBin signature, extra keyword arguments go to it
+def paintPyramid(datalist, rangeBins, platformPos, xCor, yCor, zOffset = 0, coarse = ROI_COARSE, tile = ROI_TILE,
+                 threshold = ROI_THRESHOLD, coarseScans = 64, imager = FastBackProjection.paintImage, **kwargs):
+    data = np.asarray(datalist)
+    platformPos = np.asarray(platformPos, dtype=float)
+    xCor = np.asarray(xCor, dtype=float)
+    yCor = np.asarray(yCor, dtype=float)
+    rangeBins = np.asarray(rangeBins, dtype=float)
+    if tile % coarse:
+        raise ValueError("tile ({}) must be a multiple of coarse ({})".format(tile, coarse))
+    envelopeData, envelopeBins = data, rangeBins
+    if not isUniform(rangeBins):
+        envelopeBins = np.linspace(rangeBins[0], rangeBins[-1], len(rangeBins))
+        envelopeData = np.array([interpRange(envelopeBins, rangeBins, row) for row in data])
+    #coarse pixel centers, the middle of each coarse by coarse block of fine pixels
+    xCoarse = np.array([xCor[i:i+coarse].mean() for i in range(0, len(xCor), coarse)])
+    yCoarse = np.array([yCor[i:i+coarse].mean() for i in range(0, len(yCor), coarse)])
+    pixel = coarse * max(abs(xCor[-1] - xCor[0]) / max(len(xCor) - 1, 1), abs(yCor[-1] - yCor[0]) / max(len(yCor) - 1, 1))
+    coarseImg = coarseImage(envelopeData, envelopeBins, platformPos, xCoarse, yCoarse, zOffset, pixel, coarseScans)
+
+    tiles = []
+    refined = 0
+    for row, col in selectTiles(coarseImg, tile // coarse, threshold):
+        ys, xs = slice(row * tile, (row + 1) * tile), slice(col * tile, (col + 1) * tile)
+        image = imager(datalist, rangeBins, platformPos, xCor[xs], yCor[ys], zOffset, **kwargs)
+        tiles.append((row, col, image))
+        refined += image.size
+    work = (coarseImg.size * min(coarseScans, len(data)) + refined * len(data)) / (len(xCor) * len(yCor) * len(data))
+    return {'coarse': coarseImg, 'coarse_x': xCoarse, 'coarse_y': yCoarse, 'tile': tile, 'tiles': tiles, 'work': work}
+
+#full resolution image of a pyramid, zero outside the refined tiles
+def stitch(pyramid, shape):
+    tiles = pyramid['tiles']
+    dtype = np.result_type(*[image.dtype for row, col, image in tiles]) if tiles else float
+    image = np.zeros(shape, dtype)
+    size = pyramid['tile']
+    for row, col, tile in tiles:
+        image[row * size:row * size + tile.shape[0], col * size:col * size + tile.shape[1]] = tile
+    return image
+
+#drop-in for BPRangeBin.paintImage that only images the bright parts of the scene
+def paintImage(datalist, rangeBins, platformPos, xCor, yCor, zOffset = 0, **kwargs):
+    pyramid = paintPyramid(datalist, rangeBins, platformPos, xCor, yCor, zOffset, **kwargs)
+    return stitch(pyramid, (len(yCor), len(xCor)))
@@ -0,0 +1,27 @@
+import numpy as np
+import FastBackProjection
+import MultiResolution
+import SyntheticScene
+from BackProjectionBenchmark import timeit
+
+SCANS = 1000
+PIXEL = 0.01 #meters, a 1000x1000 image over the default 10x10 m scene
+
+if __name__ == "__main__":
+    for noise in (0, 0.5):
+        scene = SyntheticScene.makeScene(SCANS, pixel=PIXEL, noise=noise)
+        args = (scene['scan_data'], scene['range_bins'], scene['platform_pos'], scene['x'], scene['y'])
+        print("{} scans onto {}x{} pixels, {} point targets, noise {}".format(
+            SCANS, len(scene['y']), len(scene['x']), len(scene['targets']), noise))
+        fullTime, full = timeit(FastBackProjection.paintImage, *args)
+        pyramidTime, pyramid = timeit(MultiResolution.paintPyramid, *args)
+        image = MultiResolution.stitch(pyramid, full.shape)
+        #every target peak should come out of the refined tiles unchanged
+        found = 0
+        for x, y, z in scene['targets']:
+            near = (slice(max(np.searchsorted(scene['y'], y) - 5, 0), np.searchsorted(scene['y'], y) + 5),
+                    slice(max(np.searchsorted(scene['x'], x) - 5, 0), np.searchsorted(scene['x'], x) + 5))
+            found += np.abs(image[near]).max() == np.abs(full[near]).max()
+        print("full image:         {:8.2f} s".format(fullTime))
+        print("multiresolution:    {:8.2f} s  speedup {:5.1f}x  {} tiles  pixel work {:.1%}  targets kept {}/{}".format(
+            pyramidTime, fullTime / pyramidTime, len(pyramid['tiles']), pyramid['work'], found, len(scene['targets'])))
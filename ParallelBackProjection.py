@@ -0,0 +1,84 @@
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from Configuration import MEMORY_BUDGET, WORKERS, PRECISION
+from RangeInterp import imageType
+import FastBackProjection
+
+#copies array into a new shared memory block, returns the block and how to find it again
+def share(array):
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    view = np.ndarray(array.shape, array.dtype, buffer=block.buf)
+    view[:] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+def attach(spec):
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype, buffer=block.buf)
+
+#worker side: images scans start..stop over rows yStart..yStop into its slot of the output
+def paintPart(dataSpec, posSpec, outSpec, slot, start, stop, yStart, yStop, rangeBins, xCor, yCor, zOffset, memoryBudget,
+              precision, compensated):
+    dataBlock, data = attach(dataSpec)
+    posBlock, pos = attach(posSpec)
+    outBlock, out = attach(outSpec)
+    out[slot, yStart:yStop] = FastBackProjection.paintImage(data[start:stop], rangeBins, pos[start:stop], xCor,
+                                                            yCor[yStart:yStop], zOffset, memoryBudget,
+                                                            precision=precision, compensated=compensated)
+    #views have to go before their blocks can close
+    del data, pos, out
+    for block in (dataBlock, posBlock, outBlock):
+        block.close()
+
+#workers start from a fork server rather than a fork of the caller, a forked copy of a process that already ran
+#the numba kernel inherits its TBB thread pool and hangs at exit, spawn where there is no fork server (Windows)
+def poolContext():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+#splits 0..total into parts nearly equal ranges
+def splitRange(total, parts):
+    edges = np.linspace(0, total, parts + 1).astype(int)
+    return list(zip(edges[:-1], edges[1:]))
+
+#backprojection across a process pool, split over scans (partial images summed at the end)
+#or over pixel rows (each worker owns a band of the image)
+def paintImage(datalist, rangeBins, platformPos, xCor, yCor, zOffset = 0, workers = WORKERS, split = 'scans',
+               memoryBudget = MEMORY_BUDGET, precision = PRECISION, compensated = False):
+    data = np.asarray(datalist)
+    data = data.astype(imageType(data.dtype, precision), copy=False)
+    platformPos = np.asarray(platformPos, dtype=float)
+    xCor = np.asarray(xCor, dtype=float)
+    yCor = np.asarray(yCor, dtype=float)
+    rangeBins = np.asarray(rangeBins, dtype=float)
+    workers = max(1, min(workers or 1, len(data) if split == 'scans' else len(yCor)))
+    if workers == 1:
+        return FastBackProjection.paintImage(data, rangeBins, platformPos, xCor, yCor, zOffset, memoryBudget,
+                                             precision=precision, compensated=compensated)
+
+    if split == 'scans':
+        parts = [(slot, start, stop, 0, len(yCor)) for slot, (start, stop) in enumerate(splitRange(len(data), workers))]
+        outShape = (workers, len(yCor), len(xCor))
+    elif split == 'pixels':
+        parts = [(0, 0, len(data), yStart, yStop) for yStart, yStop in splitRange(len(yCor), workers)]
+        outShape = (1, len(yCor), len(xCor))
+    else:
+        raise ValueError("split must be 'scans' or 'pixels', not {}".format(split))
+
+    dataBlock, dataSpec = share(data)
+    posBlock, posSpec = share(platformPos)
+    outBlock, outSpec = share(np.zeros(outShape, data.dtype))
+    try:
+        with ProcessPoolExecutor(workers, mp_context=poolContext()) as pool:
+            jobs = [pool.submit(paintPart, dataSpec, posSpec, outSpec, *part, rangeBins, xCor, yCor, zOffset, memoryBudget,
+                                precision, compensated) for part in parts]
+            for job in jobs:
+                job.result()
+        return np.ndarray(outShape, data.dtype, buffer=outBlock.buf).sum(axis=0)
+    finally:
+        for block in (dataBlock, posBlock, outBlock):
+            block.close()
+            block.unlink()
@@ -1,8 +1,117 @@
 import math
+import numpy as np
+from Configuration import SPEED_OF_LIGHT
+
+#points held as contiguous x, y and z arrays, distances and round trip times are computed for every
+#point at once instead of one math.sqrt per pair
+#a.distance(b) with b a Point gives one distance per point in a, with b a PointSet every pair as (len(a), len(b))
+class PointSet:
+    __slots__ = ('x', 'y', 'z')
+
+    def __init__(self, x = (), y = (), z = ()):
+        self.x = np.ascontiguousarray(x, dtype=float)
+        self.y = np.ascontiguousarray(y, dtype=float)
+        self.z = np.zeros_like(self.x) if len(z) == 0 else np.ascontiguousarray(z, dtype=float)
+
+    #from an (n, 3) array such as platform_pos
+    @classmethod
+    def fromArray(cls, positions):
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        return cls(positions[:, 0], positions[:, 1], positions[:, 2])
+
+    @classmethod
+    def fromPoints(cls, points):
+        return cls([p.x for p in points], [p.y for p in points], [p.z for p in points])
+
+    def asArray(self):
+        return np.column_stack([self.x, self.y, self.z])
+
+    def __len__(self):
+        return len(self.x)
+
+    #an int gives a Point viewing that entry, negative ones count from the end like a list, a slice or index array
+    #gives a new PointSet
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            position = int(index) + len(self) if index < 0 else int(index)
+            if not 0 <= position < len(self):
+                raise IndexError("point {} out of range for {} points".format(index, len(self)))
+            return Point.view(self, position)
+        return PointSet(self.x[index], self.y[index], self.z[index])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield Point.view(self, index)
+
+    def distance(self, o):
+        if isinstance(o, PointSet):
+            dx = self.x[:, np.newaxis] - o.x[np.newaxis, :]
+            dy = self.y[:, np.newaxis] - o.y[np.newaxis, :]
+            dz = self.z[:, np.newaxis] - o.z[np.newaxis, :]
+        else:
+            dx, dy, dz = self.x - o.x, self.y - o.y, self.z - o.z
+        #reuses dx for the result so all pairs needs one (n, m) temporary less
+        np.square(dx, out=dx)
+        dx += dy * dy
+        dx += dz * dz
+        return np.sqrt(dx, out=dx)
+
+    #round trip time to o, same shapes as distance
+    def tou(self, o):
+        return self.distance(o) * (2 / SPEED_OF_LIGHT)
+
+#one point, x, y and z are whatever they were given, as in the original Point
 class Point:
     def __init__(self, x = 0, y = 0, z = 0):
         self.x = x
         self.y = y
         self.z = z
+
+    #a Point that reads and writes entry index of points
+    @staticmethod
+    def view(points, index):
+        return PointView(points, index)
+
+    #a number for another Point, one distance per point for a PointSet
     def distance(self, o):
-        return math.sqrt((self.x - o.x)**2 + (self.y - o.y)**2 + (self.z - o.z)**2)
\ No newline at end of file
+        if isinstance(o, PointSet):
+            return o.distance(self)
+        square = (self.x - o.x)**2 + (self.y - o.y)**2 + (self.z - o.z)**2
+        try:
+            return math.sqrt(square)
+        except TypeError:
+            #coordinates given as arrays
+            return np.sqrt(square)
+
+    def __repr__(self):
+        return "Point({}, {}, {})".format(self.x, self.y, self.z)
+
+#entry index of a PointSet, what indexing and iterating a PointSet give
+class PointView(Point):
+    def __init__(self, points, index):
+        self.points = points
+        self.index = index
+
+    @property
+    def x(self):
+        return float(self.points.x[self.index])
+
+    @x.setter
+    def x(self, value):
+        self.points.x[self.index] = value
+
+    @property
+    def y(self):
+        return float(self.points.y[self.index])
+
+    @y.setter
+    def y(self, value):
+        self.points.y[self.index] = value
+
+    @property
+    def z(self):
+        return float(self.points.z[self.index])
+
+    @z.setter
+    def z(self, value):
+        self.points.z[self.index] = value
@@ -0,0 +1,73 @@
+import struct
+import asyncio
+import logging
+from bisect import bisect_left
+import numpy as np
+import Instrumentation
+
+logger = logging.getLogger(__name__)
+
+#platform positions streamed over UDP while the radar scans, the way a GPS or motion capture link sends them
+#each datagram is one fix: radar clock timestamp (ms, like the F201 timestamp) and x, y, z in meters
+#a scan finds its position by the timestamp of its F201 datagrams, so imaging does not wait for the flight
+#path to be published after the pass
+#fixes are matched to the radar clock's 1 ms, scans closer together than that share a position
+FIX = struct.Struct('>Iddd')
+
+def encodeFix(timestamp, position):
+    return FIX.pack(int(timestamp) & 0xFFFFFFFF, *position)
+
+class PositionFeed(asyncio.DatagramProtocol):
+    #maxGap is the longest time in ms between two fixes that a position is interpolated across
+    #keep is how many of the latest fixes are held
+    def __init__(self, maxGap = 200, keep = 65536):
+        self.maxGap = maxGap
+        self.keep = keep
+        self.times = []
+        self.positions = []
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        try:
+            timestamp, x, y, z = FIX.unpack(data)
+        except struct.error:
+            logger.warning("Dropping position datagram of {} bytes".format(len(data)))
+            return
+        Instrumentation.count('position_fixes')
+        #fixes normally arrive in order, a late one is slotted in
+        index = len(self.times)
+        if index and timestamp < self.times[-1]:
+            index = bisect_left(self.times, timestamp)
+        self.times.insert(index, timestamp)
+        self.positions.insert(index, (x, y, z))
+        if len(self.times) > self.keep:
+            old = len(self.times) - self.keep
+            del self.times[:old]
+            del self.positions[:old]
+
+    #position at timestamp interpolated between the fixes around it, None when it is outside the fixes so far
+    #or the fixes around it are more than maxGap apart
+    def positionAt(self, timestamp):
+        index = bisect_left(self.times, timestamp)
+        if index < len(self.times) and self.times[index] == timestamp:
+            return np.array(self.positions[index])
+        if index == 0 or index == len(self.times):
+            return None
+        before, after = self.times[index - 1], self.times[index]
+        if after - before > self.maxGap:
+            return None
+        weight = (timestamp - before) / (after - before)
+        return (1 - weight) * np.array(self.positions[index - 1]) + weight * np.array(self.positions[index])
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+
+#feed listening on host:port
+async def openPositionFeed(host = "0.0.0.0", port = 21220, **kwargs):
+    loop = asyncio.get_running_loop()
+    transport, feed = await loop.create_datagram_endpoint(lambda: PositionFeed(**kwargs), local_addr=(host, port))
+    return feed
@@ -0,0 +1,34 @@
+import numpy as np
+import FastBackProjection
+import JitBackProjection
+import SyntheticScene
+from BackProjectionBenchmark import makeScene, timeit
+
+#single precision images against the double precision result, errors relative to the brightest reference pixel
+def report(name, scene):
+    datalist = np.asarray(scene[0])
+    print("{}: {} scans x {} samples onto {}x{} pixels".format(name, datalist.shape[0], datalist.shape[1],
+                                                              len(scene[4]), len(scene[3])))
+    engines = [('numpy', FastBackProjection.paintImage)]
+    if JitBackProjection.numba is not None:
+        #warm up so compilation is not timed
+        for precision in ('double', 'single'):
+            JitBackProjection.paintImage(datalist[:2], *scene[1:], backend='numba', precision=precision)
+            JitBackProjection.paintImage(datalist[:2], *scene[1:], backend='numba', precision=precision, compensated=True)
+        engines.append(('numba', lambda *args, **kwargs: JitBackProjection.paintImage(*args, backend='numba', **kwargs)))
+    for engine, paint in engines:
+        doubleTime, reference = timeit(paint, *scene, precision='double')
+        peak = np.abs(reference).max()
+        print("  {:5s} double:             {:6.2f} s  scans {:5.1f} MB  image {:5.1f} MB".format(
+            engine, doubleTime, datalist.size * 8 / 2**20, reference.nbytes / 2**20))
+        for compensated in (False, True):
+            singleTime, image = timeit(paint, *scene, precision='single', compensated=compensated)
+            error = np.abs(image - reference)
+            print("  {:5s} single{}: {:6.2f} s  scans {:5.1f} MB  image {:5.1f} MB  max error {:.1e}  rms error {:.1e}".format(
+                engine, " compensated" if compensated else "            ", singleTime, datalist.size * 4 / 2**20,
+                image.nbytes / 2**20, error.max() / peak, np.sqrt(np.mean(error**2)) / peak))
+
+if __name__ == "__main__":
+    report("white noise", makeScene())
+    scene = SyntheticScene.makeScene(1000, noise=0.1)
+    report("point targets", (scene['scan_data'], scene['range_bins'], scene['platform_pos'], scene['x'], scene['y']))
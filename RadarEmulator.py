@@ -0,0 +1,226 @@
+import time
+import struct
+import asyncio
+import logging
+import argparse
+import numpy as np
+from MessageCodec import LAYOUTS, SCAN_INFO, SAMPLE_TYPE, decodeMessage, encodeInto
+from ScanAssembler import MAX_SAMPLES_PER_MESSAGE
+from ScanArchive import load
+from PositionFeed import encodeFix
+
+logger = logging.getLogger(__name__)
+
+#local stand-in for the P440 emulator: answers the FFFE/1001/1002/1003 setup the way client.py and
+#NonStopScan expect and replays the scans of a capture as F201 datagrams
+#rate (scans per second, 0 for as fast as possible), burst (datagrams sent back to back between pauses),
+#drop and reorder (probability per datagram) make it usable for load testing the receiver
+#with positions (one per scan row) and positionPort, each scan's platform position is sent as a PositionFeed
+#fix to the requester's host just before the scan, stamped with the scan's timestamp
+#python RadarEmulator.py datalist.capture --rate 500 --drop 0.01
+#python RadarEmulator.py --rate 200 --positions 21220
+CONTINUOUS = 0xFFFF #scan_count asking for scans until the next 1003
+SCAN_HEADER = LAYOUTS[SCAN_INFO]
+ID_OFFSET = 2
+ID_FIELD = struct.Struct('>H')
+TIMESTAMP_OFFSET = 8
+TIMESTAMP_FIELD = struct.Struct('>I')
+
+#F201 datagrams for every piece of every row, message id and timestamp are filled in when sent
+def scanDatagrams(scanData, scanStart, scanEnd, scanRes, samplesPerMessage = MAX_SAMPLES_PER_MESSAGE):
+    numSamples = scanData.shape[1]
+    numMessages = -(-numSamples // samplesPerMessage)
+    datagrams = []
+    for row in scanData:
+        pieces = []
+        for index in range(numMessages):
+            samples = row[index * samplesPerMessage:(index + 1) * samplesPerMessage]
+            buf = bytearray(SCAN_HEADER.size + samples.size * SAMPLE_TYPE.itemsize)
+            encodeInto(buf, 0, SCAN_INFO, 0, 1, 0, scanStart, scanEnd, scanRes, 0, 2, 0, samples.size, numSamples,
+                       index, numMessages)
+            buf[SCAN_HEADER.size:] = samples.astype(SAMPLE_TYPE).tobytes()
+            pieces.append(buf)
+        datagrams.append(pieces)
+    return datagrams, numMessages
+
+#scan rows as int32 radar samples, float data (synthetic scenes) is scaled to use most of the range
+def radarSamples(scanData):
+    scanData = np.asarray(scanData)
+    if np.issubdtype(scanData.dtype, np.integer):
+        return scanData.astype(np.int32)
+    peak = np.abs(scanData).max() or 1
+    return np.round(scanData * (2**30 / peak)).astype(np.int32)
+
+class RadarEmulator(asyncio.DatagramProtocol):
+    def __init__(self, scanData, rate = 0, burst = 1, drop = 0, reorder = 0, reorderDepth = 8, seed = 0,
+                 positions = None, positionPort = 0):
+        self.scanData = radarSamples(scanData)
+        self.positions = None if positions is None else np.asarray(positions, dtype=float)
+        self.positionPort = positionPort
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.drop = drop
+        self.reorder = reorder
+        self.reorderDepth = reorderDepth
+        self.rng = np.random.default_rng(seed)
+        self.config = {'node_id': 1, 'scan_start': 0, 'scan_end': 0, 'scan_res': 32, 'base_integration_index': 8,
+                       'antenna_mode': 2, 'transmit_gain': 32, 'code_channel': 7, 'persist_flag': 0}
+        self.datagrams = None
+        self.streaming = None
+        self.start = time.monotonic()
+        self.lastStamp = -1
+        self.transport = None
+        self.sent = 0
+        self.dropped = 0
+        self.reordered = 0
+        self.passes = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def timestamp(self):
+        return int((time.monotonic() - self.start) * 1000) & 0xFFFFFFFF
+
+    def reply(self, addr, messageType, messageID, *fields):
+        buf = bytearray(LAYOUTS[messageType].size)
+        encodeInto(buf, 0, messageType, messageID, *fields)
+        self.transport.sendto(buf, addr)
+
+    def datagram_received(self, data, addr):
+        message = decodeMessage(data)
+        messageType, messageID = message['message_type'], message['message_id']
+        if messageType == 0xFFFE:
+            self.reply(addr, 0xFFFF, messageID, message['uint8_val'], message['uint16_val'], message['uint32_val'],
+                       message['int8_val'], message['int16_val'], message['int32_val'], b'', 0)
+        elif messageType == 0x1001:
+            self.config.update({name: message[name] for name in self.config})
+            self.datagrams = None
+            self.reply(addr, 0x1101, messageID, 0)
+        elif messageType == 0x1002:
+            c = self.config
+            self.reply(addr, 0x1102, messageID, c['node_id'], c['scan_start'], c['scan_end'], c['scan_res'],
+                       c['base_integration_index'], c['antenna_mode'], c['transmit_gain'], c['code_channel'],
+                       c['persist_flag'], self.timestamp(), 0)
+        elif messageType == 0x1003:
+            self.reply(addr, 0x1103, messageID, 0)
+            if self.streaming is not None:
+                self.streaming.cancel()
+            if message['scan_count']:
+                #scan datagrams continue the message ids after the request
+                self.streaming = asyncio.ensure_future(self.stream(addr, message['scan_count'], messageID + 1))
+        else:
+            logger.info("Ignoring message type {:04X}".format(messageType))
+
+    #send order of count datagrams with drops left out and some datagrams swapped with a later one
+    def sendOrder(self, count):
+        order = np.arange(count)
+        swaps = np.flatnonzero(self.rng.random(count) < self.reorder)
+        for i in swaps:
+            j = min(i + self.rng.integers(1, self.reorderDepth + 1), count - 1)
+            order[i], order[j] = order[j], order[i]
+        self.reordered += len(swaps)
+        keep = self.rng.random(count) >= self.drop
+        self.dropped += int(count - keep.sum())
+        return order[keep]
+
+    def sendFix(self, addr, row, timestamp):
+        if self.positions is not None and self.positionPort:
+            self.transport.sendto(encodeFix(timestamp, self.positions[row]), (addr[0], self.positionPort))
+
+    async def stream(self, addr, scanCount, firstID):
+        if self.datagrams is None:
+            c = self.config
+            self.datagrams, self.numMessages = scanDatagrams(self.scanData, c['scan_start'], c['scan_end'], c['scan_res'])
+        numRows = len(self.datagrams)
+        #continuous requests are served a pass worth of rows at a time
+        chunk = numRows if scanCount == CONTINUOUS else scanCount
+        interval = self.burst / (self.rate * self.numMessages) if self.rate else 0
+        scan = 0
+        #every piece of a scan carries the time its first piece went out, like the radar's scan timestamp
+        #a real scan takes longer than the 1 ms tick, so rows sent faster than that still get distinct stamps
+        stamps = {}
+        lastRow = -1
+        due = time.perf_counter()
+        while scanCount == CONTINUOUS or scan < scanCount:
+            count = min(chunk, scanCount - scan) if scanCount != CONTINUOUS else chunk
+            order = self.sendOrder(count * self.numMessages)
+            for start in range(0, len(order), self.burst):
+                for k in order[start:start + self.burst].tolist():
+                    position = scan * self.numMessages + k
+                    row = position // self.numMessages
+                    if row > lastRow:
+                        #reordering can bring a later row forward, its earlier rows are already stamped
+                        for new in range(lastRow + 1, row + 1):
+                            self.lastStamp = max(self.timestamp(), self.lastStamp + 1)
+                            stamps[new] = self.lastStamp
+                            self.sendFix(addr, new % numRows, stamps[new])
+                        for old in [old for old in stamps if old < row - self.reorderDepth - 1]:
+                            del stamps[old]
+                        lastRow = row
+                    buf = self.datagrams[row % numRows][position % self.numMessages]
+                    ID_FIELD.pack_into(buf, ID_OFFSET, (firstID + position) & 0xFFFF)
+                    TIMESTAMP_FIELD.pack_into(buf, TIMESTAMP_OFFSET, stamps[row])
+                    self.transport.sendto(buf, addr)
+                self.sent += len(order[start:start + self.burst])
+                #paced against a schedule rather than sleeping a fixed time, so slow sends do not add up
+                due += interval
+                wait = due - time.perf_counter()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                elif start % (64 * self.burst) == 0:
+                    #behind schedule or unpaced, still let replies and new requests through now and then
+                    await asyncio.sleep(0)
+            scan += count
+        self.passes += 1
+        logger.info("Pass done: {} datagrams sent, {} dropped, {} reordered".format(self.sent, self.dropped,
+                                                                                   self.reordered))
+
+#serves scanData on host:port until cancelled, returns the protocol so callers can read its counters
+async def serve(scanData, host = "127.0.0.1", port = 21210, **kwargs):
+    loop = asyncio.get_running_loop()
+    transport, emulator = await loop.create_datagram_endpoint(lambda: RadarEmulator(scanData, **kwargs),
+                                                              local_addr=(host, port))
+    return emulator
+
+async def run(scanData, host, port, **kwargs):
+    await serve(scanData, host, port, **kwargs)
+    logger.info("Emulating a radar on {}:{}".format(host, port))
+    await asyncio.Event().wait()
+
+def parseArgs(argv = None):
+    parser = argparse.ArgumentParser(description="replay a capture as a P440 radar")
+    parser.add_argument('source', nargs='?', help="capture, archive or pickle, a synthetic scene when left out")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=21210)
+    parser.add_argument('--rate', type=float, default=0, help="scans per second, 0 for as fast as possible")
+    parser.add_argument('--burst', type=int, default=1, help="datagrams sent back to back")
+    parser.add_argument('--drop', type=float, default=0, help="probability of dropping a datagram")
+    parser.add_argument('--reorder', type=float, default=0, help="probability of swapping a datagram with a later one")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--positions', type=int, default=0, metavar='PORT',
+                        help="send each scan's platform position to this port of the requester")
+    return parser.parse_args(argv)
+
+#scan_data and, when the source has it, platform_pos of source, a synthetic scene when source is None
+def sourceData(source):
+    if source is None:
+        import SyntheticScene
+        return SyntheticScene.makeScene(100)
+    return load(source)
+
+def sourceScans(source):
+    return sourceData(source)['scan_data']
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parseArgs()
+    data = sourceData(args.source)
+    positions = data['platform_pos'] if args.positions and 'platform_pos' in data else None
+    if args.positions and positions is None:
+        logger.warning("{} has no platform positions, none are sent".format(args.source))
+    try:
+        asyncio.run(run(data['scan_data'], args.host, args.port, rate=args.rate, burst=args.burst,
+                        drop=args.drop, reorder=args.reorder, seed=args.seed, positions=positions,
+                        positionPort=args.positions))
+    except KeyboardInterrupt:
+        pass
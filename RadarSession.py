@@ -0,0 +1,162 @@
+import struct
+import asyncio
+import logging
+import Instrumentation
+import Configuration
+from MessageCodec import SCAN_INFO, SCAN_HEADER, decodeMessage, encodeCommConf, encodeSetConf, encodeGetConf, encodeCtrlReq, errorCode
+
+logger = logging.getLogger(__name__)
+
+#one radar session over UDP
+#replies are matched to their request by message_id, scan datagrams go to a queue
+class RadarSession(asyncio.DatagramProtocol):
+    def __init__(self, timeout = 0.05, retries = 5, backoff = 2, maxTimeout = 1, queueSize = 0):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.maxTimeout = maxTimeout
+        self.messageID = 0
+        self.pending = {}
+        self.scans = asyncio.Queue(queueSize)
+        self.droppedScans = 0
+        self.transport = None
+        self.holding = False
+        self.firstScanID = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        Instrumentation.count('datagrams_received')
+        Instrumentation.count('bytes_received', len(data))
+        if int.from_bytes(data[0:2], 'big') == SCAN_INFO:
+            if len(data) < SCAN_HEADER.size:
+                logger.warning("Dropping truncated scan datagram of {} bytes".format(len(data)))
+                Instrumentation.count('datagrams_truncated')
+                return
+            try:
+                self.scans.put_nowait(data)
+            except asyncio.QueueFull:
+                self.droppedScans += 1
+                Instrumentation.count('datagrams_dropped_queue')
+            return
+        try:
+            message = decodeMessage(data)
+        except struct.error:
+            logger.warning("Dropping truncated datagram of {} bytes: {}".format(len(data), bytes(data[:8]).hex()))
+            Instrumentation.count('datagrams_truncated')
+            return
+        reply = self.pending.pop(message['message_id'], None)
+        if reply is None:
+            logger.info("Unexpected reply: {}".format(message))
+        elif not reply.done():
+            reply.set_result(message)
+
+    def error_received(self, exc):
+        logger.warning("Socket error: {}".format(exc))
+
+    def connection_lost(self, exc):
+        for reply in self.pending.values():
+            if not reply.done():
+                reply.set_exception(ConnectionError("Session closed"))
+        self.pending.clear()
+        self.scans.put_nowait(None)
+
+    def nextMessageID(self):
+        messageID = self.messageID
+        self.messageID = (self.messageID + 1) & 0xFFFF
+        return messageID
+
+    #sends one request and waits for its confirm, resending with bounded backoff
+    #retries and timeout default to the session's, retries=0 sends once and waits maxTimeout
+    async def request(self, encoder, *args, retries = None, timeout = None):
+        retries = self.retries if retries is None else retries
+        timeout = timeout or (self.timeout if retries else self.maxTimeout)
+        messageID = self.nextMessageID()
+        message = encoder(messageID, *args)
+        reply = asyncio.get_running_loop().create_future()
+        self.pending[messageID] = reply
+        try:
+            for attempt in range(retries + 1):
+                self.transport.sendto(message)
+                try:
+                    confirm = await asyncio.wait_for(asyncio.shield(reply), timeout)
+                except asyncio.TimeoutError:
+                    logger.info("No reply to message #{}, attempt {}".format(messageID, attempt + 1))
+                    Instrumentation.count('request_retries')
+                    timeout = min(timeout * self.backoff, self.maxTimeout)
+                    continue
+                logger.info(confirm)
+                if 'status' in confirm:
+                    errorCode(confirm['status'])
+                return confirm
+        finally:
+            self.pending.pop(messageID, None)
+        Instrumentation.count('requests_dropped')
+        raise TimeoutError("Message Dropped: #" + str(messageID))
+
+    #starts a run of scanCount scans
+    #1003 is not idempotent, a resent one restarts the run, so it goes out once; without a confirm the session
+    #looks for its effect instead: scans arriving mean the radar took it (returns None), otherwise a 1002 query
+    #tells a radar that lost the request, which raises TimeoutError so the caller can ask again, from one that is gone
+    #firstScanID is the message id the radar gives the run's first scan datagram, the one after the request's
+    async def startScanning(self, scanCount):
+        self.firstScanID = (self.messageID + 1) & 0xFFFF
+        try:
+            return await self.request(encodeCtrlReq, scanCount, retries=0)
+        except TimeoutError:
+            pass
+        if self.scans.empty():
+            await self.request(encodeGetConf)
+        if self.scans.empty():
+            raise TimeoutError("Radar is up but did not start scanning, scan request unconfirmed")
+        logger.warning("Scan request unconfirmed but scans are arriving")
+        return None
+
+    #setup in dependency order: the comm test and 1001 together, then 1002 and 1003 once the new configuration is
+    #confirmed, so 1002 reads it back and scanning never starts on the old one
+    async def configure(self, scanStart, scanEnd, scanRes, baseInter, scanCount):
+        confirms = await asyncio.gather(self.request(encodeCommConf),
+                                        self.request(encodeSetConf, scanStart, scanEnd, scanRes, baseInter))
+        return confirms + await asyncio.gather(self.request(encodeGetConf), self.startScanning(scanCount))
+
+    #next raw F201 datagram, None once the stream has been idle for idleTimeout seconds (default IDLE_TIMEOUT)
+    #with the threaded receiver the datagram is a view into its arena, valid until the next call
+    async def nextScan(self, idleTimeout = None):
+        if self.holding:
+            self.transport.releaseScan()
+            self.holding = False
+        try:
+            with Instrumentation.timer('socket_wait'):
+                data = await asyncio.wait_for(self.scans.get(), idleTimeout or Configuration.IDLE_TIMEOUT)
+        except asyncio.TimeoutError:
+            return None
+        self.holding = data is not None and hasattr(self.transport, 'releaseScan')
+        return data
+
+    #hands scan datagrams to a consumer coroutine until it returns True or the stream goes idle
+    async def stream(self, consumer, idleTimeout = None):
+        while True:
+            data = await self.nextScan(idleTimeout)
+            if data is None or await consumer(data):
+                return
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+
+#receiver 'thread' reads the socket on its own thread into a preallocated arena (Receiver.py), 'asyncio' with the
+#event loop's own transport, None for the RECEIVER setting; with the thread queueSize becomes the number of arena slots
+async def openSession(host = "127.0.0.1", port = 21210, receiver = None, **kwargs):
+    receiver = receiver or Configuration.RECEIVER
+    if receiver == 'thread':
+        from Receiver import openReceiver
+        slots = kwargs.pop('queueSize', 0) or Configuration.RECEIVE_SLOTS
+        session = RadarSession(**kwargs)
+        openReceiver(session, host, port, slots=slots)
+        return session
+    if receiver != 'asyncio':
+        raise ValueError("unknown receiver {}, pick thread or asyncio".format(receiver))
+    loop = asyncio.get_running_loop()
+    transport, session = await loop.create_datagram_endpoint(lambda: RadarSession(**kwargs), remote_addr=(host, port))
+    return session
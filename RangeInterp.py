@@ -0,0 +1,87 @@
+import numpy as np
+
+MODES = ('nearest', 'linear', 'sinc')
+PRECISIONS = ('double', 'single')
+
+#float or complex type samples of this dtype are imaged in, float32/complex64 for single precision
+def imageType(dtype, precision = 'double'):
+    if precision not in PRECISIONS:
+        raise ValueError("precision must be one of {}, not {}".format(PRECISIONS, precision))
+    isComplex = np.issubdtype(dtype, np.complexfloating)
+    if precision == 'single':
+        return np.dtype(np.complex64 if isComplex else np.float32)
+    return np.dtype(np.complex128 if isComplex else np.float64)
+
+#type rows of this dtype are interpolated in, float32/complex64 rows stay in single precision and everything
+#else, integer samples included, goes to double like the images of the double precision mode
+def sampleType(dtype):
+    dtype = np.dtype(dtype)
+    if dtype in (np.float32, np.complex64):
+        return dtype
+    return np.result_type(dtype, float)
+
+#true when rangeBins are evenly spaced, so positions map to fractional indices directly
+def isUniform(rangeBins, rtol = 1e-6):
+    steps = np.diff(np.asarray(rangeBins, dtype=float))
+    return len(steps) > 0 and steps[0] > 0 and np.allclose(steps, steps[0], rtol=rtol, atol=0)
+
+#intercept and slope per bin so that row at fractional index t is intercept[i] + slope[i]*t, i = floor(t)
+#slope is zero in the last bin so indices past the end clamp to the last sample
+def linearTable(row):
+    row = np.asarray(row)
+    slope = np.zeros(row.shape, sampleType(row.dtype))
+    np.subtract(row[1:], row[:-1], out=slope[:-1])
+    return row - slope * np.arange(len(row), dtype=slope.real.dtype), slope
+
+def lanczos(x, half):
+    return np.sinc(x) * np.sinc(x / half)
+
+#row sampled at fractional indices t (any shape), clamped to the ends like np.interp
+#nearest rounds to the closest bin, sinc sums a Lanczos window of taps samples around t
+def interpIndex(t, row, mode = 'linear', taps = 8, out = None):
+    row = np.asarray(row)
+    n = len(row)
+    dtype = sampleType(row.dtype)
+    t = np.clip(t, 0, n - 1)
+    if out is None:
+        out = np.empty(t.shape, dtype)
+    if mode == 'nearest':
+        np.take(row, np.rint(t).astype(np.intp), out=out, mode='clip')
+    elif mode == 'linear':
+        intercept, slope = linearTable(row)
+        bins = t.astype(np.intp)
+        np.take(slope, bins, out=out, mode='clip')
+        out *= t
+        out += np.take(intercept, bins, mode='clip')
+    elif mode == 'sinc':
+        half = taps // 2
+        bins = np.floor(t).astype(np.intp)
+        frac = t - bins
+        out[...] = 0
+        for k in range(1 - half, half + 1):
+            out += np.take(row, bins + k, mode='clip') * lanczos(frac - k, half)
+    else:
+        raise ValueError("mode must be one of {}, not {}".format(MODES, mode))
+    return out
+
+#data sampled at range positions distance, a drop-in for np.interp(distance, rangeBins, data)
+#uniform bins skip the binary search, other spacings fall back to np.interp or a search
+def interpRange(distance, rangeBins, data, mode = 'linear', taps = 8, out = None):
+    rangeBins = np.asarray(rangeBins, dtype=float)
+    distance = np.asarray(distance, dtype=float)
+    if isUniform(rangeBins):
+        t = (distance - rangeBins[0]) / (rangeBins[1] - rangeBins[0])
+        return interpIndex(t, data, mode, taps, out)
+    if mode == 'linear':
+        result = np.interp(distance, rangeBins, data)
+    elif mode == 'nearest':
+        right = np.clip(np.searchsorted(rangeBins, distance), 1, len(rangeBins) - 1)
+        left = right - 1
+        closer = np.where(distance - rangeBins[left] <= rangeBins[right] - distance, left, right)
+        result = np.take(data, closer)
+    else:
+        raise ValueError("{} interpolation needs uniformly spaced range bins".format(mode))
+    if out is None:
+        return result
+    out[...] = result
+    return out
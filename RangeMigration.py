@@ -0,0 +1,187 @@
+import numpy as np
+from Configuration import SPEED_OF_LIGHT
+from RangeInterp import isUniform, interpRange, interpIndex
+from FactorizedBackProjection import analytic, bandEdges
+import FastBackProjection
+
+#omega-k imaging for straight passes: a straight track makes the data depend only on a reflector's
+#position along the track (u) and its distance from the track line (rho), so the whole scene focuses with
+#a range FFT, an along-track FFT, a Stolt change of variables and one inverse 2-D FFT
+
+#line through the platform positions, returns origin, unit direction, position of each scan along it
+#and how far the farthest scan is off the line
+def fitTrack(platformPos):
+    platformPos = np.asarray(platformPos, dtype=float)
+    origin = platformPos.mean(axis=0)
+    offsets = platformPos - origin
+    direction = np.linalg.svd(offsets, full_matrices=False)[2][0]
+    u = offsets @ direction
+    deviation = np.sqrt(np.maximum((offsets**2).sum(axis=1) - u**2, 0)).max()
+    return origin, direction, u, deviation
+
+#(u, rho) of ground points (x, y, zOffset) relative to a track line
+def trackCoordinates(origin, direction, x, y, zOffset):
+    dx, dy, dz = x - origin[0], y - origin[1], zOffset - origin[2]
+    u = dx * direction[0] + dy * direction[1] + dz * direction[2]
+    rho = np.sqrt(np.maximum(dx**2 + dy**2 + dz**2 - u**2, 0))
+    return u, rho
+
+#first order motion compensation: the range shift of each scan that moves the scene center's echo to where a scan
+#at its spot on the fitted line would see it, and the largest error these shifts leave at the scene corners
+def trackShifts(platformPos, origin, direction, u, xCor, yCor, zOffset):
+    line = origin + u[:, np.newaxis] * direction
+    def excess(point):
+        return np.linalg.norm(platformPos - point, axis=1) - np.linalg.norm(line - point, axis=1)
+    shifts = excess(np.array([(xCor.min() + xCor.max()) / 2, (yCor.min() + yCor.max()) / 2, zOffset]))
+    corners = [np.array([x, y, zOffset]) for x in (xCor.min(), xCor.max()) for y in (yCor.min(), yCor.max())]
+    return shifts, max(np.abs(excess(corner) - shifts).max() for corner in corners)
+
+#highest frequency (Hz) at which the summed power of analytic echoes, smoothed over 1/64 of the band, rises a tenth
+#of the way from the noise floor (the median) to its peak, unlike the spread bandEdges measures white noise over
+#the whole band barely moves it
+def bandTop(signal, dr):
+    power = (np.abs(np.fft.fft(signal, axis=1))**2).sum(axis=0)
+    frequency = np.fft.fftfreq(signal.shape[1], 2 * dr / SPEED_OF_LIGHT)
+    width = max(len(power) // 64, 1)
+    power = np.convolve(power, np.ones(width) / width, 'same')
+    floor = np.median(power[frequency > 0])
+    return np.abs(frequency[power - floor >= (power.max() - floor) / 10]).max()
+
+#rows of signal moved shifts meters toward shorter range by a phase ramp on their spectrum, padded so none wrap
+def shiftRows(signal, shifts, dr):
+    n = signal.shape[1]
+    size = n + int(np.ceil(np.abs(shifts).max() / dr)) + 1
+    spectrum = np.fft.fft(signal, size, axis=1)
+    spectrum *= np.exp(2j * np.pi * np.fft.fftfreq(size, dr) * shifts[:, np.newaxis])
+    return np.fft.ifft(spectrum, axis=1)[:, :n]
+
+#rows of signal resampled onto evenly spaced track positions, linear between neighbouring scans
+def uniformScans(signal, u):
+    order = np.argsort(u)
+    signal, u = signal[order], u[order]
+    grid = np.linspace(u[0], u[-1], len(u))
+    if isUniform(u, 1e-3):
+        return signal, grid
+    upper = np.clip(np.searchsorted(u, grid), 1, len(u) - 1)
+    weight = ((grid - u[upper - 1]) / (u[upper] - u[upper - 1]))[:, np.newaxis]
+    return signal[upper - 1] * (1 - weight) + signal[upper] * weight, grid
+
+#value of a (nu, nrho) image at fractional indices (s, t), bilinear and zero outside
+def bilinear(image, s, t):
+    nu, nrho = image.shape
+    inside = (s >= 0) & (s <= nu - 1) & (t >= 0) & (t <= nrho - 1)
+    i = np.clip(s.astype(np.intp), 0, nu - 2)
+    j = np.clip(t.astype(np.intp), 0, nrho - 2)
+    s = s - i
+    t = t - j
+    near = image[i, j] + (image[i, j + 1] - image[i, j]) * t
+    far = image[i + 1, j] + (image[i + 1, j + 1] - image[i + 1, j]) * t
+    return np.where(inside, near + (far - near) * s, 0)
+
+#drop-in for BPRangeBin.paintImage, image rows follow yCor and columns follow xCor
+#scans off the fitted line are range shifted to it for the scene center (first order motion compensation), which
+#leaves an error that grows toward the scene edges, about half the deviation at the corners of a 10 m scene seen
+#from 12 m; linear = None uses omega-k while that error stays within tolerance (meters, by default an eighth of
+#the center wavelength, under 9 mm at 4.3 GHz, a quarter cycle of round trip phase), so centimeter sway focuses
+#and a hand flown or GPS guided pass swaying decimeters falls back to backprojection, as does a pass whose scans
+#are too far apart to sample the along-track spectrum (a wavelength over 4 sin of the steepest squint to a pixel,
+#about 1.5 cm for a 10 m scene seen from 12 m at 4.3 GHz), which backprojection images with far weaker aliases
+#True uses omega-k whenever the scans have an echo band and the scene lies in their range window, False always
+#backprojects
+#oversample sets how finely the focused image is sampled before it is interpolated onto the pixels
+def paintImage(datalist, rangeBins, platformPos, xCor, yCor, zOffset = 0, linear = None, tolerance = None,
+               oversample = 2):
+    data = np.asarray(datalist)
+    data = data.astype(np.result_type(data.dtype, float), copy=False)
+    platformPos = np.asarray(platformPos, dtype=float)
+    xCor = np.asarray(xCor, dtype=float)
+    yCor = np.asarray(yCor, dtype=float)
+    rangeBins = np.asarray(rangeBins, dtype=float)
+    measuredBins = rangeBins
+    if not isUniform(rangeBins):
+        uniform = np.linspace(rangeBins[0], rangeBins[-1], len(rangeBins))
+        data = np.array([interpRange(uniform, rangeBins, row) for row in data])
+        rangeBins = uniform
+    dr = rangeBins[1] - rangeBins[0]
+    signal = analytic(data)
+    #silent scans have no spectrum to weigh, center comes out NaN
+    with np.errstate(invalid='ignore'):
+        center, highest = bandEdges(signal, dr)
+    origin, direction, u, deviation = fitTrack(platformPos)
+    shifts, residual = trackShifts(platformPos, origin, direction, u, xCor, yCor, zOffset)
+    pixelU, pixelRho = trackCoordinates(origin, direction, xCor[np.newaxis, :], yCor[:, np.newaxis], zOffset)
+    #sine of the steepest angle off broadside any pixel is seen at, the along-track spectrum beyond it holds only
+    #noise and aliases, which the Stolt weight would blow up toward the evanescent edge
+    reach = np.maximum(np.abs(pixelU - u.min()), np.abs(pixelU - u.max()))
+    steepest = (reach / np.hypot(reach, pixelRho)).max()
+    farthest = np.sqrt(pixelRho.max()**2 + reach.max()**2)
+    #scans without an echo band above the lowest frequency they resolve (silent or zero filled ones) leave no
+    #wavelength to focus at, and a scene outside the range window leaves no echoes to focus
+    lowest = SPEED_OF_LIGHT / (2 * dr * data.shape[1])
+    focusable = center > lowest and pixelRho.min() < rangeBins[-1] and farthest > rangeBins[0]
+    if linear is None:
+        #scans further apart than the shortest wavelength over 4 sin(steepest) alias along the track
+        spacing = (u.max() - u.min()) / (len(u) - 1)
+        linear = (focusable and residual <= (tolerance or SPEED_OF_LIGHT / center / 8)
+                  and 4 * bandTop(signal, dr) * steepest * spacing <= SPEED_OF_LIGHT)
+    if not (linear and focusable):
+        return FastBackProjection.paintImage(datalist, measuredBins, platformPos, xCor, yCor, zOffset)
+    signal = shiftRows(signal, shifts, dr)
+
+    signal, u = uniformScans(signal, u)
+    du = u[1] - u[0]
+
+    #only the ranges the image can see, padded so the range FFT does not wrap
+    margin = 64 * dr
+    first = max(int((pixelRho.min() - margin - rangeBins[0]) / dr), 0)
+    last = min(int(np.ceil((farthest + margin - rangeBins[0]) / dr)), len(rangeBins) - 1) + 1
+    signal = signal[:, first:last]
+    r0 = rangeBins[first]
+    numU, numR = len(u) * 2, (last - first) * 2
+    pad = len(u) // 2
+
+    spectrum = np.zeros((numU, numR), np.complex128)
+    spectrum[pad:pad + len(u), :signal.shape[1]] = signal
+    spectrum = np.fft.fft2(spectrum)
+    ku = 2 * np.pi * np.fft.fftfreq(numU, du)
+    kr = 2 * np.pi * np.fft.fftfreq(numR, dr)
+    dk = kr[1]
+
+    #the echo band in round trip wavenumber, everything else is left out of the Stolt grid
+    low = max(int(4 * np.pi * (2 * center - highest) / SPEED_OF_LIGHT / dk), 1)
+    high = min(int(np.ceil(4 * np.pi * highest / SPEED_OF_LIGHT / dk)), numR // 2)
+    kRho = dk * np.arange(low, high)
+    carrier = dk * ((low + high) // 2)
+    #reference focusing at the middle of the scene first, so what the Stolt step interpolates varies slowly
+    reference = (pixelRho.min() + pixelRho.max()) / 2
+    rhoStart = pixelRho.min() - margin
+    positive = kr[:numR // 2]
+    along = ku[:, np.newaxis]
+    spectrum = spectrum[:, :numR // 2] * np.exp(-1j * positive * r0)
+    spectrum *= np.exp(1j * np.sqrt(np.maximum(positive**2 - along**2, 0)) * reference)
+    spectrum[np.abs(along) >= positive * steepest] = 0
+    #Stolt: every (ku, kRho) takes the spectrum at kr = sqrt(kRho**2 + ku**2), rows are laid end to end so one
+    #call interpolates them all, what spills over a row's ends is outside the echo band and close to zero
+    wavenumber = np.sqrt(kRho**2 + along**2)
+    rows = interpIndex(wavenumber / dk + (numR // 2) * np.arange(numU)[:, np.newaxis], spectrum.ravel(), 'sinc')
+    rows[(wavenumber >= positive[-1]) | (np.abs(along) >= wavenumber * steepest)] = 0
+    #stationary phase weight that makes the sum over ku match summing over scans like backprojection
+    rows *= np.sqrt(2 * np.pi * reference * wavenumber**2 / kRho**3) / du
+    rows *= np.exp(-1j * kRho * (reference - rhoStart) + 1j * np.pi / 4)
+
+    #back to (u, rho) with the carrier moved to zero and zeros padded in, so the focused image is smooth
+    #and finely sampled enough to interpolate onto the pixels
+    numRho = oversample * len(kRho)
+    baseband = np.zeros((oversample * numU, numRho), np.complex128)
+    shift = np.round((kRho - carrier) / dk).astype(int) % numRho
+    half = numU // 2
+    baseband[:half, shift] = rows[:half]
+    baseband[-(numU - half):, shift] = rows[half:]
+    #ifft2 divides by the padded size, the sums it stands for run over numU scans and numR range samples
+    image = np.fft.ifft2(baseband) * (oversample * numRho / numR)
+    dRho = 2 * np.pi / (numRho * dk)
+    uStart = u[0] - pad * du
+
+    value = bilinear(image, (pixelU - uStart) / (du / oversample), (pixelRho - rhoStart) / dRho)
+    value *= np.exp(1j * carrier * (pixelRho - rhoStart)) * np.sqrt(pixelRho / reference)
+    return value if np.iscomplexobj(data) else value.real
@@ -0,0 +1,168 @@
+import sys
+import socket
+import select
+import asyncio
+import logging
+import threading
+import Instrumentation
+from MessageCodec import SCAN_INFO, SCAN_HEADER
+import Configuration
+
+logger = logging.getLogger(__name__)
+
+#high rate receive path for RadarSession: a thread that does nothing but recv_into slots of a preallocated
+#arena and hands batches of them to the event loop, so datagrams leave the kernel queue as fast as they come
+#and no bytes object is made per scan datagram
+SLOT_SIZE = 2048 #bytes, an F201 datagram of 350 samples is 1444
+BATCH = 256 #datagrams read before the event loop is woken
+SCAN_TYPE = SCAN_INFO.to_bytes(2, 'big')
+#linux socket options the socket module does not always name
+LINUX = sys.platform.startswith('linux')
+SO_RCVBUFFORCE = getattr(socket, 'SO_RCVBUFFORCE', 33 if LINUX else None)
+SO_RXQ_OVFL = getattr(socket, 'SO_RXQ_OVFL', 40 if LINUX else None)
+
+#ring of fixed size slots, the receiver fills them in order and the consumer releases them in the same order
+#head and tail only ever grow and each is written by one thread, so no lock is needed
+class SlotArena:
+    def __init__(self, slots, slotSize = SLOT_SIZE):
+        self.slots = slots
+        self.buffer = bytearray(slots * slotSize)
+        view = memoryview(self.buffer)
+        self.views = [view[i * slotSize:(i + 1) * slotSize] for i in range(slots)]
+        self.head = 0
+        self.tail = 0
+
+    def full(self):
+        return self.head - self.tail >= self.slots
+
+    def next(self):
+        return self.views[self.head % self.slots]
+
+    def release(self):
+        self.tail += 1
+
+#receiver thread for a connected UDP socket, stands in for the asyncio transport of a RadarSession:
+#sendto and close work the same, scan datagrams reach session.scans as memoryviews into the arena that
+#stay valid until the session releases them, everything else goes to session.datagram_received as bytes
+#the arena bounds how many scans can wait, so the session queue itself is left unbounded
+class Receiver(threading.Thread):
+    #slots and bufferSize default to RECEIVE_SLOTS and RECEIVE_BUFFER
+    def __init__(self, sock, loop, session, slots = None, bufferSize = None):
+        super().__init__(daemon=True)
+        self.sock = sock
+        self.loop = loop
+        self.session = session
+        self.arena = SlotArena(slots or Configuration.RECEIVE_SLOTS)
+        self.peer = sock.getpeername()
+        self.stopped = False
+        self.received = 0
+        self.arenaDrops = 0
+        self.kernelDrops = 0
+        self.bufferSize = setReceiveBuffer(sock, bufferSize or Configuration.RECEIVE_BUFFER)
+        self.countDrops = SO_RXQ_OVFL is not None
+        if self.countDrops:
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, SO_RXQ_OVFL, 1)
+            except OSError:
+                self.countDrops = False
+        #the scratch slot takes datagrams that arrive while every arena slot is held
+        self.scratch = memoryview(bytearray(SLOT_SIZE))
+        sock.setblocking(False)
+
+    #(bytes, kernel drop count or None) for one datagram read into view
+    def receiveInto(self, view):
+        if not self.countDrops:
+            return self.sock.recv_into(view), None
+        nbytes, ancdata, flags, addr = self.sock.recvmsg_into([view], socket.CMSG_SPACE(4))
+        for level, kind, data in ancdata:
+            if level == socket.SOL_SOCKET and kind == SO_RXQ_OVFL:
+                return nbytes, int.from_bytes(data[:4], sys.byteorder)
+        return nbytes, None
+
+    def run(self):
+        while not self.stopped:
+            try:
+                ready = select.select([self.sock], [], [], 0.1)[0]
+            except (OSError, ValueError):
+                break
+            if not ready:
+                continue
+            scans, controls = [], []
+            while len(scans) + len(controls) < BATCH:
+                arenaFull = self.arena.full()
+                view = self.scratch if arenaFull else self.arena.next()
+                try:
+                    nbytes, drops = self.receiveInto(view)
+                except BlockingIOError:
+                    break
+                except OSError as error:
+                    #ICMP port unreachable and the like, the asyncio transport reports these the same way
+                    self.loop.call_soon_threadsafe(self.session.error_received, error)
+                    break
+                self.received += 1
+                if drops is not None:
+                    self.kernelDrops = drops
+                #truncated scans go the control way too, datagram_received drops and counts them
+                if view[:2] != SCAN_TYPE or nbytes < SCAN_HEADER.size:
+                    controls.append(bytes(view[:nbytes]))
+                elif arenaFull:
+                    self.arenaDrops += 1
+                else:
+                    scans.append(view[:nbytes])
+                    self.arena.head += 1
+            if scans or controls:
+                self.loop.call_soon_threadsafe(self.deliver, scans, controls)
+
+    #event loop side of a batch, control replies are counted by datagram_received itself
+    def deliver(self, scans, controls):
+        Instrumentation.count('datagrams_received', len(scans))
+        Instrumentation.count('bytes_received', sum(len(data) for data in scans))
+        for data in controls:
+            self.session.datagram_received(data, self.peer)
+        for data in scans:
+            self.session.scans.put_nowait(data)
+
+    def releaseScan(self):
+        self.arena.release()
+
+    def sendto(self, data, addr = None):
+        self.sock.send(data)
+
+    #counters for the session, kernel drops are cumulative since the socket opened (linux only, else 0)
+    def stats(self):
+        return {'received': self.received, 'arena_drops': self.arenaDrops, 'kernel_drops': self.kernelDrops,
+                'receive_buffer': self.bufferSize}
+
+    def close(self):
+        self.stopped = True
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join()
+        Instrumentation.count('datagrams_dropped_kernel', self.kernelDrops)
+        Instrumentation.count('datagrams_dropped_arena', self.arenaDrops)
+        self.sock.close()
+        self.session.connection_lost(None)
+
+#asks for size bytes of kernel receive queue, forcing past net.core.rmem_max where allowed, returns what
+#the kernel actually gave (linux reports double the usable size)
+def setReceiveBuffer(sock, size):
+    for option in (SO_RCVBUFFORCE, socket.SO_RCVBUF):
+        if option is None:
+            continue
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, option, size)
+            break
+        except OSError:
+            continue
+    actual = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+    if actual < size:
+        logger.warning("Receive buffer is {} bytes, asked for {}".format(actual, size))
+    return actual
+
+#connected UDP socket and a started Receiver driving session from the running event loop
+def openReceiver(session, host, port, **kwargs):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.connect((host, port))
+    receiver = Receiver(sock, asyncio.get_running_loop(), session, **kwargs)
+    session.connection_made(receiver)
+    receiver.start()
+    return receiver
@@ -0,0 +1,57 @@
+import time
+import asyncio
+import tempfile
+import argparse
+import multiprocessing
+import Configuration
+import RadarEmulator
+import client
+
+#how many scans per second the capture path in client.py keeps up with
+#a RadarEmulator in its own process replays a scene at rising rates and every pass is captured the way
+#client.py does it, the highest rate with no lost scan is what the receiver sustains
+#python ReceiverLoadTest.py --rates 100 200 400 800 0 --scans 500
+
+def emulate(scanData, port, rate, burst, drop, reorder):
+    asyncio.run(RadarEmulator.run(scanData, "127.0.0.1", port, rate=rate, burst=burst, drop=drop, reorder=reorder))
+
+#captures one pass from an emulator at rate, returns seconds taken, scans lost and the assembler
+#a pass that loses scans ends with the session's idle timeout, which is included in the seconds
+def measure(scanData, scans, rate, port, burst = 1, drop = 0, reorder = 0):
+    emulator = multiprocessing.Process(target=emulate, args=(scanData, port, rate, burst, drop, reorder), daemon=True)
+    emulator.start()
+    try:
+        #the emulator needs a moment to bind
+        time.sleep(0.5)
+        Configuration.override({'SCAN_COUNT': scans})
+        with tempfile.TemporaryDirectory() as folder:
+            start = time.perf_counter()
+            assembler = asyncio.run(client.capture(folder + '/load.capture', port=port))
+            seconds = time.perf_counter() - start
+        return seconds, scans - assembler.completed, assembler
+    finally:
+        emulator.terminate()
+        emulator.join()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="receiver load test against a local radar emulator")
+    parser.add_argument('source', nargs='?', help="capture to replay, a synthetic scene when left out")
+    parser.add_argument('--rates', nargs='+', type=float, default=[100, 200, 400, 800, 1600, 0],
+                        help="scans per second to try, 0 for as fast as the emulator can send")
+    parser.add_argument('--scans', type=int, default=500)
+    parser.add_argument('--burst', type=int, default=1)
+    parser.add_argument('--drop', type=float, default=0)
+    parser.add_argument('--reorder', type=float, default=0)
+    parser.add_argument('--port', type=int, default=21310)
+    parser.add_argument('--receiver', choices=['thread', 'asyncio'], default=Configuration.RECEIVER)
+    args = parser.parse_args()
+    Configuration.override({'PROGRESS': False, 'RECEIVER': args.receiver})
+    scanData = RadarEmulator.sourceScans(args.source)
+    sustained = 0
+    for rate in args.rates:
+        seconds, lost, assembler = measure(scanData, args.scans, rate, args.port, args.burst, args.drop, args.reorder)
+        print("asked {:>6} scans/s  took {:6.2f} s  lost {:4d} of {} scans  late {}  duplicates {}".format(
+            rate or 'max', seconds, lost, args.scans, assembler.late, assembler.duplicates))
+        if not lost:
+            sustained = max(sustained, args.scans / seconds)
+    print("sustained {:.1f} scans/s without loss".format(sustained))
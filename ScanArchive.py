@@ -0,0 +1,126 @@
+import os
+import sys
+import json
+import time
+import shutil
+import pickle as pkl
+import numpy as np
+import CaptureWriter
+import Instrumentation
+
+#a scan archive is a directory holding meta.json and one .npy file per array
+#arrays are memory mapped when first used, so opening is instant and only the scans read get paged in
+#timestamps are the radar's F201 timestamps of the scans (ms), as captured by client.capture
+VERSION = 1
+EXTENSION = '.scans'
+ARRAYS = ('scan_data', 'platform_pos', 'range_bins', 'timestamps')
+
+class ScanArchive:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        if self.meta.get('version', 0) > VERSION:
+            raise ValueError("{} is archive version {}, this reader knows up to {}".format(path, self.meta['version'], VERSION))
+        self.arrays = {}
+
+    #archive['scan_data'] works like the dicts in the old pickles
+    def __getitem__(self, name):
+        if name not in self.arrays:
+            if name not in self.meta['arrays']:
+                raise KeyError(name)
+            self.arrays[name] = np.load(os.path.join(self.path, name + '.npy'), mmap_mode='r')
+        return self.arrays[name]
+
+    def __contains__(self, name):
+        return name in self.meta['arrays']
+
+    def __len__(self):
+        return self.meta['arrays']['scan_data']['shape'][0]
+
+    def keys(self):
+        return self.meta['arrays'].keys()
+
+    def get(self, name, default = None):
+        return self[name] if name in self else default
+
+    #scans start..stop without touching the rest of the file
+    def scans(self, start, stop = None):
+        return self['scan_data'][start:stop if stop is not None else start + 1]
+
+def jsonable(value):
+    return value.tolist() if hasattr(value, 'tolist') else str(value)
+
+#writes arrays and metadata to path, replacing any archive there once everything is on disk
+#the old archive is renamed aside before the new one takes its place and only deleted after, so a failure
+#at any point leaves one of the two at path
+#meta takes any JSON-able settings, such as the scan configuration the data was taken with
+def writeArchive(path, scanData, platformPos = None, rangeBins = None, timestamps = None, **meta):
+    arrays = {'scan_data': scanData, 'platform_pos': platformPos, 'range_bins': rangeBins, 'timestamps': timestamps}
+    arrays.update({name: meta.pop(name) for name in list(meta) if isinstance(meta[name], np.ndarray)})
+    temp = path + '.{}.tmp'.format(os.getpid())
+    os.makedirs(temp)
+    layout = {}
+    for name, array in arrays.items():
+        if array is None:
+            continue
+        array = np.ascontiguousarray(array)
+        with Instrumentation.timer('write'):
+            np.save(os.path.join(temp, name + '.npy'), array)
+        Instrumentation.count('bytes_written', array.nbytes)
+        layout[name] = {'shape': array.shape, 'dtype': array.dtype.str}
+    meta.update(version=VERSION, created=meta.get('created', time.time()), arrays=layout)
+    with open(os.path.join(temp, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=1, default=jsonable)
+    if not os.path.isdir(path):
+        os.rename(temp, path)
+        return ScanArchive(path)
+    old = path + '.{}.old'.format(os.getpid())
+    os.rename(path, old)
+    try:
+        os.rename(temp, path)
+    except OSError:
+        os.rename(old, path)
+        raise
+    shutil.rmtree(old)
+    return ScanArchive(path)
+
+#archive for the pickle at pklPath, next to it unless archivePath is given
+#dict pickles keep their arrays and put everything else in the metadata, a bare array becomes scan_data
+def convertPickle(pklPath, archivePath = None):
+    archivePath = archivePath or os.path.splitext(pklPath)[0] + EXTENSION
+    with open(pklPath, 'rb') as f:
+        data = pkl.load(f)
+    if not isinstance(data, dict):
+        data = {'scan_data': data}
+    arrays, meta = {}, {'source': os.path.basename(pklPath)}
+    for name, value in data.items():
+        if isinstance(value, (np.ndarray, list, tuple)) and np.asarray(value).dtype != object:
+            arrays[name] = np.asarray(value)
+        else:
+            meta[name] = value
+    return writeArchive(archivePath, arrays.pop('scan_data', np.zeros((0, 0), np.int32)), arrays.pop('platform_pos', None),
+                        arrays.pop('range_bins', None), arrays.pop('timestamps', None), **arrays, **meta)
+
+#archive at path, a capture from CaptureWriter, or the pickle the path names for data that has not been converted
+#whatever is at path itself is loaded, only when nothing is there is the extension filled in, preferring an
+#archive over a capture and a capture over a pickle of the same name
+#always returns something indexed like the marathon pickles, a bare pickled array comes back as scan_data
+def load(path):
+    if not os.path.exists(path):
+        base = os.path.splitext(path)[0] if path.endswith(('.pkl', EXTENSION, CaptureWriter.EXTENSION)) else path
+        path = next((candidate for candidate in (base + EXTENSION, base + CaptureWriter.EXTENSION)
+                     if os.path.isdir(candidate)), base + '.pkl')
+    if os.path.isfile(os.path.join(path, 'meta.json')):
+        return ScanArchive(path)
+    if os.path.isfile(os.path.join(path, 'index.json')):
+        return CaptureWriter.readCapture(path)
+    with open(path, 'rb') as f:
+        data = pkl.load(f)
+    return data if isinstance(data, dict) else {'scan_data': data}
+
+if __name__ == "__main__":
+    #python ScanArchive.py marathon_0.pkl datalist.pkl ...
+    for pklPath in sys.argv[1:]:
+        archive = convertPickle(pklPath)
+        print("{} -> {} ({} scans, arrays {})".format(pklPath, archive.path, len(archive), ", ".join(archive.keys())))
@@ -0,0 +1,114 @@
+import numpy as np
+
+#the P440 splits a scan into datagrams of at most 350 samples
+MAX_SAMPLES_PER_MESSAGE = 350
+
+#reassembles F201 datagrams into scan rows in a preallocated ring
+#each slot tracks which message_index pieces have arrived, a row is handed to
+#onScan(scan, row, missing) as soon as it is complete (missing is then empty)
+#onScan gets a view into the ring, copy it if it has to outlive the call
+#timestamps[scan] is the radar's F201 timestamp of the scan (ms), set when its first piece arrives
+class ScanAssembler:
+    def __init__(self, scanCount, numSamples, numMessages, onScan, samplesPerMessage = MAX_SAMPLES_PER_MESSAGE,
+                 firstMessageID = None, ringSize = 64, fillGaps = True, dtype = np.int32):
+        self.scanCount = scanCount
+        self.numSamples = numSamples
+        self.numMessages = numMessages
+        self.onScan = onScan
+        self.samplesPerMessage = samplesPerMessage
+        self.fillGaps = fillGaps
+        self.ringSize = ringSize
+        self.rows = np.zeros((ringSize, numSamples), dtype)
+        self.arrived = np.zeros((ringSize, numMessages), bool)
+        self.pieces = np.zeros(ringSize, int)
+        self.slotScan = np.full(ringSize, -1)
+        self.done = np.zeros(scanCount, bool)
+        self.timestamps = np.zeros(scanCount, np.int64)
+        #first scan's message id, unwrapped past 16 bits as ids grow
+        self.base = firstMessageID
+        self.lastID = firstMessageID
+        self.completed = 0
+        self.received = 0
+        self.duplicates = 0
+        self.late = 0
+        self.gaps = {}
+
+    #builds an assembler sized from the first decoded datagram of a capture
+    @classmethod
+    def fromMessage(cls, message, scanCount, onScan, **kwargs):
+        if message['message_index'] < message['num_messages_total'] - 1:
+            kwargs.setdefault('samplesPerMessage', message['num_samples_message'])
+        return cls(scanCount, message['num_samples_total'], message['num_messages_total'], onScan, **kwargs)
+
+    @property
+    def complete(self):
+        return self.completed + len(self.gaps) >= self.scanCount
+
+    def unwrap(self, messageID):
+        if self.lastID is None:
+            self.lastID = messageID
+            return messageID
+        seq = self.lastID + ((messageID - self.lastID + 32768) & 0xFFFF) - 32768
+        self.lastID = max(self.lastID, seq)
+        return seq
+
+    #stores one decoded datagram, returns True once every scan has been handed on
+    def add(self, message):
+        index = message['message_index']
+        seq = self.unwrap(message['message_id'])
+        if self.base is None:
+            self.base = seq - index
+        scan = (seq - index - self.base) // self.numMessages
+        self.received += 1
+        if scan < 0 or scan >= self.scanCount or self.done[scan]:
+            self.late += 1
+            return self.complete
+
+        slot = scan % self.ringSize
+        if self.slotScan[slot] != scan:
+            if self.slotScan[slot] >= 0:
+                #the ring moved past an unfinished scan
+                self.flush(slot)
+            self.slotScan[slot] = scan
+            self.timestamps[scan] = message['timestamp']
+            self.rows[slot] = 0
+            self.arrived[slot] = False
+            self.pieces[slot] = 0
+        if self.arrived[slot, index]:
+            self.duplicates += 1
+            return self.complete
+
+        start = index * self.samplesPerMessage
+        self.rows[slot, start:start + message['num_samples_message']] = message['scan_data']
+        self.arrived[slot, index] = True
+        self.pieces[slot] += 1
+        if self.pieces[slot] == self.numMessages:
+            self.done[scan] = True
+            self.completed += 1
+            self.slotScan[slot] = -1
+            self.onScan(scan, self.rows[slot], [])
+        return self.complete
+
+    #gives up on the scan in slot, reporting its missing pieces
+    def flush(self, slot):
+        scan = int(self.slotScan[slot])
+        missing = np.flatnonzero(~self.arrived[slot]).tolist()
+        self.done[scan] = True
+        self.gaps[scan] = missing
+        self.slotScan[slot] = -1
+        if self.fillGaps:
+            self.onScan(scan, self.rows[slot], missing)
+
+    #ends the capture, every scan still outstanding is reported as a gap
+    def finish(self):
+        for slot in np.argsort(self.slotScan):
+            if self.slotScan[slot] >= 0:
+                self.flush(slot)
+        empty = np.zeros(self.numSamples, self.rows.dtype)
+        allMissing = list(range(self.numMessages))
+        for scan in np.flatnonzero(~self.done).tolist():
+            self.done[scan] = True
+            self.gaps[scan] = allMissing
+            if self.fillGaps:
+                self.onScan(scan, empty, allMissing)
+        return self.gaps
@@ -0,0 +1,141 @@
+import queue
+import threading
+from collections import deque
+import numpy as np
+import Instrumentation
+
+#adds one scan's backprojection onto image (rows follow yCor, columns xCor)
+def backprojectScan(image, row, rangeBins, position, xCor, yCor, zOffset = 0):
+    xNP = (xCor - position[0])**2
+    yNP = (yCor - position[1])**2
+    distance = yNP[:, np.newaxis] + xNP[np.newaxis, :]
+    distance += (zOffset - position[2])**2
+    np.sqrt(distance, out=distance)
+    image += np.interp(distance, rangeBins, row)
+
+#backprojects scans on a worker thread while they are still arriving
+#a row added with its position is painted right away, one without is held until setPlatformPos has a
+#position for it (NaN entries count as unknown)
+class StreamingImager:
+    def __init__(self, rangeBins, xCor, yCor, platformPos = None, zOffset = 0, dtype = float):
+        self.rangeBins = np.asarray(rangeBins)
+        self.xCor = np.asarray(xCor)
+        self.yCor = np.asarray(yCor)
+        self.zOffset = zOffset
+        self.platformPos = None if platformPos is None else np.asarray(platformPos)
+        self.image = np.zeros((len(yCor), len(xCor)), dtype)
+        self.imaged = 0
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.worker = threading.Thread(target=self.run, daemon=True)
+        self.worker.start()
+
+    #producer side, row is copied so ring buffers can be reused right away
+    def add(self, scan, row, position = None):
+        self.queue.put((scan, np.array(row, dtype=self.image.real.dtype), position))
+
+    def setPlatformPos(self, platformPos):
+        self.queue.put((None, None, np.asarray(platformPos)))
+
+    #scans added from now on belong to a new pass, numbered from 0 again and waiting for its setPlatformPos
+    #rows of the last pass that never got a position are dropped rather than painted with this pass's
+    def newPass(self):
+        self.queue.put((None, None, self.startPass))
+
+    def startPass(self):
+        self.platformPos = None
+        if self.pending:
+            Instrumentation.count('scans_unpositioned', len(self.pending))
+            self.pending.clear()
+
+    #waits until every scan queued so far that has a position is painted
+    def flush(self):
+        done = threading.Event()
+        self.queue.put((None, None, done.set))
+        done.wait()
+
+    def positionOf(self, scan, position):
+        if position is not None:
+            return position
+        if self.platformPos is not None and scan < len(self.platformPos) and not np.isnan(self.platformPos[scan]).any():
+            return self.platformPos[scan]
+        return None
+
+    def paint(self, scan, row, position):
+        with self.lock, Instrumentation.timer('backprojection'):
+            backprojectScan(self.image, row, self.rangeBins, position, self.xCor, self.yCor, self.zOffset)
+            self.imaged += 1
+        Instrumentation.count('scans_imaged')
+
+    def run(self):
+        while True:
+            scan, row, position = self.queue.get()
+            if scan is None and row is None:
+                if position is None:
+                    return
+                if callable(position):
+                    position()
+                    continue
+                self.platformPos = position
+                for scan in sorted(self.pending):
+                    if self.positionOf(scan, None) is not None:
+                        self.paint(scan, self.pending.pop(scan), self.platformPos[scan])
+                continue
+            position = self.positionOf(scan, position)
+            if position is None:
+                self.pending[scan] = row
+            else:
+                self.paint(scan, row, position)
+
+    #consistent copy of the image so far
+    def snapshot(self):
+        with self.lock:
+            return self.image.copy()
+
+    #waits for every queued scan and returns the image
+    def finish(self):
+        self.queue.put((None, None, None))
+        self.worker.join()
+        return self.image
+
+#StreamingImager over a rolling aperture of the last window scans
+#each scan's row and position are kept until it leaves the window, then its contribution is backprojected
+#again and subtracted, so every new scan costs two scans of work however long the window is
+#the add and subtract pairs leave rounding that grows with every scan, so every resyncEvery windows of scans the
+#image is rebuilt from the kept scans, one more window of work per resyncEvery windows (0 never rebuilds)
+class SlidingImager(StreamingImager):
+    def __init__(self, rangeBins, xCor, yCor, window, platformPos = None, zOffset = 0, dtype = float, resyncEvery = 50):
+        self.window = window
+        self.kept = deque()
+        self.resyncEvery = resyncEvery
+        self.sinceResync = 0
+        super().__init__(rangeBins, xCor, yCor, platformPos, zOffset, dtype)
+
+    def paint(self, scan, row, position):
+        with self.lock, Instrumentation.timer('backprojection'):
+            backprojectScan(self.image, row, self.rangeBins, position, self.xCor, self.yCor, self.zOffset)
+            self.kept.append((row, position))
+            if len(self.kept) > self.window:
+                oldRow, oldPosition = self.kept.popleft()
+                np.negative(oldRow, out=oldRow)
+                backprojectScan(self.image, oldRow, self.rangeBins, oldPosition, self.xCor, self.yCor, self.zOffset)
+            self.imaged += 1
+            self.sinceResync += 1
+            if self.resyncEvery and self.sinceResync >= self.resyncEvery * self.window:
+                self.rebuild()
+        Instrumentation.count('scans_imaged')
+
+    #image from the scans in the window alone, caller holds the lock
+    def rebuild(self):
+        with Instrumentation.timer('resync'):
+            self.image[:] = 0
+            for row, position in self.kept:
+                backprojectScan(self.image, row, self.rangeBins, position, self.xCor, self.yCor, self.zOffset)
+        self.sinceResync = 0
+
+    #rebuilds the image now, once every queued scan is painted
+    def resync(self):
+        self.flush()
+        with self.lock:
+            self.rebuild()
@@ -0,0 +1,78 @@
+import numpy as np
+from Configuration import SPEED_OF_LIGHT
+from Functions import scanRangeBins, tou
+from Point import PointSet
+
+#P440 style pulse, a gaussian windowed carrier
+PULSE_FREQUENCY = 4.3e9 #Hz
+PULSE_BANDWIDTH = 2.2e9 #Hz, -3dB width of the spectrum
+
+#echo of a unit reflector at range r0 (meters) sampled at rangeBins
+def pulse(rangeBins, r0, frequency = PULSE_FREQUENCY, bandwidth = PULSE_BANDWIDTH):
+    delay = 2 * (np.asarray(rangeBins) - r0) / SPEED_OF_LIGHT
+    width = np.sqrt(2 * np.log(2)) / (np.pi * bandwidth)
+    return np.exp(-(delay / width)**2 / 2) * np.cos(2 * np.pi * frequency * delay)
+
+#straight pass along x at the given height and y offset, scans evenly spaced over length meters
+def linearTrack(scans, length = 30, yOffset = -12, height = 5, xCenter = -5):
+    x = np.linspace(xCenter - length / 2, xCenter + length / 2, scans)
+    return np.column_stack([x, np.full(scans, float(yOffset)), np.full(scans, float(height))])
+
+TRAJECTORIES = ('line', 'arc', 'wobble')
+
+#platform positions for a pass of the given kind, centered like linearTrack
+#line is straight and evenly spaced, arc bows sag meters toward the scene in the middle of the pass,
+#wobble is a line with smooth random sway of about sag meters sideways and up and down
+def trajectory(kind, scans, length = 30, yOffset = -12, height = 5, xCenter = -5, sag = 1.0, seed = 0):
+    track = linearTrack(scans, length, yOffset, height, xCenter)
+    along = np.linspace(-1, 1, scans)
+    if kind == 'arc':
+        track[:, 1] += sag * (1 - along**2)
+    elif kind == 'wobble':
+        rng = np.random.default_rng(seed)
+        for axis in (1, 2):
+            phases = rng.uniform(0, 2 * np.pi, 3)
+            track[:, axis] += sag / 3 * sum(np.sin(np.pi * (n + 1) * along + phase) for n, phase in enumerate(phases))
+    elif kind != 'line':
+        raise ValueError("unknown trajectory {}, pick one of {}".format(kind, ", ".join(TRAJECTORIES)))
+    return track
+
+#same echoes as pointTargets, with every round trip time taken from Functions.tou between Points, so the
+#scene is built with the geometry the rest of the code uses
+def touEchoes(platformPos, rangeBins, targets, amplitudes = None, noise = 0, seed = 0):
+    targets = PointSet.fromArray(targets)
+    amplitudes = np.ones(len(targets)) if amplitudes is None else amplitudes
+    #every antenna to every target at once, (scans, targets)
+    ranges = tou(PointSet.fromArray(platformPos), targets) * SPEED_OF_LIGHT / 2
+    datalist = np.zeros((len(platformPos), len(rangeBins)))
+    for target, amplitude in enumerate(amplitudes):
+        datalist += amplitude * pulse(rangeBins[np.newaxis, :], ranges[:, target:target + 1])
+    if noise:
+        datalist += noise * np.random.default_rng(seed).standard_normal(datalist.shape)
+    return datalist
+
+#scan_data for point reflectors at targets (x, y, z) with optional amplitudes and white noise
+def pointTargets(platformPos, rangeBins, targets, amplitudes = None, noise = 0, seed = 0):
+    platformPos = np.asarray(platformPos, dtype=float)
+    targets = np.atleast_2d(np.asarray(targets, dtype=float))
+    amplitudes = np.ones(len(targets)) if amplitudes is None else amplitudes
+    datalist = np.zeros((len(platformPos), len(rangeBins)))
+    for target, amplitude in zip(targets, amplitudes):
+        distance = np.sqrt(((platformPos - target)**2).sum(axis=1))
+        datalist += amplitude * pulse(rangeBins[np.newaxis, :], distance[:, np.newaxis])
+    if noise:
+        datalist += noise * np.random.default_rng(seed).standard_normal(datalist.shape)
+    return datalist
+
+#a few reflectors inside COORDINATES style bounds [x0, x1, y0, y1], returned like a marathon pickle
+def makeScene(scans = 400, samples = 3000, bounds = (-10, 0, -10, 0), pixel = 0.05, scanRes = 32, noise = 0, length = 30):
+    x0, x1, y0, y1 = bounds
+    rangeBins = scanRangeBins(samples, 0, scanRes)
+    platformPos = linearTrack(scans, length)
+    targets = [((x0 + x1) / 2, (y0 + y1) / 2, 0), (x0 + (x1 - x0) / 4, y0 + (y1 - y0) / 4, 0),
+               (x1 - (x1 - x0) / 5, y1 - (y1 - y0) / 3, 0)]
+    datalist = pointTargets(platformPos, rangeBins, targets, noise=noise)
+    xPos = np.arange(x0, x1, pixel)
+    yPos = np.arange(y0, y1, pixel)
+    return {'scan_data': datalist, 'range_bins': rangeBins, 'platform_pos': platformPos, 'x': xPos, 'y': yPos,
+            'targets': np.asarray(targets, dtype=float)}
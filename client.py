@@ -1,336 +1,198 @@
-import socket
+import os
+import sys
+import asyncio
 import logging
-import pickle as pkl
-import numpy as np
-from collections import OrderedDict
-import matplotlib.pyplot as plt
-from alive_progress import alive_bar
-from Configuration import SCAN_COUNT, SCAN_START, SCAN_END, SCAN_RES, BII, SPEED_OF_LIGHT
-#from constants import SPEED_OF_LIGHT
+import argparse
+import Configuration
+
+#capture and imaging from the command line or from other code
+#python client.py                                   asks like before: capture, then image the capture
+#python client.py capture --out run1.capture --image
+#python client.py image run1 --method ffbp --out run1_image.npz --thumbnail run1.png
+#python client.py image run1 run2 run3 --out {}_image.npz --thumbnail {}.jpg      {} is each source's name
+#python client.py stream                            NonStopScan, imaging pass after pass
+#python client.py convert marathon_0.pkl            pickles to scan archives
+#--config FILE and --set NAME=VALUE (repeatable) override Configuration before anything else is imported
+#--metrics FILE writes stage timings and counters as JSON when done, --metrics-every S also logs them every S seconds
 
-answer = input("Do you want to run a new scan? (y/n): ")
-
-#sets up constants
-messageID = 0
-
-#sets up logger
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-handler.setLevel(logging.INFO)
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-handler.setFormatter(formatter)
-logger.addHandler(handler)
-
-#Error Code Reader
-def errorCode(code):
-    ##print(messageID)
-    if(code == 0):
-        print("Success")
-    elif(code == 1):
-        print("Generic Failure")
-    elif(code == 2):
-        print("Wrong Op Mode")
-    elif(code == 3):
-        print("Unsupported Value")
-    elif(code == 4):
-        print("Invalid During Sleep")
-    elif(code == 5):
-        print("Wrong Message Size")
-    elif(code == 6):
-        print("Not Enabled")
-    elif(code == 7):
-        print("Wrong Buffer Size")
-    else:
-        print("Unrecognized Message Type")
-
-#connection status reader
-def connectionstatus(code):
-    if (code==0):
-        print("Successful")
-    elif (code==1):
-        print("General Error")
-    else:
-        print("MRM already in use")
-
-#1101
-def setConfigConfirm(data, m):
-    m['status'] = int.from_bytes(data[4:8],'big')
-    errorCode(m["status"])
-
-#1102
-def decodeGetConfig(data, m):
-    m['node_id'] = int.from_bytes(data[4:8],'big')
-    m['scan_start'] = int.from_bytes(data[8:12],'big',signed=True)
-    m['scan_end'] = int.from_bytes(data[12:16],'big',signed=True)
-    m['scan_res'] = int.from_bytes(data[16:18],'big')
-    m['base_integration_index'] = int.from_bytes(data[18:20],'big')
-    m['antenna_mode'] = int.from_bytes(data[20:21],'big')
-    m['transmit_gain'] = int.from_bytes(data[21:22],'big')
-    m['code_channel'] = int.from_bytes(data[22:23],'big')
-    m['persist_flag'] = int.from_bytes(data[23:24],'big')
-    m['timestamp'] = int.from_bytes(data[24:28],'big')
-    m['status'] = int.from_bytes(data[28:32],'big')
-
-#1103
-def decodeCtrlConfirm(data, m):
-    m['status'] = int.from_bytes(data[4:8], 'big')
-    errorCode(m["status"])
-
-#1104
-def decodeServerConnect(data, m):
-    m['connection status'] = int.from_bytes(data[4:8], 'big')
-    connectionstatus(m["connection status"])
-
-#1105
-def MRMServerDisConfirm(data, m):
-    m['status'] = int.from_bytes(data[4:8],'big')
-    errorCode(m["status"])
-
-#1106
-def setFilterConfig(data, m):
-    m['status'] = int.from_bytes(data[4:8],'big')
-    errorCode(m["status"])
-
-#1107
-def decodeGetFilterConfig(data, m):
-    m['filter_mask'] = int.from_bytes(data[4:6],'big')
-    m['motion_filter_index'] = int.from_bytes(data[6:7],'big')
-    m['reserved'] = int.from_bytes(data[7:8],'big')
-    m['status'] = int.from_bytes(data[8:12],'big')
-    errorCode(m["status"])
-
-#F101
-def mrm_get_statusinfo_confirm(data, m):
-    m['MRM Version Major'] = int.from_bytes(data[4:5],'little')
-    m['MRM Version Minor'] = int.from_bytes(data[5:6],'little')
-    m['MRM Version Build'] = int.from_bytes(data[6:8],'little')
-    m['UWB Kernel Major'] = int.from_bytes(data[8:9],'little')
-    m['UWB Kernel Minor'] = int.from_bytes(data[9:10],'little')
-    m['UWB Kernel Built'] = int.from_bytes(data[10:12],'little')
-    m['FPGA Firmware Version'] = int.from_bytes(data[12:13],'little')
-    m['FPGA Firmware Year'] = int.from_bytes(data[13:14],'little')
-    m['FPGA Firmware Month'] = int.from_bytes(data[14:15],'little')
-    m['FPGA Firmware Day'] = int.from_bytes(data[15:16],'little')
-    m['Serial Number'] = int.from_bytes(data[16:22],'little')
-    m['Board Version'] = int.from_bytes(data[22:23],'little')
-    m['Power-On Bit Test Result'] = int.from_bytes(data[23:24],'little')
-    m['Board Type'] = int.from_bytes(data[24:25],'little')
-    m['Transmitter Configuration'] = int.from_bytes(data[25:26],'little')
-    m['Temperature'] = int.from_bytes(data[26:30],'little')
-    m['Package Version'] = int.from_bytes(data[30:62],'little')
-    m['status'] = int.from_bytes(data[62:66], 'little')
-    errorCode(m['status'])
-
-#F103
-def decodeOpMode(data, m):
-    m['operational mode'] = int.from_bytes(data[4:8], 'big')
-    m['status'] = int.from_bytes(data[8:12], 'big')
-    errorCode(m["status"])
-
-#F105
-def decodeSetSleepmode(data, m):
-    m['status'] = int.from_bytes(data[4:8],'big')
-    errorCode(m["status"])
-
-#F106
-def decodeGetSleepmode(data, m):
-    m['sleep_mode'] = int.from_bytes(data[4:8],'big')
-    m['status'] = int.from_bytes(data[8:12],'big')
-    errorCode(m["status"])
-
-#FFFF
-def decodeCommComfirm(data, m):
-    m['uint8_val'] = int.from_bytes(data[4:5],'big')
-    m['uint16_val'] = int.from_bytes(data[5:7],'big')
-    m['uint32_val'] = int.from_bytes(data[7:11],'big')
-    m['int8_val'] = int.from_bytes(data[11:12],'big',signed=True)
-    m['int16_val'] = int.from_bytes(data[12:14],'big',signed=True)
-    m['int32_val'] = int.from_bytes(data[14:18],'big',signed=True)
-    m['char[15]'] = data[18:33]
-    m['status'] = int.from_bytes(data[33:37],'big')
-    errorCode(m['status'])
 
-#F201
-def decodeScan(data):
-    m = OrderedDict()
-    m['message_type'] = int.from_bytes(data[0:2],'big')
-    m['message_id'] = int.from_bytes(data[2:4],'big')
-    m['source_id'] = int.from_bytes(data[4:8],'big')
-    m['timestamp'] = int.from_bytes(data[8:12],'big')
-    m['scan_start'] = int.from_bytes(data[28:32],'big', signed=True)
-    m['scan_stop'] = int.from_bytes(data[32:36],'big',signed=True)
-    m['scan_step'] = int.from_bytes(data[36:38],'big',signed=True)
-    m['scan_type'] = int.from_bytes(data[38:39],'big')
-    m['antenna_id'] = int.from_bytes(data[40:41],'big')
-    m['operational_mode'] = int.from_bytes(data[41:42],'big')
-    m['num_samples_message'] = int.from_bytes(data[42:44],'big')
-    m['num_samples_total'] = int.from_bytes(data[44:48],'big')
-    m['message_index'] = int.from_bytes(data[48:50],'big')
-    m['num_messages_total'] = int.from_bytes(data[50:52],'big')
-    m['scan_data'] = []
-    #could improve
-    for i in range(m['num_samples_message']):
-        m['scan_data'].append(int.from_bytes(data[52+(i*4):56+(i*4)],'big', signed=True))
-    return m
-
-
-#mainDecoder
-def decodeMessage(data):
-    m = OrderedDict()
-    m['message_type'] = int.from_bytes(data[0:2],'big')
-    m['message_id'] = int.from_bytes(data[2:4],'big')
-    if m['message_type'] == 65535:
-        decodeCommComfirm(data, m)
-    elif m['message_type'] == 4353:#1101
-        setConfigConfirm(data, m)
-    elif m['message_type'] == 4354:#1102
-        decodeGetConfig(data, m)
-    elif m['message_type'] == 4355:#1103
-        decodeCtrlConfirm(data, m)
-    elif m['message_type'] == 4356:#1104
-        decodeServerConnect(data, m)
-    elif m['message_type'] == 4357:#1105
-        MRMServerDisConfirm(data, m)
-    elif m['message_type'] == 4358:#1106
-        setFilterConfig(data, m)
-    elif m['message_type'] == 4359:#1107
-        decodeCommComfirm(data, m)
-    elif m['message_type'] == 61699:#F103
-        decodeOpMode(data, m)
-    elif m['message_type'] == 61701:#F105
-        decodeSetSleepmode(data, m)
-    elif m['message_type'] == 61702:#F106
-        decodeGetSleepmode(data, m)
-    elif m['message_type'] == 61953: #F201
-        decodeScan(data, m)
-    return m
-
-#FFFE
-def encodeCommConf():
-    global messageID
-    message = bytes.fromhex("FFFE") + int.to_bytes(messageID, 2, 'big')
-    messageID += 1
-    for i in range(3):
-        message = message + int.to_bytes(i+1,2**i,'big')
-    for i in range(3):
-        message = message + int.to_bytes(-i-1,2**i,'big',signed=True)
-    #print(b)
-    return message
-
-#1001
-def encodeSetConf(scanStart, scanEnd, scan_res, baseInter):
-    global messageID
-    message = bytes.fromhex("1001") + int.to_bytes(messageID, 2, 'big')
-    messageID += 1
-    node_id = 1
-    scanEnd = int(scanEnd*2e12/SPEED_OF_LIGHT)
-    message = message + int.to_bytes(node_id, 4, 'big')
-    message = message + int.to_bytes(scanStart, 4, 'big', signed = True)
-    message = message + int.to_bytes(scanEnd, 4, 'big', signed = True)
-    message = message + int.to_bytes(scan_res, 2, 'big')
-    message = message + int.to_bytes(baseInter, 2, 'big')
-    for i in range(4):
-        message = message + int.to_bytes(0, 2, 'big')
-    for i in range(4):
-        message = message + int.to_bytes(0, 1, 'big')
-    ant_mode = 2 #2: B->A 3: A->B
-    tx_gain_ind = 32 #0-63
-    codeChannel = 7 #0-10
-    persistFlag = 0 #0 - not persist 1 - will persist
-    message = message + int.to_bytes(ant_mode, 1, 'big')
-    message = message + int.to_bytes(tx_gain_ind, 1, 'big')
-    message = message + int.to_bytes(codeChannel, 1, 'big')
-    message = message + int.to_bytes(persistFlag, 1, 'big')
-    return message #1001
-
-#1002
-def encodeGetConf():
-    global messageID
-    message = bytes.fromhex("1002") + int.to_bytes(messageID, 2, 'big')
-    messageID += 1
-    return message
-
-def encodeServerConnect():
-    global messageID
-    message = bytes.fromhex('1004') + int.to_bytes(messageID, 2, 'big')
-    messageID += 1
-    MRMIPAddress = "127.0.0.1"
-    MRMIAddress = MRMIPAddress.split(".")
-    for item in MRMIAddress:
-        message = message + bytes(item, 'utf-16')
-    MRMIPPort = 21210
-    reserved = 0
-    ##message = message + bytes(MRMIPAddress, 'utf-16')
-    message = message + int.to_bytes(MRMIPPort, 2, 'big')
-    message = message + int.to_bytes(reserved, 2, 'big')
-    return message
-
-def encodeServerDisconnect():
-    global messageID
-    message = bytes.fromhex("1005") + int.to_bytes(messageID, 2, 'big')
-    messageID += 1
-    return message
-
-#1003
-def encodeCtrlReq(scanCount): 
-    global messageID
-    message = bytes.fromhex('1003') + int.to_bytes(messageID, 2, 'big')
-    messageID += 1
-    reserved = 0
-    scanIntTime = 0
-    message = message + int.to_bytes(scanCount, 2, 'big')
-    message = message + int.to_bytes(reserved, 2, 'big')
-    message = message + int.to_bytes(scanIntTime, 4, 'big')
-    return message
-    
-
-def send_receive(message):
-    s.sendall(message)
+#sets up logger, the capture modules log under their own names and share its handler
+def setupLogging():
+    if logger.handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.setLevel(logging.INFO)
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    for name in (__name__, 'RadarSession', 'Receiver', 'Instrumentation', 'ImageExport'):
+        moduleLogger = logging.getLogger(name)
+        moduleLogger.setLevel(logging.INFO)
+        moduleLogger.addHandler(handler)
+
+#runs the setup handshake and streams every scan to the capture at path
+#returns the assembler, its completed, gaps, late and duplicates counters say how the capture went
+async def capture(path, host = "127.0.0.1", port = 21210):
+    from Functions import progress
+    from MessageCodec import decodeScan
+    from RadarSession import openSession
+    from ScanAssembler import ScanAssembler
+    from CaptureWriter import CaptureWriter
+    import Instrumentation
+    from Configuration import SCAN_COUNT, SCAN_START, SCAN_END, SCAN_RES, BII
+    session = await openSession(host, port)
+    #an unreachable radar or a failed capture should not leave its receiver behind when others are still capturing
     try:
-        data, address = s.recvfrom(4096)
-        message = decodeMessage(data)
-        logger.info(message)
-    except:
-        print("Message Dropped: #" + str(messageID))
-
-if answer == 'y':
-    #sets up socket connection
-    running = input("Press any button if emulator is running and ready")
-    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    port = 21210
-    server_address = ("127.0.0.1", port)
-    s.connect(server_address)
-    s.settimeout(2)
-
-    send_receive(encodeCommConf())
-    send_receive(encodeSetConf(SCAN_START, SCAN_END, SCAN_RES, BII))
-    send_receive(encodeGetConf())
-    send_receive(encodeCtrlReq(SCAN_COUNT))
-
-    messageID += 1
-    data, address = s.recvfrom(4096)
-    message = decodeScan(data)
-    messageNum = message['num_messages_total']
-    datalist = np.zeros((SCAN_COUNT, message['num_samples_total']))
-    end = False
-    with alive_bar(SCAN_COUNT*messageNum) as bar:
-        while not end:
-            message = decodeScan(data)
-            index = message['message_index']
-            scan = int((message['message_id'] - 4 - index)/messageNum)
-            datalist[scan][index*350:(index*350+message['num_samples_message'])] = message['scan_data']
-            try:
-                data, address = s.recvfrom(4096)
-            except:
-                print("Finished gathering data")
-                end = True
-            bar()
-
-    with open('datalist.pkl', 'wb') as f:
-        pkl.dump(datalist, f)
-
-    s.close()
-    exec(open("./BackProjection.py").read())
-else:
-    exec(open("./BackProjection.py").read())
+        await session.configure(SCAN_START, SCAN_END, SCAN_RES, BII, SCAN_COUNT)
+        data = await session.nextScan(Configuration.IDLE_TIMEOUT)
+        if data is None:
+            raise TimeoutError("No scans from {}:{} within {} s of the scan request".format(host, port,
+                                                                                         Configuration.IDLE_TIMEOUT))
+        first = decodeScan(data)
+        #radar samples are int32, imaging converts them to the configured precision
+        #scans go to disk as they complete, so a crash keeps everything up to the last chunk
+        writer = CaptureWriter(path, first['num_samples_total'], scan_start=SCAN_START, scan_end=SCAN_END,
+                               scan_res=SCAN_RES, bii=BII, scan_count=SCAN_COUNT)
+        with writer, progress(SCAN_COUNT) as bar:
+            def keep(scan, row, missing):
+                Instrumentation.count('scans_captured')
+                writer.append(scan, row, assembler.timestamps[scan])
+                if missing:
+                    print("Scan {} is missing pieces {}".format(scan, missing))
+                bar()
+            #scan message ids continue from the scan request
+            assembler = ScanAssembler.fromMessage(first, SCAN_COUNT, keep, firstMessageID=session.firstScanID)
+            async def store(data):
+                with Instrumentation.timer('decode'):
+                    message = decodeScan(data)
+                with Instrumentation.timer('reassembly'):
+                    return assembler.add(message)
+            if not await store(data):
+                await session.stream(store, Configuration.IDLE_TIMEOUT)
+            if not assembler.complete:
+                print("Gave up on {} incomplete scans".format(len(assembler.finish())))
+        Instrumentation.count('datagrams_duplicated', assembler.duplicates)
+        Instrumentation.count('datagrams_late', assembler.late)
+        Instrumentation.count('scans_incomplete', len(assembler.gaps))
+        print("Finished gathering data")
+        if hasattr(session.transport, 'stats'):
+            print("Receiver: {received} datagrams, {kernel_drops} dropped by the kernel, {arena_drops} by a full arena, "
+                  "{receive_buffer} byte receive buffer".format(**session.transport.stats()))
+    finally:
+        session.close()
+    return assembler
+
+def image(source, method, out = None, plot = None, show = False, thumbnail = None):
+    import Imaging
+    result = Imaging.imageScans(source, method)
+    print("Imaged {} with {} in {:.2f} s".format(source, method, result['seconds']))
+    if out:
+        Imaging.saveImage(out, result)
+    if thumbnail:
+        import ImageExport
+        ImageExport.writeThumbnail(thumbnail, result['img'])
+    if plot or show:
+        Imaging.plotImage(result, source, plot, show)
+    return result
+
+#output path for one of several sources, {} in pattern becomes the source's name
+def outputPath(pattern, source, many):
+    if pattern is None:
+        return None
+    if '{}' not in pattern and many:
+        base, extension = os.path.splitext(pattern)
+        pattern = base + '_{}' + extension
+    return pattern.format(os.path.splitext(os.path.basename(source.rstrip('/\\')))[0])
+
+#images every source in turn while the previous results are exported on a background thread
+#plots are drawn on this thread, matplotlib is not thread safe, each one shown in turn with show
+def imageMany(sources, method, out = None, thumbnail = None, plot = None, show = False):
+    import Imaging
+    from ImageExport import Exporter
+    with Exporter() as exporter:
+        for source in sources:
+            result = Imaging.imageScans(source, method)
+            print("Imaged {} with {} in {:.2f} s".format(source, method, result['seconds']))
+            many = len(sources) > 1
+            outPath = outputPath(out, source, many)
+            if outPath and outPath.endswith('.pkl'):
+                Imaging.saveImage(outPath, result)
+                outPath = None
+            exporter.submit(result, outPath, outputPath(thumbnail, source, many))
+            if plot or show:
+                Imaging.plotImage(result, source, outputPath(plot, source, many), show)
+
+#the original prompts, kept for running client.py with no arguments
+def interactive():
+    answer = input("Do you want to run a new scan? (y/n): ")
+    if answer == 'y':
+        input("Press any button if emulator is running and ready")
+        asyncio.run(capture('datalist.capture'))
+    import BackProjection
+    BackProjection.main()
+
+def parseArgs(argv):
+    parser = argparse.ArgumentParser(description="UAS-SAR capture and imaging")
+    parser.add_argument('--config', help="JSON file of settings")
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE', help="override one setting")
+    parser.add_argument('--quiet', action='store_true', help="no progress bars")
+    parser.add_argument('--metrics', help="write instrumentation JSON here when done")
+    parser.add_argument('--metrics-every', type=float, default=0, help="log instrumentation every this many seconds")
+    commands = parser.add_subparsers(dest='command')
+    captureArgs = commands.add_parser('capture', help="record a pass from the radar or emulator")
+    captureArgs.add_argument('--out', default='datalist.capture')
+    captureArgs.add_argument('--host', default="127.0.0.1")
+    captureArgs.add_argument('--port', type=int, default=21210)
+    captureArgs.add_argument('--image', action='store_true', help="image the capture when it is done")
+    captureArgs.add_argument('--method', default='jit')
+    imageArgs = commands.add_parser('image', help="image a capture, archive or pickle")
+    imageArgs.add_argument('sources', nargs='+')
+    imageArgs.add_argument('--method', default='jit')
+    imageArgs.add_argument('--out', help="image, x and y as .npz, memmappable .npy or a .pkl dict")
+    imageArgs.add_argument('--thumbnail', help="PNG or JPEG of the image in dB, no matplotlib")
+    imageArgs.add_argument('--plot', help="save a matplotlib plot with axes to this file")
+    imageArgs.add_argument('--show', action='store_true')
+    commands.add_parser('stream', help="image pass after pass until stopped")
+    convertArgs = commands.add_parser('convert', help="turn pickles into scan archives")
+    convertArgs.add_argument('pickles', nargs='+')
+    return parser.parse_args(argv)
+
+def main(argv = None):
+    args = parseArgs(sys.argv[1:] if argv is None else argv)
+    if args.config:
+        Configuration.loadFile(args.config)
+    Configuration.override(dict(setting.split('=', 1) for setting in args.set))
+    if args.quiet:
+        Configuration.override({'PROGRESS': False})
+    setupLogging()
+    import Instrumentation
+    if args.metrics or args.metrics_every or Configuration.INSTRUMENT:
+        Instrumentation.enable()
+        Instrumentation.startLogging(args.metrics_every)
+    try:
+        run(args)
+    finally:
+        Instrumentation.stopLogging()
+        if args.metrics:
+            Instrumentation.dump(args.metrics)
+
+def run(args):
+    if args.command is None:
+        interactive()
+    elif args.command == 'capture':
+        asyncio.run(capture(args.out, args.host, args.port))
+        if args.image:
+            image(args.out, args.method, show=True)
+    elif args.command == 'image':
+        imageMany(args.sources, args.method, args.out, args.thumbnail, args.plot, args.show)
+    elif args.command == 'stream':
+        import NonStopScan
+        NonStopScan.main()
+    elif args.command == 'convert':
+        import ScanArchive
+        for pklPath in args.pickles:
+            archive = ScanArchive.convertPickle(pklPath)
+            print("{} -> {} ({} scans)".format(pklPath, archive.path, len(archive)))
+
+if __name__ == "__main__":
+    main()
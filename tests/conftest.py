@@ -0,0 +1,29 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+#the modules live flat in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TARGETS = ((-5, -2, 0), (-5.5, -1.5, 0))
+
+#two point reflectors seen from a straight 4 m pass, small enough for the per-scan reference loops
+#datalist, rangeBins, platformPos, xCor, yCor like every paintImage takes them
+@pytest.fixture(scope='session')
+def scene():
+    import Configuration
+    import SyntheticScene
+    from Functions import scanRangeBins
+    Configuration.override({'PROGRESS': False})
+    rangeBins = scanRangeBins(1600, 0)
+    platformPos = SyntheticScene.trajectory('line', 64, length=4, yOffset=-8, height=3, xCenter=-5)
+    xCor = np.linspace(-6, -4, 32, endpoint=False)
+    yCor = np.linspace(-3, -1, 32, endpoint=False)
+    return SyntheticScene.touEchoes(platformPos, rangeBins, TARGETS), rangeBins, platformPos, xCor, yCor
+
+#BPRangeBin's image of the scene, what the faster engines are held to
+@pytest.fixture(scope='session')
+def reference(scene):
+    import BPRangeBin
+    return BPRangeBin.paintImage(*scene)
@@ -0,0 +1,123 @@
+import os
+import json
+import numpy as np
+import pytest
+import ScanArchive
+from CaptureWriter import CaptureWriter, readCapture
+
+NUM_SAMPLES = 50
+
+def makeRows(scans, seed = 0):
+    rows = np.random.default_rng(seed).integers(-2**31, 2**31, (scans, NUM_SAMPLES), dtype=np.int64).astype(np.int32)
+    #extremes next to each other wrap the int32 delta coding
+    rows[0, :4] = [2**31 - 1, -2**31, 2**31 - 1, 0]
+    return rows
+
+def writeCapture(path, rows, scans, **meta):
+    with CaptureWriter(path, NUM_SAMPLES, chunkScans=4, **meta) as writer:
+        for scan in scans:
+            writer.append(scan, rows[scan], 1000.0 + scan)
+
+def testRoundTrip(tmp_path):
+    path = str(tmp_path / 'run.capture')
+    rows = makeRows(10)
+    writeCapture(path, rows, range(10), scan_count=10, bii=8)
+    data = readCapture(path)
+    np.testing.assert_array_equal(data['scan_data'], rows)
+    np.testing.assert_array_equal(data['timestamps'], 1000.0 + np.arange(10))
+    assert data['received'].all()
+    assert data['bii'] == 8 and data['complete']
+
+def testMissingTrailingScans(tmp_path):
+    path = str(tmp_path / 'run.capture')
+    rows = makeRows(8)
+    writeCapture(path, rows, [0, 1, 3, 4], scan_count=8)
+    data = readCapture(path)
+    assert data['scan_data'].shape == (8, NUM_SAMPLES)
+    np.testing.assert_array_equal(data['received'], [True, True, False, True, True, False, False, False])
+    np.testing.assert_array_equal(data['scan_data'][[0, 1, 3, 4]], rows[[0, 1, 3, 4]])
+    assert not data['scan_data'][[2, 5, 6, 7]].any()
+
+def testWithoutScanCount(tmp_path):
+    path = str(tmp_path / 'run.capture')
+    rows = makeRows(3)
+    writeCapture(path, rows, [0, 2])
+    assert readCapture(path)['scan_data'].shape == (3, NUM_SAMPLES)
+
+def testTornTail(tmp_path):
+    path = str(tmp_path / 'run.capture')
+    rows = makeRows(10)
+    writeCapture(path, rows, range(10), scan_count=10)
+    chunks = os.path.join(path, 'chunks.bin')
+    with open(chunks, 'r+b') as f:
+        f.truncate(os.path.getsize(chunks) - 5)
+    data = readCapture(path)
+    #the last chunk held scans 8 and 9
+    np.testing.assert_array_equal(data['received'], [True] * 8 + [False] * 2)
+    np.testing.assert_array_equal(data['scan_data'][:8], rows[:8])
+
+def testChunksAfterLastIndex(tmp_path):
+    path = str(tmp_path / 'run.capture')
+    rows = makeRows(6)
+    writer = CaptureWriter(path, NUM_SAMPLES, chunkScans=2, flushEvery=3600, scan_count=6)
+    for scan in range(6):
+        writer.append(scan, rows[scan])
+    #the writer thread empties its queue without rewriting the index, as if the process died here
+    writer.queue.put(None)
+    writer.thread.join()
+    writer.file.close()
+    data = readCapture(path)
+    assert not data['complete']
+    np.testing.assert_array_equal(data['scan_data'], rows)
+    assert np.isnan(data['timestamps']).all()
+
+def testLoadPrefersExactPath(tmp_path):
+    base = str(tmp_path / 'datalist')
+    writeCapture(base + '.capture', makeRows(5), range(5), scan_count=5)
+    ScanArchive.writeArchive(base + '.scans', makeRows(3))
+    assert len(ScanArchive.load(base + '.capture')['scan_data']) == 5
+    assert len(ScanArchive.load(base + '.scans')['scan_data']) == 3
+    assert len(ScanArchive.load(base)['scan_data']) == 3
+    assert len(ScanArchive.load(base + '.pkl')['scan_data']) == 3
+
+#a damaged chunk the index lists loses only its own scans, the index finds the chunks after it
+def testDamagedIndexedChunk(tmp_path):
+    path = str(tmp_path / 'run.capture')
+    rows = makeRows(10)
+    writeCapture(path, rows, range(10), scan_count=10)
+    with open(os.path.join(path, 'index.json')) as f:
+        second = json.load(f)['chunks'][1]
+    with open(os.path.join(path, 'chunks.bin'), 'r+b') as f:
+        f.seek(second['offset'] + second['length'] - 1)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([last[0] ^ 0xff]))
+    data = readCapture(path)
+    #chunks of 4 scans, the second held scans 4 to 7
+    np.testing.assert_array_equal(data['received'], [True] * 4 + [False] * 4 + [True] * 2)
+    np.testing.assert_array_equal(data['scan_data'][[0, 1, 2, 3, 8, 9]], rows[[0, 1, 2, 3, 8, 9]])
+
+#a chunk that is intact but not the one its index entry describes is skipped too
+def testIndexMismatch(tmp_path):
+    path = str(tmp_path / 'run.capture')
+    rows = makeRows(8)
+    writeCapture(path, rows, range(8), scan_count=8)
+    indexPath = os.path.join(path, 'index.json')
+    with open(indexPath) as f:
+        index = json.load(f)
+    index['chunks'][0]['scans'] = 3
+    with open(indexPath, 'w') as f:
+        json.dump(index, f)
+    np.testing.assert_array_equal(readCapture(path)['received'], [False] * 4 + [True] * 4)
+
+#an error leaving the with block is what the caller sees, not a close failing after it
+def testExitKeepsErrorInFlight(tmp_path):
+    with pytest.raises(KeyError):
+        with CaptureWriter(str(tmp_path / 'run.capture'), NUM_SAMPLES) as writer:
+            writer.error = OSError("disk full")
+            raise KeyError("scan")
+
+def testExitRaisesCloseError(tmp_path):
+    with pytest.raises(OSError):
+        with CaptureWriter(str(tmp_path / 'run.capture'), NUM_SAMPLES) as writer:
+            writer.error = OSError("disk full")
@@ -0,0 +1,27 @@
+import numpy as np
+import BPRangeBin
+import FactorizedBackProjection
+from FactorizedBackProjection import analytic
+
+#FFBP interpolates baseband subimages, so it is compared on analytic echoes where the reference is smooth too
+def testMatchesReference(scene):
+    datalist, rangeBins, platformPos, xCor, yCor = scene
+    signal = analytic(datalist)
+    reference = BPRangeBin.paintImage(signal, rangeBins, platformPos, xCor, yCor)
+    image = FactorizedBackProjection.paintImage(signal, rangeBins, platformPos, xCor, yCor)
+    assert image.shape == reference.shape
+    assert np.abs(np.abs(image) - np.abs(reference)).max() < 0.35 * np.abs(reference).max()
+    assert np.abs(image).argmax() == np.abs(reference).argmax()
+
+def testSilentScans(scene):
+    datalist, rangeBins, platformPos, xCor, yCor = scene
+    for silent in (np.zeros(datalist.shape), np.zeros(datalist.shape, complex)):
+        image = FactorizedBackProjection.paintImage(silent, rangeBins, platformPos, xCor, yCor)
+        assert image.shape == (len(yCor), len(xCor))
+        assert image.dtype == silent.dtype
+        assert not image.any()
+
+def testConstantScans(scene):
+    datalist, rangeBins, platformPos, xCor, yCor = scene
+    image = FactorizedBackProjection.paintImage(np.ones(datalist.shape), rangeBins, platformPos, xCor, yCor)
+    np.testing.assert_allclose(image, len(datalist), rtol=1e-5)
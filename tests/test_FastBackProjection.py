@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+import BPRangeBin
+import FastBackProjection
+from FactorizedBackProjection import analytic
+
+#one scan per block, a few per block and every scan in one block all give the reference image
+@pytest.mark.parametrize('memoryBudget', [1, 200000, 2**30])
+def testMatchesReference(scene, reference, memoryBudget):
+    image = FastBackProjection.paintImage(*scene, memoryBudget=memoryBudget)
+    assert image.shape == reference.shape
+    np.testing.assert_allclose(image, reference, atol=1e-9 * np.abs(reference).max())
+
+def testSinglePrecision(scene, reference):
+    image = FastBackProjection.paintImage(*scene, precision='single')
+    assert image.dtype == np.float32
+    np.testing.assert_allclose(image, reference, atol=1e-4 * np.abs(reference).max())
+
+def testComplexScans(scene):
+    datalist, rangeBins, platformPos, xCor, yCor = scene
+    signal = analytic(datalist)
+    reference = BPRangeBin.paintImage(signal, rangeBins, platformPos, xCor, yCor)
+    image = FastBackProjection.paintImage(signal, rangeBins, platformPos, xCor, yCor)
+    np.testing.assert_allclose(image, reference, atol=1e-9 * np.abs(reference).max())
+
+def testUnevenBins(scene):
+    datalist, rangeBins, platformPos, xCor, yCor = scene
+    uneven = rangeBins + 0.2 * (rangeBins[1] - rangeBins[0]) * np.sin(np.arange(len(rangeBins)))
+    reference = BPRangeBin.paintImage(datalist, uneven, platformPos, xCor, yCor)
+    image = FastBackProjection.paintImage(datalist, uneven, platformPos, xCor, yCor)
+    np.testing.assert_allclose(image, reference, atol=1e-9 * np.abs(reference).max())
@@ -0,0 +1,42 @@
+import os
+import numpy as np
+import GeometryCache
+
+#float32 fractions of a bin in the cached maps keep a hit within about 1e-7 of a bin of the reference
+TOLERANCE = 1e-5
+
+#the miss paints and stores the map, the hit paints from it, both give the reference image
+def testMissThenHit(scene, reference, tmp_path):
+    cache = GeometryCache.GeometryCache(str(tmp_path))
+    miss = GeometryCache.paintImage(*scene, cache=cache)
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert len(cache.entries()) == 1
+    hit = GeometryCache.paintImage(*scene, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    np.testing.assert_allclose(miss, reference, atol=1e-9 * np.abs(reference).max())
+    np.testing.assert_allclose(hit, reference, atol=TOLERANCE * np.abs(reference).max())
+
+#a map built on its own matches the one stored while painting
+def testRangeIndexMatchesPainted(scene, tmp_path):
+    datalist, rangeBins, platformPos, xCor, yCor = scene
+    painted = GeometryCache.GeometryCache(str(tmp_path / 'painted'))
+    GeometryCache.paintImage(*scene, cache=painted)
+    built = GeometryCache.GeometryCache(str(tmp_path / 'built'))
+    rangeIndex = built.rangeIndex(platformPos, xCor, yCor, rangeBins)
+    assert built.misses == 1
+    np.testing.assert_array_equal(rangeIndex, painted.get(platformPos, xCor, yCor, rangeBins))
+
+#single precision misses paint without storing a map
+def testSingleDoesNotStore(scene, reference, tmp_path):
+    cache = GeometryCache.GeometryCache(str(tmp_path))
+    image = GeometryCache.paintImage(*scene, cache=cache, precision='single')
+    assert image.dtype == np.float32
+    assert cache.entries() == []
+    np.testing.assert_allclose(image, reference, atol=1e-4 * np.abs(reference).max())
+
+#a map larger than the cache is never written
+def testTooLargeNotStored(scene, tmp_path):
+    cache = GeometryCache.GeometryCache(str(tmp_path), maxBytes=1)
+    GeometryCache.paintImage(*scene, cache=cache)
+    assert cache.misses == 1
+    assert os.listdir(str(tmp_path)) == []
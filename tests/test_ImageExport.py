@@ -0,0 +1,55 @@
+import json
+import numpy as np
+import pytest
+import BPRangeBin
+import ImageExport
+from FactorizedBackProjection import analytic
+
+@pytest.fixture(scope='module')
+def result(scene, reference):
+    datalist, rangeBins, platformPos, xCor, yCor = scene
+    return {'img': reference, 'x': xCor, 'y': yCor, 'method': 'backprojection', 'scans': len(datalist)}
+
+#image, axes and metadata come back as saved, .npy memory mapped with its JSON sidecar
+@pytest.mark.parametrize('extension', ['.npz', '.npy'])
+def testImageDataRoundTrip(result, tmp_path, extension):
+    path = ImageExport.saveImageData(str(tmp_path / ('image' + extension)), result)
+    loaded = ImageExport.loadImageData(path)
+    np.testing.assert_array_equal(loaded['img'], result['img'])
+    np.testing.assert_array_equal(loaded['x'], result['x'])
+    np.testing.assert_array_equal(loaded['y'], result['y'])
+    assert (loaded['method'], loaded['scans']) == ('backprojection', result['scans'])
+    if extension == '.npy':
+        assert isinstance(loaded['img'], np.memmap)
+        with open(path + '.json') as f:
+            assert json.load(f)['method'] == 'backprojection'
+
+def testComplexImage(scene, tmp_path):
+    datalist, rangeBins, platformPos, xCor, yCor = scene
+    image = BPRangeBin.paintImage(analytic(datalist), rangeBins, platformPos, xCor, yCor)
+    path = ImageExport.saveImageData(str(tmp_path / 'image'), {'img': image, 'x': xCor, 'y': yCor})
+    assert path.endswith('.npz')
+    np.testing.assert_array_equal(ImageExport.loadImageData(path)['img'], image)
+
+#the PNG decodes to the scaled image, brightest pixel at 255 with yCor running bottom to top
+def testPNG(reference, tmp_path):
+    Image = pytest.importorskip('PIL.Image')
+    path = ImageExport.writeThumbnail(str(tmp_path / 'image.png'), reference)
+    gray = np.asarray(Image.open(path))
+    np.testing.assert_array_equal(gray, ImageExport.scaleImage(reference))
+    row, column = np.unravel_index(np.abs(reference).argmax(), reference.shape)
+    assert gray[-1 - row, column] == 255
+
+def testScaleImage(reference):
+    assert ImageExport.scaleImage(np.zeros((4, 4))).max() == 0
+    assert ImageExport.scaleImage(reference, 'linear').max() == 255
+    with pytest.raises(ValueError):
+        ImageExport.scaleImage(reference, 'log')
+
+#a result that cannot be written is logged and skipped, the exports after it still run
+def testExporterSurvivesBadJob(result, tmp_path):
+    with ImageExport.Exporter() as exporter:
+        exporter.submit({'img': None}, thumbnailPath=str(tmp_path / 'bad.png'))
+        exporter.submit(result, str(tmp_path / 'good.npz'), str(tmp_path / 'good.png'))
+    assert len(exporter.errors) == 1
+    assert exporter.written == [str(tmp_path / 'good.npz'), str(tmp_path / 'good.png')]
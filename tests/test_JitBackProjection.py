@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+import BPRangeBin
+import FastBackProjection
+import JitBackProjection
+from FactorizedBackProjection import analytic
+
+BACKENDS = ['numpy'] + (['numba'] if JitBackProjection.numba is not None else [])
+
+#the compiled kernel and the NumPy fallback both give the reference image
+@pytest.mark.parametrize('backend', BACKENDS)
+def testMatchesReference(scene, reference, backend):
+    image = JitBackProjection.paintImage(*scene, backend=backend)
+    assert image.shape == reference.shape
+    np.testing.assert_allclose(image, reference, atol=1e-9 * np.abs(reference).max())
+
+#nearest bins round the same way in the kernel as in FastBackProjection
+@pytest.mark.parametrize('backend', BACKENDS)
+def testNearest(scene, backend):
+    expected = FastBackProjection.paintImage(*scene, mode='nearest')
+    np.testing.assert_allclose(JitBackProjection.paintImage(*scene, mode='nearest', backend=backend), expected,
+                               atol=1e-9 * np.abs(expected).max())
+
+def testResolve():
+    assert JitBackProjection.resolve('auto') == ('numba' if JitBackProjection.numba is not None else 'numpy')
+    assert JitBackProjection.resolve('numpy') == 'numpy'
+    with pytest.raises(ValueError):
+        JitBackProjection.resolve('cuda')
+
+#single precision rows and image, Kahan compensation brings the sums closer to the double precision image
+@pytest.mark.parametrize('backend', BACKENDS)
+def testSinglePrecision(scene, reference, backend):
+    peak = np.abs(reference).max()
+    image = JitBackProjection.paintImage(*scene, backend=backend, precision='single')
+    assert image.dtype == np.float32
+    np.testing.assert_allclose(image, reference, atol=1e-4 * peak)
+    compensated = JitBackProjection.paintImage(*scene, backend=backend, precision='single', compensated=True)
+    assert np.abs(compensated - reference).max() <= np.abs(image - reference).max()
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('compensated', [False, True])
+def testComplexSingle(scene, backend, compensated):
+    datalist, rangeBins, platformPos, xCor, yCor = scene
+    signal = analytic(datalist)
+    expected = BPRangeBin.paintImage(signal, rangeBins, platformPos, xCor, yCor)
+    image = JitBackProjection.paintImage(signal, rangeBins, platformPos, xCor, yCor, backend=backend, precision='single',
+                                         compensated=compensated)
+    assert image.dtype == np.complex64
+    np.testing.assert_allclose(image, expected, atol=1e-4 * np.abs(expected).max())
@@ -0,0 +1,56 @@
+import struct
+import numpy as np
+import pytest
+import MessageCodec
+from MessageCodec import LAYOUTS, FIELDS, MESSAGES, SCAN_INFO, SAMPLE_TYPE, encode, decodeMessage, decodeScan
+from RadarEmulator import scanDatagrams
+
+#random bytes with a valid header, decoding then encoding them has to give the same bytes back
+def randomMessage(messageType, rng):
+    data = bytearray(rng.integers(0, 256, LAYOUTS[messageType].size, dtype=np.uint8).tobytes())
+    struct.pack_into('>H', data, 0, messageType)
+    return bytes(data)
+
+@pytest.mark.parametrize('messageType', [t for t in MESSAGES if t != SCAN_INFO])
+def testRoundTrip(messageType):
+    rng = np.random.default_rng(messageType)
+    for i in range(5):
+        data = randomMessage(messageType, rng)
+        message = decodeMessage(data)
+        assert message['message_type'] == messageType
+        assert encode(messageType, *[message[name] for name in FIELDS[messageType][1:]]) == data
+
+def testStatusInfoLayout():
+    assert LAYOUTS[0xF101].size == 64
+    data = bytearray(randomMessage(0xF101, np.random.default_rng(0)))
+    struct.pack_into('>I', data, 16, 0x01020304)
+    struct.pack_into('>I', data, 60, 7)
+    message = decodeMessage(bytes(data))
+    assert message['serial_number'] == 0x01020304
+    assert message['status'] == 7
+
+def testEncodeReturnsNewBytes():
+    first = MessageCodec.encodeCtrlReq(1, 10)
+    second = MessageCodec.encodeCtrlReq(2, 20)
+    assert decodeMessage(first)['message_id'] == 1
+    assert decodeMessage(first)['scan_count'] == 10
+    assert decodeMessage(second)['scan_count'] == 20
+
+def testTruncatedMessage():
+    with pytest.raises(struct.error):
+        decodeMessage(MessageCodec.encodeSetConf(1, 0, 70, 32, 8)[:-3])
+
+def testUnknownTypeKeepsHeader():
+    assert decodeMessage(struct.pack('>HH', 0xABCD, 9)) == {'message_type': 0xABCD, 'message_id': 9}
+
+def testScanRoundTrip():
+    rows = np.random.default_rng(1).integers(-2**31, 2**31, (2, 800), dtype=np.int64).astype(np.int32)
+    datagrams, numMessages = scanDatagrams(rows, 0, 466989, 32)
+    assert numMessages == 3
+    for row, pieces in zip(rows, datagrams):
+        messages = [decodeScan(bytes(piece)) for piece in pieces]
+        assert [m['message_index'] for m in messages] == [0, 1, 2]
+        assert all(m['num_samples_total'] == 800 and m['num_messages_total'] == 3 for m in messages)
+        assert messages[0]['scan_data'].dtype == SAMPLE_TYPE
+        np.testing.assert_array_equal(np.concatenate([m['scan_data'] for m in messages]), row)
+        assert decodeMessage(bytes(pieces[0]))['scan_stop'] == 466989
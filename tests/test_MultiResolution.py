@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+import MultiResolution
+
+#one tile over the whole grid is the reference image
+def testMatchesReference(scene, reference):
+    image = MultiResolution.paintImage(*scene)
+    np.testing.assert_allclose(image, reference, atol=1e-9 * np.abs(reference).max())
+
+#small tiles: the refined ones match the reference, the skipped ones hold next to nothing in it
+def testRefinesTargets(scene, reference):
+    pyramid = MultiResolution.paintPyramid(*scene, coarse=4, tile=8)
+    assert 0 < len(pyramid['tiles']) < 16
+    assert pyramid['work'] < 1
+    image = MultiResolution.stitch(pyramid, reference.shape)
+    refined = image != 0
+    peak = np.abs(reference).max()
+    np.testing.assert_allclose(image[refined], reference[refined], atol=1e-9 * peak)
+    assert np.abs(reference[~refined]).max() < 1e-3 * peak
+    assert refined.flat[np.abs(reference).argmax()]
+
+#keyword arguments go through to the tile imager
+def testImagerArguments(scene, reference):
+    image = MultiResolution.paintImage(*scene, coarse=4, tile=8, precision='single')
+    assert image.dtype == np.float32
+    refined = image != 0
+    np.testing.assert_allclose(image[refined], reference[refined], atol=1e-4 * np.abs(reference).max())
+
+def testTileMultipleOfCoarse(scene):
+    with pytest.raises(ValueError):
+        MultiResolution.paintPyramid(*scene, coarse=3, tile=8)
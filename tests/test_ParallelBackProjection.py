@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+import ParallelBackProjection
+
+#scan parts summed and pixel row bands stitched both give the reference image
+@pytest.mark.parametrize('split', ['scans', 'pixels'])
+@pytest.mark.parametrize('workers', [1, 2])
+def testMatchesReference(scene, reference, split, workers):
+    image = ParallelBackProjection.paintImage(*scene, workers=workers, split=split)
+    assert image.shape == reference.shape
+    np.testing.assert_allclose(image, reference, atol=1e-9 * np.abs(reference).max())
+
+def testUnknownSplit(scene):
+    with pytest.raises(ValueError):
+        ParallelBackProjection.paintImage(*scene, workers=2, split='rows')
+
+#workers image in single precision into a single precision shared image
+@pytest.mark.parametrize('split', ['scans', 'pixels'])
+def testSinglePrecision(scene, reference, split):
+    image = ParallelBackProjection.paintImage(*scene, workers=2, split=split, precision='single')
+    assert image.dtype == np.float32
+    np.testing.assert_allclose(image, reference, atol=1e-4 * np.abs(reference).max())
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from Configuration import SPEED_OF_LIGHT
+from Functions import tou
+from Point import Point, PointSet
+
+def makeSet():
+    return PointSet([1, 2, 3], [4, 5, 6], [7, 8, 9])
+
+def testIndexing():
+    points = makeSet()
+    assert (points[0].x, points[0].y, points[0].z) == (1, 4, 7)
+    assert points[2].x == 3 and points[np.int64(1)].y == 5
+    assert points[-1].x == 3 and points[-3].x == 1
+    for index in (3, -4, 100):
+        with pytest.raises(IndexError):
+            points[index]
+    with pytest.raises(IndexError):
+        PointSet()[0]
+
+def testSlicesAndViews():
+    points = makeSet()
+    part = points[1:]
+    assert isinstance(part, PointSet) and len(part) == 2
+    np.testing.assert_array_equal(points[[0, 2]].asArray(), [[1, 4, 7], [3, 6, 9]])
+    view = points[1]
+    view.x = 20
+    assert points.x[1] == 20
+    assert [p.z for p in points] == [7, 8, 9]
+
+def testStandalonePoint():
+    p = Point(1, 2)
+    assert (p.x, p.y, p.z) == (1, 2, 0)
+    assert Point(3, 4).distance(Point()) == 5
+    np.testing.assert_allclose(Point(np.arange(3.), np.zeros(3)).distance(Point()), [0, 1, 2])
+
+def testDistanceShapes():
+    a = PointSet.fromArray(np.random.default_rng(0).normal(size=(5, 3)))
+    b = PointSet.fromArray(np.random.default_rng(1).normal(size=(4, 3)))
+    pairs = a.distance(b)
+    assert pairs.shape == (5, 4)
+    expected = [[p.distance(Point(q.x, q.y, q.z)) for q in b] for p in a]
+    np.testing.assert_allclose(pairs, expected)
+    one = Point(0.5, -1, 2)
+    np.testing.assert_allclose(a.distance(one), [p.distance(one) for p in a])
+    np.testing.assert_allclose(one.distance(a), a.distance(one))
+    assert a.distance(one).shape == (5,)
+
+def testTouShapes():
+    a = PointSet.fromArray(np.random.default_rng(0).normal(size=(5, 3)))
+    b = PointSet.fromArray(np.random.default_rng(1).normal(size=(4, 3)))
+    np.testing.assert_allclose(tou(a, b), 2 * a.distance(b) / SPEED_OF_LIGHT)
+    np.testing.assert_allclose(a.tou(b), tou(a, b))
+    assert tou(a, Point()).shape == (5,)
+    assert tou(Point(3, 4), Point()) == pytest.approx(10 / SPEED_OF_LIGHT)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+import FastBackProjection
+from RangeInterp import interpRange, isUniform, imageType, sampleType
+
+BINS = np.linspace(0, 10, 201)
+
+def signal(r):
+    return np.cos(2 * np.pi * 1.3 * r)
+
+@pytest.fixture
+def distance():
+    return np.random.default_rng(0).uniform(-1, 11, (40, 25))
+
+#linear mode is a drop-in for np.interp, clamped ends included
+def testLinearMatchesInterp(distance):
+    np.testing.assert_allclose(interpRange(distance, BINS, signal(BINS)), np.interp(distance, BINS, signal(BINS)),
+                               atol=1e-12)
+
+def testComplexRow(distance):
+    row = np.exp(2j * np.pi * 1.3 * BINS)
+    expected = np.interp(distance, BINS, row.real) + 1j * np.interp(distance, BINS, row.imag)
+    np.testing.assert_allclose(interpRange(distance, BINS, row), expected, atol=1e-12)
+
+def testUnevenBins(distance):
+    uneven = BINS + 0.01 * np.sin(np.arange(len(BINS)))
+    assert not isUniform(uneven)
+    np.testing.assert_allclose(interpRange(distance, uneven, signal(uneven)), np.interp(distance, uneven, signal(uneven)))
+    with pytest.raises(ValueError):
+        interpRange(distance, uneven, signal(uneven), 'sinc')
+
+#inside the bins nearest is off by at most half a bin of slope, sinc beats linear on a well sampled signal
+def testModesAccuracy():
+    inside = np.random.default_rng(1).uniform(1, 9, 1000)
+    errors = {mode: np.abs(interpRange(inside, BINS, signal(BINS), mode) - signal(inside)).max()
+              for mode in ('nearest', 'linear', 'sinc')}
+    assert errors['nearest'] <= np.pi * 1.3 * (BINS[1] - BINS[0]) + 1e-12
+    assert errors['sinc'] < errors['linear'] / 2
+
+def testOut(distance):
+    out = np.empty(distance.shape)
+    assert interpRange(distance, BINS, signal(BINS), out=out) is out
+
+def testUnknownMode(distance):
+    with pytest.raises(ValueError):
+        interpRange(distance, BINS, signal(BINS), 'cubic')
+
+#the uniform-grid kernel inside backprojection gives the reference image, nearest bins keep the targets in place
+def testBackProjection(scene, reference):
+    image = FastBackProjection.paintImage(*scene, mode='linear')
+    np.testing.assert_allclose(image, reference, atol=1e-9 * np.abs(reference).max())
+    nearest = FastBackProjection.paintImage(*scene, mode='nearest')
+    np.testing.assert_allclose(nearest, reference, atol=0.2 * np.abs(reference).max())
+    assert np.abs(nearest).argmax() == np.abs(reference).argmax()
+
+def testImageType():
+    assert imageType(np.int16) == np.float64
+    assert imageType(np.complex64) == np.complex128
+    assert imageType(np.float64, 'single') == np.float32
+    assert imageType(np.complex128, 'single') == np.complex64
+    with pytest.raises(ValueError):
+        imageType(np.float64, 'half')
+
+#single precision rows stay single, integer samples go to double
+def testSampleType():
+    assert sampleType(np.float32) == np.float32
+    assert sampleType(np.complex64) == np.complex64
+    assert sampleType(np.int16) == np.float64
+    assert interpRange(np.array([0.5]), BINS, signal(BINS).astype(np.float32)).dtype == np.float32
@@ -0,0 +1,30 @@
+import numpy as np
+import BPRangeBin
+import FastBackProjection
+import RangeMigration
+from FactorizedBackProjection import analytic
+
+def testMatchesReference(scene):
+    datalist, rangeBins, platformPos, xCor, yCor = scene
+    signal = analytic(datalist)
+    reference = BPRangeBin.paintImage(signal, rangeBins, platformPos, xCor, yCor)
+    image = RangeMigration.paintImage(signal, rangeBins, platformPos, xCor, yCor, linear=True)
+    assert image.shape == reference.shape
+    assert np.abs(np.abs(image) - np.abs(reference)).max() < 0.25 * np.abs(reference).max()
+
+#64 scans over 4 m are too far apart for the along-track spectrum, the automatic mode backprojects
+def testFallsBackWhenScansAlias(scene, reference):
+    np.testing.assert_allclose(RangeMigration.paintImage(*scene), reference, atol=1e-9 * np.abs(reference).max())
+
+def testSilentScans(scene):
+    datalist, rangeBins, platformPos, xCor, yCor = scene
+    for linear in (None, True):
+        image = RangeMigration.paintImage(np.zeros(datalist.shape), rangeBins, platformPos, xCor, yCor, linear=linear)
+        assert image.shape == (len(yCor), len(xCor))
+        assert not image.any()
+
+def testSceneOutsideRangeWindow(scene):
+    datalist, rangeBins, platformPos, xCor, yCor = scene
+    far = yCor + 2 * rangeBins[-1]
+    image = RangeMigration.paintImage(datalist, rangeBins, platformPos, xCor, far, linear=True)
+    np.testing.assert_array_equal(image, FastBackProjection.paintImage(datalist, rangeBins, platformPos, xCor, far))
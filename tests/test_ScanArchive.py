@@ -0,0 +1,58 @@
+import os
+import json
+import pickle
+import numpy as np
+import pytest
+import ScanArchive
+
+def testRoundTrip(tmp_path):
+    path = str(tmp_path / 'run.scans')
+    scanData = np.arange(40, dtype=np.int32).reshape(4, 10)
+    platformPos = np.random.default_rng(0).normal(size=(4, 3))
+    timestamps = np.array([1000, 1002, 1004, 1006], np.int64)
+    ScanArchive.writeArchive(path, scanData, platformPos, np.arange(10) * 0.01, timestamps, bii=8)
+    archive = ScanArchive.ScanArchive(path)
+    assert len(archive) == 4
+    assert isinstance(archive['scan_data'], np.memmap)
+    np.testing.assert_array_equal(archive['scan_data'], scanData)
+    np.testing.assert_array_equal(archive['platform_pos'], platformPos)
+    np.testing.assert_array_equal(archive['timestamps'], timestamps)
+    np.testing.assert_array_equal(archive.scans(1, 3), scanData[1:3])
+    assert archive.meta['bii'] == 8
+    assert 'range_bins' in archive and 'missing' not in archive
+    with pytest.raises(KeyError):
+        archive['missing']
+
+def testOverwrite(tmp_path):
+    path = str(tmp_path / 'run.scans')
+    ScanArchive.writeArchive(path, np.ones((3, 5), np.int32))
+    ScanArchive.writeArchive(path, np.zeros((2, 5), np.int32))
+    assert len(ScanArchive.ScanArchive(path)) == 2
+    assert os.listdir(tmp_path) == ['run.scans']
+
+def testNewerVersion(tmp_path):
+    path = str(tmp_path / 'run.scans')
+    ScanArchive.writeArchive(path, np.ones((1, 5), np.int32))
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(dict(meta, version=ScanArchive.VERSION + 1), f)
+    with pytest.raises(ValueError):
+        ScanArchive.ScanArchive(path)
+
+def testConvertPickle(tmp_path):
+    pklPath = str(tmp_path / 'marathon_0.pkl')
+    scanData = np.arange(12).reshape(3, 4)
+    with open(pklPath, 'wb') as f:
+        pickle.dump({'scan_data': scanData, 'platform_pos': np.zeros((3, 3)), 'note': 'field'}, f)
+    archive = ScanArchive.convertPickle(pklPath)
+    assert archive.path == str(tmp_path / 'marathon_0.scans')
+    np.testing.assert_array_equal(archive['scan_data'], scanData)
+    assert archive.meta['note'] == 'field' and archive.meta['source'] == 'marathon_0.pkl'
+    np.testing.assert_array_equal(ScanArchive.load(pklPath)['scan_data'], scanData)
+
+def testBarePickle(tmp_path):
+    pklPath = str(tmp_path / 'datalist.pkl')
+    with open(pklPath, 'wb') as f:
+        pickle.dump(np.ones((2, 3)), f)
+    np.testing.assert_array_equal(ScanArchive.load(pklPath)['scan_data'], np.ones((2, 3)))
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from MessageCodec import decodeScan
+from RadarEmulator import scanDatagrams
+from ScanAssembler import ScanAssembler
+
+NUM_SAMPLES = 800
+FIRST_ID = 100
+
+#scans as decoded F201 pieces in send order, message ids continue from firstID
+def scanMessages(scans, firstID = FIRST_ID, seed = 0):
+    rows = np.random.default_rng(seed).integers(-1000, 1000, (scans, NUM_SAMPLES)).astype(np.int32)
+    datagrams, numMessages = scanDatagrams(rows, 0, 0, 32)
+    messages = []
+    for scan, pieces in enumerate(datagrams):
+        for index, piece in enumerate(pieces):
+            message = decodeScan(bytes(piece))
+            message['message_id'] = (firstID + scan * numMessages + index) & 0xFFFF
+            message['timestamp'] = 1000 + scan
+            messages.append(message)
+    return rows, messages, numMessages
+
+def assemble(messages, scans, firstID = FIRST_ID, **kwargs):
+    handed = {}
+    def onScan(scan, row, missing):
+        handed[scan] = (row.copy(), list(missing))
+    assembler = ScanAssembler.fromMessage(messages[0], scans, onScan, firstMessageID=firstID, **kwargs)
+    for message in messages:
+        assembler.add(message)
+    return assembler, handed
+
+def testInOrder():
+    rows, messages, numMessages = scanMessages(5)
+    assembler, handed = assemble(messages, 5)
+    assert assembler.complete
+    assert assembler.completed == 5 and not assembler.gaps
+    for scan in range(5):
+        np.testing.assert_array_equal(handed[scan][0], rows[scan])
+        assert handed[scan][1] == []
+    np.testing.assert_array_equal(assembler.timestamps, 1000 + np.arange(5))
+
+def testReorderedAndDuplicated():
+    rows, messages, numMessages = scanMessages(6)
+    rng = np.random.default_rng(2)
+    shuffled = [messages[i] for i in rng.permutation(len(messages))]
+    shuffled += [messages[0], messages[4]]
+    assembler, handed = assemble(shuffled, 6)
+    assert assembler.complete and not assembler.gaps
+    assert assembler.duplicates + assembler.late == 2
+    for scan in range(6):
+        np.testing.assert_array_equal(handed[scan][0], rows[scan])
+
+def testDuplicateOfUnfinishedScan():
+    rows, messages, numMessages = scanMessages(2)
+    assembler, handed = assemble([messages[0], messages[0]] + messages[1:], 2)
+    assert assembler.duplicates == 1
+    np.testing.assert_array_equal(handed[0][0], rows[0])
+
+@pytest.mark.parametrize('fillGaps', [True, False])
+def testMissingPiece(fillGaps):
+    rows, messages, numMessages = scanMessages(4)
+    lost = 1 * numMessages + 1
+    assembler, handed = assemble(messages[:lost] + messages[lost + 1:], 4, fillGaps=fillGaps)
+    assert not assembler.complete
+    assert assembler.finish() == {1: [1]}
+    assert assembler.complete
+    assert sorted(handed) == ([0, 1, 2, 3] if fillGaps else [0, 2, 3])
+    if fillGaps:
+        row, missing = handed[1]
+        assert missing == [1]
+        start, stop = messages[1]['num_samples_message'], 2 * messages[1]['num_samples_message']
+        np.testing.assert_array_equal(row[:start], rows[1][:start])
+        assert not row[start:stop].any()
+        np.testing.assert_array_equal(row[stop:], rows[1][stop:])
+
+def testMissingTrailingScans():
+    rows, messages, numMessages = scanMessages(5)
+    assembler, handed = assemble(messages[:3 * numMessages], 5)
+    assert assembler.completed == 3 and not assembler.complete
+    gaps = assembler.finish()
+    assert gaps == {3: list(range(numMessages)), 4: list(range(numMessages))}
+    assert not handed[4][0].any()
+
+def testRingOverrun():
+    rows, messages, numMessages = scanMessages(6)
+    #scan 0 loses a piece and the ring of 2 moves past it once scan 2 starts
+    assembler, handed = assemble(messages[1:], 6, ringSize=2)
+    assert assembler.gaps == {0: [0]}
+    assert assembler.complete
+    np.testing.assert_array_equal(handed[5][0], rows[5])
+
+def testMessageIdsWrap():
+    rows, messages, numMessages = scanMessages(4, 0xFFFF - 4)
+    assembler, handed = assemble(messages, 4, 0xFFFF - 4)
+    assert assembler.complete and not assembler.gaps
+    np.testing.assert_array_equal(handed[3][0], rows[3])
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+import BPRangeBin
+from StreamingImager import StreamingImager, SlidingImager
+
+#scans painted as they arrive with their positions give the reference image
+def testMatchesReference(scene, reference):
+    datalist, rangeBins, platformPos, xCor, yCor = scene
+    imager = StreamingImager(rangeBins, xCor, yCor)
+    for scan, row in enumerate(datalist):
+        imager.add(scan, row, platformPos[scan])
+    image = imager.finish()
+    assert imager.imaged == len(datalist)
+    np.testing.assert_allclose(image, reference, atol=1e-9 * np.abs(reference).max())
+
+#scans added before the positions are known wait for setPlatformPos, NaN positions keep them waiting
+def testLatePositions(scene, reference):
+    datalist, rangeBins, platformPos, xCor, yCor = scene
+    imager = StreamingImager(rangeBins, xCor, yCor)
+    for scan, row in enumerate(datalist):
+        imager.add(scan, row)
+    partial = platformPos.copy()
+    partial[len(partial) // 2:] = np.nan
+    imager.setPlatformPos(partial)
+    imager.flush()
+    assert imager.imaged == len(datalist) // 2
+    imager.setPlatformPos(platformPos)
+    image = imager.finish()
+    np.testing.assert_allclose(image, reference, atol=1e-9 * np.abs(reference).max())
+
+#rows waiting at a new pass are dropped rather than painted with the next pass's positions
+def testNewPassDropsUnpositioned(scene):
+    datalist, rangeBins, platformPos, xCor, yCor = scene
+    imager = StreamingImager(rangeBins, xCor, yCor)
+    imager.add(0, datalist[0])
+    imager.newPass()
+    imager.setPlatformPos(platformPos)
+    image = imager.finish()
+    assert imager.imaged == 0
+    assert not image.any()
+
+#the window holds the backprojection of its last window scans alone, whether or not it was rebuilt on the way
+@pytest.mark.parametrize('resyncEvery', [0, 1, 50])
+def testSlidingWindow(scene, resyncEvery):
+    datalist, rangeBins, platformPos, xCor, yCor = scene
+    window = 16
+    imager = SlidingImager(rangeBins, xCor, yCor, window, resyncEvery=resyncEvery)
+    for scan, row in enumerate(datalist):
+        imager.add(scan, row, platformPos[scan])
+    image = imager.finish()
+    expected = BPRangeBin.paintImage(datalist[-window:], rangeBins, platformPos[-window:], xCor, yCor)
+    np.testing.assert_allclose(image, expected, atol=1e-9 * np.abs(expected).max())
+    assert len(imager.kept) == window
+
+#resync leaves the window's image as a fresh backprojection would
+def testResync(scene):
+    datalist, rangeBins, platformPos, xCor, yCor = scene
+    imager = SlidingImager(rangeBins, xCor, yCor, 8, resyncEvery=0)
+    for scan, row in enumerate(datalist[:20]):
+        imager.add(scan, row, platformPos[scan])
+    imager.resync()
+    assert imager.sinceResync == 0
+    expected = BPRangeBin.paintImage(datalist[12:20], rangeBins, platformPos[12:20], xCor, yCor)
+    np.testing.assert_allclose(imager.snapshot(), expected, atol=1e-12 * np.abs(expected).max())
+    imager.finish()